@@ -0,0 +1,367 @@
+"""
+AI-powered harassment analysis for Digital Footprint Shield.
+
+Providers are async clients driven from one background event loop, so a
+sync Flask worker only ever waits up to a fixed deadline for an answer.
+Every call is bounded by a concurrency limit and a per-provider circuit
+breaker; when a provider is slow, failing or saturated the analyzer
+returns None and the caller falls back to keyword analysis immediately.
+
+Configuration (environment variables):
+- OPENAI_API_KEY / ANTHROPIC_API_KEY: enable the matching provider
+- AI_PROVIDER=fake: use the offline FakeProvider (for local testing)
+- OPENAI_BASE_URL / ANTHROPIC_BASE_URL: other API endpoints, read by the
+  SDKs themselves (e.g. the stand-in server in loadtest/mock_llm.py)
+- AI_DEADLINE_SECONDS: total time budget per message (default 2.0)
+- AI_MAX_CONCURRENCY: in-flight AI calls per worker (default 8)
+"""
+import abc
+import asyncio
+import importlib.util
+import json
+import logging
+import os
+import random
+import threading
+import time
+
+from .metrics import AI_CALLS, STAGE_LATENCY
+
+logger = logging.getLogger(__name__)
+
+SEVERITIES = ('low', 'medium', 'high', 'severe')
+
+# Filled in with the lexicon's categories (see build_system_prompt)
+SYSTEM_PROMPT_TEMPLATE = (
+    "You analyze messages for harassment. Return JSON with: severity "
+    "(low/medium/high/severe), categories (array of: {categories})"
+)
+
+
+def build_system_prompt(categories: list) -> str:
+    """
+    System prompt asking for the same categories the keyword lexicon uses.
+
+    Args:
+        categories: Category names, e.g. the compiled lexicon's 'categories'
+
+    Returns:
+        Prompt text for the providers
+    """
+    return SYSTEM_PROMPT_TEMPLATE.format(categories=', '.join(categories))
+
+
+def sdk_available(module_name: str) -> bool:
+    """Check for an optional SDK without importing it"""
+    return importlib.util.find_spec(module_name) is not None
+
+
+def normalize_result(result) -> dict | None:
+    """Validate a provider's JSON into {'severity', 'categories'}"""
+    if not isinstance(result, dict):
+        return None
+    severity = str(result.get('severity', '')).lower()
+    if severity not in SEVERITIES:
+        return None
+    categories = [c for c in result.get('categories') or [] if isinstance(c, str)]
+    return {
+        'severity': severity,
+        'categories': categories if categories else ['general harassment']
+    }
+
+
+# ============================================
+# PROVIDERS
+# ============================================
+class AnalyzerProvider(abc.ABC):
+    """Base class: subclasses implement `async analyze(message)`"""
+    name = 'base'
+
+    @abc.abstractmethod
+    async def analyze(self, message: str) -> dict | None:
+        """Return {'severity', 'categories'}, or None when the answer is unusable"""
+
+
+class OpenAIProvider(AnalyzerProvider):
+    name = 'openai'
+
+    def __init__(self, api_key: str, system_prompt: str, model: str = 'gpt-3.5-turbo'):
+        import openai
+        self.client = openai.AsyncOpenAI(api_key=api_key, max_retries=0)
+        self.system_prompt = system_prompt
+        self.model = model
+
+    async def analyze(self, message: str) -> dict | None:
+        response = await self.client.chat.completions.create(
+            model=self.model,
+            messages=[
+                {'role': 'system', 'content': self.system_prompt},
+                {'role': 'user', 'content': f'Analyze this message: {message}'}
+            ],
+            response_format={'type': 'json_object'}
+        )
+        return normalize_result(json.loads(response.choices[0].message.content))
+
+
+class AnthropicProvider(AnalyzerProvider):
+    name = 'anthropic'
+
+    def __init__(self, api_key: str, system_prompt: str, model: str = 'claude-3-haiku-20240307'):
+        import anthropic
+        self.client = anthropic.AsyncAnthropic(api_key=api_key, max_retries=0)
+        self.system_prompt = system_prompt
+        self.model = model
+
+    async def analyze(self, message: str) -> dict | None:
+        response = await self.client.messages.create(
+            model=self.model,
+            max_tokens=500,
+            system=self.system_prompt,
+            messages=[
+                {'role': 'user', 'content': f'Analyze this message: {message}'}
+            ]
+        )
+        return normalize_result(json.loads(response.content[0].text))
+
+
+class FakeProvider(AnalyzerProvider):
+    """
+    Offline stand-in provider with configurable latency and failure rate.
+
+    Results come from `analyze_fn` (normally the keyword analyzer), so the
+    whole AI path can be exercised without network access.
+    """
+    name = 'fake'
+
+    def __init__(self, analyze_fn, latency: float = 0.05, error_rate: float = 0.0):
+        self.analyze_fn = analyze_fn
+        self.latency = latency
+        self.error_rate = error_rate
+
+    async def analyze(self, message: str) -> dict | None:
+        await asyncio.sleep(self.latency)
+        if random.random() < self.error_rate:
+            raise RuntimeError('fake provider error')
+        return normalize_result(self.analyze_fn(message))
+
+
+# ============================================
+# CIRCUIT BREAKER
+# ============================================
+class CircuitBreaker:
+    """
+    Stops calling a provider after repeated failures.
+
+    After `failure_threshold` consecutive failures the breaker opens and
+    rejects calls for `reset_timeout` seconds, then lets a single trial
+    call through (half-open). A success closes it again.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return 'closed'
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            return 'half-open'
+        return 'open'
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == 'closed':
+                return True
+            if state == 'half-open' and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._opened_at is not None or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+
+
+# ============================================
+# ANALYZER
+# ============================================
+class AIAnalyzer:
+    """
+    Runs providers in order on a background event loop.
+
+    `analyze()` is safe to call from any sync worker thread and never
+    blocks longer than `deadline` seconds; `analyze_async()` is the same
+    for coroutines running on another event loop (the ASGI server's).
+    """
+
+    def __init__(self, providers: list, deadline: float = 2.0, max_concurrency: int = 8,
+                 breaker_factory=CircuitBreaker):
+        self.providers = providers
+        self.deadline = deadline
+        self.max_concurrency = max_concurrency
+        self.breakers = {p.name: breaker_factory() for p in providers}
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._loop = None
+        self._loop_lock = threading.Lock()
+
+    def _get_loop(self) -> asyncio.AbstractEventLoop:
+        with self._loop_lock:
+            if self._loop is None or self._loop.is_closed():
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=loop.run_forever, name='ai-analyzer', daemon=True)
+                thread.start()
+                self._loop = loop
+            return self._loop
+
+    def _reset_after_fork(self):
+        # The loop thread does not survive fork; start a fresh one on demand
+        self._loop = None
+        self._loop_lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.max_concurrency)
+
+    async def _run(self, message: str, deadline_at: float) -> dict | None:
+        for provider in self.providers:
+            breaker = self.breakers[provider.name]
+            remaining = deadline_at - time.monotonic()
+            if remaining <= 0:
+                break
+            if not breaker.allow():
+                AI_CALLS.inc(provider=provider.name, outcome='circuit_open')
+                continue
+            start = time.perf_counter()
+            try:
+                result = await asyncio.wait_for(provider.analyze(message), remaining)
+            except asyncio.CancelledError:
+                breaker.record_failure()
+                AI_CALLS.inc(provider=provider.name, outcome='cancelled')
+                raise
+            except asyncio.TimeoutError:
+                breaker.record_failure()
+                AI_CALLS.inc(provider=provider.name, outcome='timeout')
+                logger.warning('%s analysis timed out', provider.name)
+                continue
+            except Exception as e:
+                breaker.record_failure()
+                AI_CALLS.inc(provider=provider.name, outcome='error')
+                logger.warning('%s analysis failed: %s', provider.name, e)
+                continue
+            finally:
+                STAGE_LATENCY.observe(time.perf_counter() - start, stage=f'ai_{provider.name}')
+            if not result:
+                # An unusable answer is a failure too; keep trying the next provider
+                breaker.record_failure()
+                AI_CALLS.inc(provider=provider.name, outcome='invalid')
+                continue
+            breaker.record_success()
+            AI_CALLS.inc(provider=provider.name, outcome='ok')
+            return result
+        return None
+
+    def analyze(self, message: str) -> dict | None:
+        """Return an AI analysis, or None to signal keyword fallback"""
+        if not self._slots.acquire(blocking=False):
+            # Saturated: do not queue behind slow calls
+            AI_CALLS.inc(provider='all', outcome='saturated')
+            return None
+
+        deadline_at = time.monotonic() + self.deadline
+        try:
+            future = asyncio.run_coroutine_threadsafe(
+                self._run(message, deadline_at), self._get_loop()
+            )
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+
+        try:
+            # Small grace period so the in-loop wait_for reports the timeout
+            return future.result(timeout=self.deadline + 0.1)
+        except Exception as e:
+            future.cancel()
+            logger.warning('AI analysis abandoned: %s', str(e) or type(e).__name__)
+            return None
+
+    async def analyze_async(self, message: str) -> dict | None:
+        """Awaitable analyze(): waits without blocking the caller's event loop"""
+        if not self._slots.acquire(blocking=False):
+            AI_CALLS.inc(provider='all', outcome='saturated')
+            return None
+
+        deadline_at = time.monotonic() + self.deadline
+        try:
+            # Providers' clients belong to the analyzer loop, so run there
+            future = asyncio.run_coroutine_threadsafe(
+                self._run(message, deadline_at), self._get_loop()
+            )
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), self.deadline + 0.1)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.cancel()
+            logger.warning('AI analysis abandoned: %s', str(e) or type(e).__name__)
+            return None
+
+
+def build_analyzer_from_env(fallback_fn, categories: list) -> AIAnalyzer | None:
+    """
+    Create an AIAnalyzer for the providers configured in the environment.
+
+    Args:
+        fallback_fn: Keyword analyzer used by the fake provider
+        categories: Harassment categories the providers should report
+
+    Returns:
+        AIAnalyzer, or None if no provider is configured
+    """
+    providers = []
+    system_prompt = build_system_prompt(categories)
+
+    if os.environ.get('AI_PROVIDER') == 'fake':
+        providers.append(FakeProvider(
+            fallback_fn,
+            latency=float(os.environ.get('AI_FAKE_LATENCY', '0.05')),
+            error_rate=float(os.environ.get('AI_FAKE_ERROR_RATE', '0'))
+        ))
+
+    openai_key = os.environ.get('OPENAI_API_KEY')
+    if openai_key and sdk_available('openai'):
+        providers.append(OpenAIProvider(openai_key, system_prompt))
+
+    anthropic_key = os.environ.get('ANTHROPIC_API_KEY')
+    if anthropic_key and sdk_available('anthropic'):
+        providers.append(AnthropicProvider(anthropic_key, system_prompt))
+
+    if not providers:
+        return None
+
+    analyzer = AIAnalyzer(
+        providers,
+        deadline=float(os.environ.get('AI_DEADLINE_SECONDS', '2.0')),
+        max_concurrency=int(os.environ.get('AI_MAX_CONCURRENCY', '8'))
+    )
+    if hasattr(os, 'register_at_fork'):
+        os.register_at_fork(after_in_child=analyzer._reset_after_fork)
+    return analyzer
@@ -0,0 +1,167 @@
+"""
+Content-addressed cache for harassment analysis results.
+
+Messages are keyed on a hash of their exact text, so repeated campaign
+messages are analyzed once. The key cannot be any looser: case drives
+the caps boost, keywords can sit inside mentions and URLs, and results
+carry match offsets into the message. Entries live in a bounded
+in-memory LRU with a TTL, and optionally in a shared SQLite table so
+all gunicorn workers on a node share hits. Every key includes the
+pattern-table version; entries from an older lexicon are never served.
+"""
+import copy
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# Sweep expired rows from the shared tier after this many writes
+PURGE_EVERY = 1000
+
+
+def patterns_version(patterns: dict) -> str:
+    """Stable short hash of a pattern table"""
+    blob = json.dumps(patterns, sort_keys=True).encode('utf-8')
+    return hashlib.sha256(blob).hexdigest()[:16]
+
+
+class AnalysisCache:
+    """
+    Two-tier LRU + TTL cache.
+
+    Args:
+        version: Pattern-table version; part of every key
+        max_entries: In-memory LRU capacity
+        ttl: Seconds an entry stays valid
+        shared_path: Optional SQLite file shared between workers
+    """
+
+    def __init__(self, version: str, max_entries: int = 10000, ttl: float = 3600,
+                 shared_path: str | None = None):
+        self.version = version
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.shared_path = shared_path
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self._puts = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._reset_after_fork)
+
+        if shared_path:
+            directory = os.path.dirname(shared_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = self._shared()
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS analysis_cache ('
+                'key TEXT PRIMARY KEY, version TEXT, value TEXT, expires_at REAL)'
+            )
+            # Drop results computed with a different lexicon
+            conn.execute('DELETE FROM analysis_cache WHERE version != ?', (version,))
+
+    def _reset_after_fork(self):
+        # SQLite connections must not be used across fork; reopen on demand
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def _shared(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.shared_path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode = WAL')
+            conn.execute('PRAGMA synchronous = OFF')
+            self._local.conn = conn
+        return conn
+
+    def key(self, message: str) -> str:
+        digest = hashlib.sha256(message.encode('utf-8')).hexdigest()
+        return f'{self.version}:{digest}'
+
+    def get(self, message: str) -> dict | None:
+        """Return a copy of the cached result, or None on a miss"""
+        key = self.key(message)
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return _copy(value)
+                del self._entries[key]
+
+        if self.shared_path:
+            row = self._shared().execute(
+                'SELECT value, expires_at FROM analysis_cache WHERE key = ?', (key,)
+            ).fetchone()
+            if row and row[1] > now:
+                value = json.loads(row[0])
+                self._remember(key, value, row[1])
+                with self._lock:
+                    self.shared_hits += 1
+                return _copy(value)
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, message: str, result: dict):
+        key = self.key(message)
+        expires_at = time.time() + self.ttl
+        value = _copy(result)
+        self._remember(key, value, expires_at)
+
+        if self.shared_path:
+            self._shared().execute(
+                'INSERT OR REPLACE INTO analysis_cache (key, version, value, expires_at) '
+                'VALUES (?, ?, ?, ?)',
+                (key, self.version, json.dumps(value), expires_at)
+            )
+            self._puts += 1
+            if self._puts % PURGE_EVERY == 0:
+                self.purge_expired()
+
+    def _remember(self, key: str, value: dict, expires_at: float):
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        if self.shared_path:
+            self._shared().execute('DELETE FROM analysis_cache')
+
+    def purge_expired(self):
+        """Remove expired rows from the shared tier"""
+        if self.shared_path:
+            self._shared().execute('DELETE FROM analysis_cache WHERE expires_at <= ?', (time.time(),))
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.shared_hits + self.misses
+            return {
+                'hits': self.hits,
+                'sharedHits': self.shared_hits,
+                'misses': self.misses,
+                'size': len(self._entries),
+                'hitRate': round((self.hits + self.shared_hits) / lookups, 4) if lookups else 0.0,
+                'version': self.version
+            }
+
+
+def _copy(result: dict) -> dict:
+    # Results hold nested lists and dicts (categories, matches)
+    return copy.deepcopy(result)
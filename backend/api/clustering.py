@@ -0,0 +1,153 @@
+"""
+Near-duplicate detection with MinHash and LSH.
+
+Pile-ons send thousands of near-identical messages. Each message gets a
+MinHash signature over character shingles of its normalized text (see
+normalize.py, so leet-speak, spacing and accent tricks do not hide a
+copy). Signatures are split into LSH bands: two messages that agree on
+every row of some band are candidates, and a candidate joins a cluster
+when the estimated Jaccard similarity reaches CLUSTER_THRESHOLD.
+
+The signature and band helpers are shared by the persistent incident
+clusters (storage.py) and the in-memory MessageClusters index used to
+analyze each cluster of messages once.
+"""
+import copy
+import os
+import random
+import struct
+import threading
+from collections import OrderedDict
+from hashlib import blake2b
+
+from .normalize import normalize_text
+
+SHINGLE_SIZE = 4
+NUM_PERM = 32
+# 8 bands of 4 rows: pairs above ~0.6 similarity almost always share a band
+BANDS = 8
+ROWS = NUM_PERM // BANDS
+
+# Estimated Jaccard similarity for a message to join a cluster
+CLUSTER_THRESHOLD = float(os.environ.get('CLUSTER_THRESHOLD', '0.7'))
+
+# Fixed seed: signatures are persisted and compared across processes
+_rng = random.Random(0x5eed)
+_MASKS = tuple(_rng.getrandbits(64) for _ in range(NUM_PERM))
+del _rng
+_PACK = struct.Struct(f'<{NUM_PERM}Q')
+_BAND = struct.Struct(f'<B{ROWS}Q')
+
+
+def _hash64(data: bytes) -> int:
+    return int.from_bytes(blake2b(data, digest_size=8).digest(), 'little')
+
+
+def shingles(text: str) -> set:
+    """Character shingles of the normalized text"""
+    norm = normalize_text(text).strip()
+    if len(norm) <= SHINGLE_SIZE:
+        return {norm}
+    return {norm[i:i + SHINGLE_SIZE] for i in range(len(norm) - SHINGLE_SIZE + 1)}
+
+
+def signature(text: str) -> tuple:
+    """MinHash signature: NUM_PERM minima of XOR-permuted shingle hashes"""
+    hashes = [_hash64(s.encode('utf-8')) for s in shingles(text)]
+    return tuple(min(h ^ mask for h in hashes) for mask in _MASKS)
+
+
+def band_keys(sig: tuple) -> list:
+    """One signed 64-bit bucket key per LSH band (fits a SQLite INTEGER)"""
+    return [
+        int.from_bytes(blake2b(_BAND.pack(band, *sig[band * ROWS:(band + 1) * ROWS]),
+                               digest_size=8).digest(), 'little', signed=True)
+        for band in range(BANDS)
+    ]
+
+
+def similarity(a: tuple, b: tuple) -> float:
+    """Estimated Jaccard similarity of two signatures"""
+    return sum(x == y for x, y in zip(a, b)) / NUM_PERM
+
+
+def pack_signature(sig: tuple) -> bytes:
+    return _PACK.pack(*sig)
+
+
+def unpack_signature(data: bytes) -> tuple:
+    return _PACK.unpack(data)
+
+
+class MessageClusters:
+    """
+    Bounded in-memory LSH index of recently analyzed message clusters.
+
+    Each cluster keeps the analysis of its first message; later members
+    reuse it instead of being analyzed again. Analyses are copied in and
+    out, so callers may modify what they get back.
+
+    Args:
+        max_clusters: Clusters kept; least recently matched are evicted
+        threshold: Minimum estimated similarity to join a cluster
+    """
+
+    def __init__(self, max_clusters: int = 10000, threshold: float = CLUSTER_THRESHOLD):
+        self.max_clusters = max_clusters
+        self.threshold = threshold
+        self._clusters = OrderedDict()
+        self._buckets = {}
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+
+    def find(self, sig: tuple) -> dict | None:
+        """
+        Most similar cluster for a signature, counting the message as a member.
+
+        Returns:
+            Dict with 'id', 'count' and a copy of 'analysis', or None
+        """
+        keys = band_keys(sig)
+        with self._lock:
+            best, best_score = None, self.threshold
+            for key in keys:
+                cluster_id = self._buckets.get(key)
+                cluster = self._clusters.get(cluster_id)
+                if cluster is None or cluster is best:
+                    continue
+                score = similarity(sig, cluster['signature'])
+                if score >= best_score:
+                    best, best_score = cluster, score
+            if best is None:
+                return None
+            best['count'] += 1
+            self._clusters.move_to_end(best['id'])
+            self.hits += 1
+            return _snapshot(best)
+
+    def add(self, sig: tuple, analysis: dict) -> dict:
+        """Start a cluster whose members share this analysis"""
+        keys = band_keys(sig)
+        with self._lock:
+            self._next_id += 1
+            cluster = {'id': self._next_id, 'count': 1, 'analysis': copy.deepcopy(analysis),
+                       'signature': sig, 'keys': keys}
+            self._clusters[cluster['id']] = cluster
+            for key in keys:
+                self._buckets[key] = cluster['id']
+            while len(self._clusters) > self.max_clusters:
+                _, evicted = self._clusters.popitem(last=False)
+                for key in evicted['keys']:
+                    if self._buckets.get(key) == evicted['id']:
+                        del self._buckets[key]
+            return _snapshot(cluster)
+
+    def __len__(self) -> int:
+        return len(self._clusters)
+
+
+def _snapshot(cluster: dict) -> dict:
+    # Analyses hold nested lists and dicts (categories, matches)
+    return {'id': cluster['id'], 'count': cluster['count'],
+            'analysis': copy.deepcopy(cluster['analysis'])}
@@ -0,0 +1,287 @@
+"""
+Incremental conversation- and sender-level threat scoring.
+
+A harasser can escalate across a thread without any single message
+crossing the 'severe' threshold. Each conversation (and each sender)
+keeps a running state: message and category counts, a decay-weighted
+score per category and overall, and the recent per-message scores used
+for escalation detection. A new message is analyzed once and folded
+into the state, so the thread itself is never re-analyzed and the cost
+per message is constant.
+
+States live in a bounded in-memory LRU with an idle TTL. With a SQLite
+file configured they live there instead, so they survive restarts and
+are shared by the workers on a node: every update reads the current row
+and writes it back in one write transaction, so concurrent workers never
+overwrite each other's messages.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+SEVERITY_RANK = {'low': 0, 'medium': 1, 'high': 2, 'severe': 3}
+
+# Thread severity from the decay-weighted score (highest first)
+THREAD_SEVERITY = ((15, 'severe'), (8, 'high'), (3, 'medium'))
+
+# Escalation: mean score of the last N messages vs the N before them
+ESCALATION_WINDOW = 3
+ESCALATION_FACTOR = 1.5
+
+# Sweep idle rows from the persistent tier after this many writes
+PURGE_EVERY = 1000
+
+
+class ConversationState:
+    """Running aggregate for one conversation or sender"""
+
+    __slots__ = ('messages', 'category_counts', 'score', 'category_scores',
+                 'recent', 'severity', 'peak_severity', 'escalations', 'updated_at', 'last_seen')
+
+    def __init__(self):
+        self.messages = 0
+        self.category_counts = {}
+        self.score = 0.0
+        self.category_scores = {}
+        self.recent = []
+        self.severity = 'low'
+        self.peak_severity = 'low'
+        self.escalations = 0
+        self.updated_at = None
+        self.last_seen = 0.0
+
+    def add(self, score: float, categories: list, weights: dict, severity: str,
+            timestamp: float, half_life: float) -> bool:
+        """
+        Fold one analyzed message into the state.
+
+        Args:
+            score: Message score
+            categories: Message categories
+            weights: {category: weight} used for per-category scores
+            severity: Message severity
+            timestamp: Message time (epoch seconds)
+            half_life: Seconds for past scores to lose half their weight
+
+        Returns:
+            True when the thread severity went up with this message
+        """
+        # Out-of-order messages do not decay (or boost) the running score
+        elapsed = max(0.0, timestamp - self.updated_at) if self.updated_at is not None else 0.0
+        decay = 0.5 ** (elapsed / half_life) if half_life > 0 else 1.0
+
+        self.score = self.score * decay + score
+        for category in self.category_scores:
+            self.category_scores[category] *= decay
+        for category in categories:
+            self.category_counts[category] = self.category_counts.get(category, 0) + 1
+            self.category_scores[category] = self.category_scores.get(category, 0.0) + weights.get(category, 0)
+
+        first = self.messages == 0
+        self.messages += 1
+        self.updated_at = max(timestamp, self.updated_at or timestamp)
+        self.recent.append(score)
+        del self.recent[:-2 * ESCALATION_WINDOW]
+
+        previous = self.severity
+        self.severity = max(thread_severity(self.score), severity, key=SEVERITY_RANK.__getitem__)
+        if SEVERITY_RANK[self.severity] > SEVERITY_RANK[self.peak_severity]:
+            self.peak_severity = self.severity
+        # A thread's first message sets its level; it cannot escalate it
+        escalated = not first and SEVERITY_RANK[self.severity] > SEVERITY_RANK[previous]
+        if escalated:
+            self.escalations += 1
+        return escalated
+
+    def trend(self) -> str:
+        """'rising', 'falling' or 'steady' over the recent messages"""
+        window = min(ESCALATION_WINDOW, len(self.recent) // 2)
+        if window == 0:
+            return 'steady'
+        before = sum(self.recent[-2 * window:-window]) / window
+        after = sum(self.recent[-window:]) / window
+        if after > before * ESCALATION_FACTOR and after - before >= 1:
+            return 'rising'
+        if before > after * ESCALATION_FACTOR and before - after >= 1:
+            return 'falling'
+        return 'steady'
+
+    def summary(self) -> dict:
+        return {
+            'messages': self.messages,
+            'severity': self.severity,
+            'peakSeverity': self.peak_severity,
+            'score': round(self.score, 2),
+            'categories': dict(self.category_counts),
+            'categoryScores': {c: round(s, 2) for c, s in self.category_scores.items()},
+            'trend': self.trend(),
+            'escalations': self.escalations,
+            'updatedAt': (datetime.fromtimestamp(self.updated_at).isoformat()
+                          if self.updated_at is not None else None),
+        }
+
+    def to_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'ConversationState':
+        state = cls()
+        for name in cls.__slots__:
+            if name in data:
+                setattr(state, name, data[name])
+        return state
+
+
+def thread_severity(score: float) -> str:
+    for threshold, severity in THREAD_SEVERITY:
+        if score >= threshold:
+            return severity
+    return 'low'
+
+
+class ConversationStore:
+    """
+    Conversation states in a bounded LRU, or in SQLite when persist_path is set.
+
+    Args:
+        weights: {category: weight} for per-category scores
+        max_entries: In-memory capacity; least recently active states are evicted
+        ttl: Seconds of inactivity after which a state starts over
+        half_life: Decay half-life of past message scores, in seconds
+        persist_path: Optional SQLite file holding the states (shared by workers)
+    """
+
+    def __init__(self, weights: dict, max_entries: int = 10000, ttl: float = 86400,
+                 half_life: float = 3600, persist_path: str | None = None):
+        self.weights = weights
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.half_life = half_life
+        self.persist_path = persist_path
+        self._states = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._writes = 0
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._reset_after_fork)
+
+        if persist_path:
+            directory = os.path.dirname(persist_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._db().execute(
+                'CREATE TABLE IF NOT EXISTS conversations ('
+                'key TEXT PRIMARY KEY, state TEXT, last_seen REAL)'
+            )
+
+    def _reset_after_fork(self):
+        # SQLite connections must not be used across fork; reopen on demand
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def _db(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.persist_path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode = WAL')
+            conn.execute('PRAGMA synchronous = NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def _load(self, key: str, now: float) -> ConversationState | None:
+        """Live state from SQLite when persisted, else from memory (caller holds the lock)"""
+        if self.persist_path:
+            # Another worker may have updated the row; never trust a local copy.
+            # Expired rows are overwritten by the next record() or purged.
+            row = self._db().execute(
+                'SELECT state FROM conversations WHERE key = ? AND last_seen > ?',
+                (key, now - self.ttl)
+            ).fetchone()
+            return ConversationState.from_dict(json.loads(row[0])) if row else None
+
+        state = self._states.get(key)
+        if state is not None and state.last_seen + self.ttl <= now:
+            del self._states[key]
+            return None
+        return state
+
+    def get(self, key: str) -> dict | None:
+        with self._lock:
+            state = self._load(key, time.time())
+            return state.summary() if state is not None else None
+
+    def record(self, key: str, analysis: dict, score: float, timestamp: float | None = None) -> dict:
+        """
+        Fold one analyzed message into a conversation.
+
+        Args:
+            key: Conversation (or sender) key
+            analysis: Message analysis with severity and categories
+            score: Message score
+            timestamp: Message time (epoch seconds, defaults to now)
+
+        Returns:
+            Conversation summary plus 'escalated' for this message
+        """
+        now = time.time()
+        with self._lock:
+            if self.persist_path:
+                # Read-modify-write under SQLite's write lock, so workers serialize
+                conn = self._db()
+                conn.execute('BEGIN IMMEDIATE')
+                try:
+                    state, escalated = self._update(key, analysis, score, timestamp, now)
+                    conn.execute(
+                        'INSERT OR REPLACE INTO conversations (key, state, last_seen) VALUES (?, ?, ?)',
+                        (key, json.dumps(state.to_dict()), now)
+                    )
+                    conn.execute('COMMIT')
+                except Exception:
+                    conn.execute('ROLLBACK')
+                    raise
+                self._writes += 1
+                if self._writes % PURGE_EVERY == 0:
+                    self.purge_expired()
+            else:
+                state, escalated = self._update(key, analysis, score, timestamp, now)
+                self._states[key] = state
+                self._states.move_to_end(key)
+                while len(self._states) > self.max_entries:
+                    self._states.popitem(last=False)
+
+            summary = state.summary()
+        summary['escalated'] = escalated
+        return summary
+
+    def _update(self, key: str, analysis: dict, score: float, timestamp: float | None, now: float) -> tuple:
+        state = self._load(key, now) or ConversationState()
+        escalated = state.add(score, analysis['categories'], self.weights, analysis['severity'],
+                              now if timestamp is None else timestamp, self.half_life)
+        state.last_seen = now
+        return state, escalated
+
+    def forget(self, key: str) -> bool:
+        with self._lock:
+            found = self._states.pop(key, None) is not None
+            if self.persist_path:
+                found = self._db().execute(
+                    'DELETE FROM conversations WHERE key = ?', (key,)
+                ).rowcount > 0 or found
+            return found
+
+    def purge_expired(self):
+        """Remove idle rows from the persistent tier"""
+        if self.persist_path:
+            self._db().execute('DELETE FROM conversations WHERE last_seen <= ?', (time.time() - self.ttl,))
+
+    def __len__(self) -> int:
+        """Live states: rows in the persistent tier, else entries in memory"""
+        if self.persist_path:
+            return self._db().execute(
+                'SELECT COUNT(*) FROM conversations WHERE last_seen > ?', (time.time() - self.ttl,)
+            ).fetchone()[0]
+        return len(self._states)
@@ -0,0 +1,82 @@
+"""
+Incident ID generation.
+
+IDs are ULIDs (48-bit millisecond timestamp + 80 random bits, Crockford
+base32) with an "inc_" prefix. They sort lexicographically by creation
+time, so they can be used directly as a time-ordered key, and the random
+component makes collisions between gunicorn workers negligible without
+any coordination. Incident pages are still keyed on the store's
+insertion sequence (storage.py), as imported incidents keep their IDs.
+"""
+import os
+import threading
+import time
+
+CROCKFORD = '0123456789ABCDEFGHJKMNPQRSTVWXYZ'
+RANDOM_BITS = 80
+PREFIX = 'inc_'
+
+
+class UlidGenerator:
+    """
+    Monotonic ULID generator.
+
+    Within one process, IDs created in the same millisecond (or while the
+    clock steps backwards) reuse the last timestamp and increment the
+    random part, so every new ID sorts after the previous one.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._last_ms = -1
+        self._last_rand = 0
+
+    def new(self) -> str:
+        with self._lock:
+            ms = time.time_ns() // 1_000_000
+            if ms <= self._last_ms:
+                ms = self._last_ms
+                rand = self._last_rand + 1
+                if rand >> RANDOM_BITS:
+                    # Random space exhausted within one millisecond
+                    ms += 1
+                    rand = int.from_bytes(os.urandom(10), 'big')
+            else:
+                rand = int.from_bytes(os.urandom(10), 'big')
+            self._last_ms = ms
+            self._last_rand = rand
+
+        return _encode((ms << RANDOM_BITS) | rand)
+
+
+def _encode(value: int) -> str:
+    chars = []
+    for _ in range(26):
+        chars.append(CROCKFORD[value & 31])
+        value >>= 5
+    return ''.join(reversed(chars))
+
+
+_generator = UlidGenerator()
+
+# A forked worker must not continue the parent's sequence in the same millisecond
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_generator._reset)
+
+
+def new_incident_id() -> str:
+    """Create a new, time-sortable incident ID such as inc_01HV6Z3K8Q..."""
+    return PREFIX + _generator.new()
+
+
+def new_cluster_id() -> str:
+    """Create a new, time-sortable near-duplicate cluster ID (clu_...)"""
+    return 'clu_' + _generator.new()
+
+
+def new_job_id() -> str:
+    """Create a new, time-sortable background job ID (job_...)"""
+    return 'job_' + _generator.new()
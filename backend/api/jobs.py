@@ -0,0 +1,410 @@
+"""
+Persistent background job queue for heavy analysis.
+
+Jobs are rows in a SQLite (WAL) database, so they survive restarts and
+every gunicorn worker and standalone worker process shares one queue.
+Workers claim the most urgent job (lowest priority number, then oldest)
+under a lease; a job whose worker dies is picked up again when its lease
+expires. Failed jobs are retried with exponential backoff up to
+max_attempts. Submissions are refused once max_pending jobs are waiting
+or running, so a flood of bulk work cannot grow the queue without bound.
+
+Job kinds are registered with @job_kind (see tasks.py). Run dedicated
+worker processes with (from backend/):
+
+    python -m api.jobs --workers 4
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import signal
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+from .ids import new_job_id
+from .metrics import REGISTRY
+
+# Priorities: lower runs first
+PRIORITY_SEVERE = 0
+PRIORITY_HIGH = 1
+PRIORITY_NORMAL = 2
+
+# Seconds a claimed job may run before another worker may take it over
+JOB_LEASE = float(os.environ.get('JOB_LEASE_SECONDS', '300'))
+
+# Longest retry backoff, in seconds
+MAX_BACKOFF = 60
+
+# Seconds finished jobs (and their results) are kept
+RESULT_TTL = float(os.environ.get('JOB_RESULT_TTL', '86400'))
+
+# Retry-After suggested when the queue is full
+RETRY_AFTER = 5
+
+logger = logging.getLogger(__name__)
+
+JOB_RUNS = REGISTRY.counter('dfs_job_runs_total', 'Background job runs by kind and outcome')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT NOT NULL UNIQUE,
+    kind TEXT NOT NULL,
+    priority INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    result TEXT,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    run_after REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    lease_until REAL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_ready ON jobs(status, priority, seq);
+CREATE INDEX IF NOT EXISTS idx_jobs_finished ON jobs(finished_at);
+"""
+
+# kind -> (handler(payload) -> result, prepare(payload) -> priority)
+JOB_KINDS = {}
+
+
+def job_kind(name: str, prepare=None):
+    """
+    Register a job handler.
+
+    Args:
+        name: Kind clients submit
+        prepare: Optional fn(payload) -> priority, called at submit time;
+            raises ValueError to reject an invalid payload
+    """
+    def decorator(fn):
+        JOB_KINDS[name] = (fn, prepare)
+        return fn
+    return decorator
+
+
+class QueueFull(Exception):
+    """Raised by submit when max_pending jobs are already queued or running"""
+
+    def __init__(self, pending: int):
+        super().__init__(f'Job queue is full ({pending} pending)')
+        self.retry_after = RETRY_AFTER
+
+
+class JobQueue:
+    """
+    SQLite-backed priority job queue.
+
+    Args:
+        db_path: SQLite database file
+        max_pending: Queued + running jobs accepted before submit refuses
+        max_attempts: Runs per job before it is marked failed
+    """
+
+    def __init__(self, db_path: str, max_pending: int = 1000, max_attempts: int = 3):
+        self.db_path = db_path
+        self.max_pending = max_pending
+        self.max_attempts = max_attempts
+        self._local = threading.local()
+        self._listeners = []
+        self._finished = 0
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._reset_after_fork)
+
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn().executescript(SCHEMA)
+
+    def _reset_after_fork(self):
+        # SQLite connections must not be used across fork; reopen on demand
+        self._local = threading.local()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode = WAL')
+            conn.execute('PRAGMA synchronous = NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def on_submit(self, callback):
+        """Call callback() after every local submit (wakes idle workers)"""
+        self._listeners.append(callback)
+
+    def submit(self, kind: str, payload) -> dict:
+        """
+        Queue a job.
+
+        Args:
+            kind: Registered job kind
+            payload: JSON-serializable job input
+
+        Returns:
+            The new job's status dict
+
+        Raises:
+            ValueError: Unknown kind or invalid payload
+            QueueFull: Too many jobs pending
+        """
+        if kind not in JOB_KINDS:
+            raise ValueError(f'Unknown job kind: {kind}')
+        _, prepare = JOB_KINDS[kind]
+        priority = prepare(payload) if prepare else PRIORITY_NORMAL
+
+        conn = self._conn()
+        pending = conn.execute(
+            "SELECT COUNT(*) FROM jobs WHERE status IN ('queued', 'running')"
+        ).fetchone()[0]
+        if pending >= self.max_pending:
+            raise QueueFull(pending)
+
+        now = time.time()
+        job_id = new_job_id()
+        conn.execute(
+            'INSERT INTO jobs (id, kind, priority, status, payload, created_at, run_after) '
+            "VALUES (?, ?, ?, 'queued', ?, ?, ?)",
+            (job_id, kind, priority, json.dumps(payload), now, now)
+        )
+        for callback in self._listeners:
+            callback()
+        return self.get(job_id)
+
+    def get(self, job_id: str, include_result: bool = False) -> dict | None:
+        row = self._conn().execute(
+            'SELECT id, kind, priority, status, attempts, error, created_at, started_at, '
+            'finished_at, result FROM jobs WHERE id = ?',
+            (job_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        job = {
+            'job_id': row[0],
+            'kind': row[1],
+            'priority': row[2],
+            'status': row[3],
+            'attempts': row[4],
+            'error': row[5],
+            'created_at': _iso(row[6]),
+            'started_at': _iso(row[7]),
+            'finished_at': _iso(row[8]),
+        }
+        if include_result and row[9] is not None:
+            job['result'] = json.loads(row[9])
+        return job
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a job that has not started yet"""
+        return self._conn().execute(
+            "UPDATE jobs SET status = 'cancelled', finished_at = ? WHERE id = ? AND status = 'queued'",
+            (time.time(), job_id)
+        ).rowcount > 0
+
+    def claim(self) -> tuple | None:
+        """
+        Lease the most urgent ready job.
+
+        Returns:
+            (id, kind, payload, attempts, lease_until) or None when no job
+            is ready; attempts and lease_until identify this lease
+        """
+        conn = self._conn()
+        now = time.time()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            # Jobs whose worker died mid-run go back to the queue (or fail
+            # for good when they already used up their attempts)
+            conn.execute(
+                "UPDATE jobs SET status = 'failed', error = 'Worker lease expired', finished_at = ? "
+                "WHERE status = 'running' AND lease_until < ? AND attempts >= ?",
+                (now, now, self.max_attempts)
+            )
+            conn.execute(
+                "UPDATE jobs SET status = 'queued' WHERE status = 'running' AND lease_until < ?",
+                (now,)
+            )
+            row = conn.execute(
+                "SELECT id, kind, payload, attempts FROM jobs WHERE status = 'queued' AND run_after <= ? "
+                'ORDER BY priority, seq LIMIT 1',
+                (now,)
+            ).fetchone()
+            if row is not None:
+                conn.execute(
+                    "UPDATE jobs SET status = 'running', attempts = attempts + 1, "
+                    'started_at = ?, lease_until = ? WHERE id = ?',
+                    (now, now + JOB_LEASE, row[0])
+                )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return (row[0], row[1], json.loads(row[2]), row[3] + 1, now + JOB_LEASE) if row else None
+
+    def run_one(self) -> bool:
+        """Claim and run one job; returns False when none was ready"""
+        claimed = self.claim()
+        if claimed is None:
+            return False
+        job_id, kind, payload, attempts, lease_until = claimed
+        # Only finish the job while this run still holds its lease; after the
+        # lease expired another worker may have taken it over (or failed it)
+        lease = (job_id, attempts, lease_until)
+        conn = self._conn()
+        try:
+            handler, _ = JOB_KINDS[kind]
+            result = json.dumps(handler(payload))
+        except Exception as e:
+            if attempts < self.max_attempts:
+                outcome = 'retry'
+                updated = conn.execute(
+                    "UPDATE jobs SET status = 'queued', error = ?, run_after = ?, lease_until = NULL "
+                    "WHERE id = ? AND status = 'running' AND attempts = ? AND lease_until = ?",
+                    (str(e), time.time() + min(MAX_BACKOFF, 2 ** attempts), *lease)
+                ).rowcount
+            else:
+                outcome = 'failed'
+                updated = conn.execute(
+                    "UPDATE jobs SET status = 'failed', error = ?, finished_at = ?, lease_until = NULL "
+                    "WHERE id = ? AND status = 'running' AND attempts = ? AND lease_until = ?",
+                    (str(e), time.time(), *lease)
+                ).rowcount
+        else:
+            outcome = 'done'
+            updated = conn.execute(
+                "UPDATE jobs SET status = 'done', result = ?, error = NULL, finished_at = ?, "
+                "lease_until = NULL WHERE id = ? AND status = 'running' AND attempts = ? AND lease_until = ?",
+                (result, time.time(), *lease)
+            ).rowcount
+
+        if not updated:
+            outcome = 'lease_lost'
+            logger.warning('Job %s (%s) outlived its lease; result discarded', job_id, kind)
+        JOB_RUNS.inc(kind=kind, outcome=outcome)
+
+        self._finished += 1
+        if self._finished % 1000 == 0:
+            self.purge_finished()
+        return True
+
+    def purge_finished(self):
+        """Drop finished jobs older than RESULT_TTL"""
+        self._conn().execute(
+            "DELETE FROM jobs WHERE status IN ('done', 'failed', 'cancelled') AND finished_at < ?",
+            (time.time() - RESULT_TTL,)
+        )
+
+    def depth(self) -> dict:
+        """Number of jobs per status"""
+        return dict(self._conn().execute('SELECT status, COUNT(*) FROM jobs GROUP BY status'))
+
+
+class WorkerPool:
+    """
+    Threads that drain a JobQueue.
+
+    Idle threads wake on local submits and otherwise poll every
+    poll_interval seconds for jobs submitted by other processes.
+    """
+
+    def __init__(self, queue: JobQueue, workers: int = 2, poll_interval: float = 0.5):
+        self.queue = queue
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._threads = []
+        queue.on_submit(self._wake.set)
+
+    def start(self) -> 'WorkerPool':
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f'job-worker-{i}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self, timeout: float | None = None):
+        self._stop.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                if self.queue.run_one():
+                    continue
+            except sqlite3.OperationalError:
+                # Database busy beyond the timeout; back off and retry
+                pass
+            except Exception:
+                # Never let one bad job (or row) kill the thread
+                logger.exception('Job worker error')
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+
+
+def _iso(timestamp: float | None) -> str | None:
+    return datetime.fromtimestamp(timestamp).isoformat() if timestamp is not None else None
+
+
+# ============================================
+# STANDALONE WORKERS
+# ============================================
+
+def _worker_process(db_path: str, threads: int, poll_interval: float):
+    # Under python -m this file is __main__; job kinds register with api.jobs
+    from . import jobs, tasks
+    queue = jobs.JobQueue(db_path, max_attempts=tasks.JOB_MAX_ATTEMPTS)
+    pool = jobs.WorkerPool(queue, workers=threads, poll_interval=poll_interval).start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pool.stop()
+
+
+def _terminate(signum, frame):
+    raise SystemExit(0)
+
+
+def main(argv=None) -> int:
+    from .tasks import JOBS_DB
+
+    parser = argparse.ArgumentParser(description='Run background job workers')
+    parser.add_argument('--db', default=JOBS_DB, help='jobs database (default: JOBS_DB)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='worker processes (default: all cores)')
+    parser.add_argument('--threads', type=int, default=1,
+                        help='threads per worker process (for I/O-bound AI jobs)')
+    parser.add_argument('--poll-interval', type=float, default=0.5)
+    args = parser.parse_args(argv)
+
+    processes = [
+        multiprocessing.Process(target=_worker_process, name=f'job-worker-{i}',
+                                args=(args.db, args.threads, args.poll_interval))
+        for i in range(args.workers)
+    ]
+    for process in processes:
+        process.start()
+    signal.signal(signal.SIGTERM, _terminate)
+    try:
+        for process in processes:
+            process.join()
+    except (KeyboardInterrupt, SystemExit):
+        # Jobs interrupted mid-run are retried once their lease expires
+        for process in processes:
+            process.terminate()
+            process.join()
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
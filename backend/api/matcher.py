@@ -0,0 +1,209 @@
+"""
+Multi-pattern keyword matcher for harassment analysis.
+
+Builds an Aho-Corasick automaton over every keyword in a pattern table
+so a message is scanned once, no matter how many keywords or categories
+the lexicon holds.
+
+Both keywords and messages go through `normalize.normalize` first, and a
+hit only counts when it starts on a word boundary and ends on one (or
+on an inflection such as "-ing"/"-ed"). That keeps "hot" out of "photo"
+and "harm" out of "pharmacy" while still catching "k1ll", "n u d e s"
+and "killlll", without an extra pass over the message.
+
+The automaton can be serialized (`to_dict` / `from_dict`) so the
+lexicon build step ships a precompiled artifact that the backend and the
+frontend load without rebuilding it at startup.
+"""
+from typing import Iterator, NamedTuple
+
+from .normalize import SUFFIXES, normalize, normalize_keyword, normalize_text
+
+
+class Match(NamedTuple):
+    """A single keyword hit. Offsets index into the original text."""
+    start: int
+    end: int
+    category: str
+    keyword: str
+
+
+class KeywordMatcher:
+    """
+    Aho-Corasick automaton over a {category: {'keywords': [...]}} table.
+
+    Build once (at import time) and reuse: construction is linear in the
+    total keyword length, and each scan is linear in the message length
+    plus the number of matches.
+    """
+
+    def __init__(self, patterns: dict):
+        # Pattern entries: (keyword, category), indexed by output ids
+        self.entries = []
+        # Length of each entry's normalized form, for boundary checks
+        self._lengths = []
+        # Number of normalized tokens each entry covers
+        self._words = []
+        # Category order is preserved so callers can report in table order
+        self.categories = list(patterns.keys())
+
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [()]
+
+        for category, data in patterns.items():
+            for keyword in data['keywords']:
+                keyword = keyword.lower()
+                normalized = normalize_keyword(keyword)
+                if not normalized:
+                    continue
+                self.entries.append((keyword, category))
+                self._lengths.append(len(normalized))
+                self._words.append(normalized.count(' ') + 1)
+                self._add(normalized, len(self.entries) - 1)
+
+        self._build_failure_links()
+
+    def to_dict(self) -> dict:
+        """Serializable form of the compiled automaton"""
+        cat_index = {cat: i for i, cat in enumerate(self.categories)}
+        return {
+            'categories': self.categories,
+            'keywords': [[keyword, cat_index[category], length]
+                         for (keyword, category), length in zip(self.entries, self._lengths)],
+            'goto': self._goto,
+            'fail': self._fail,
+            'out': [list(ids) for ids in self._out],
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'KeywordMatcher':
+        """Load an automaton produced by to_dict() without rebuilding it"""
+        matcher = cls.__new__(cls)
+        matcher.categories = list(data['categories'])
+        matcher.entries = [(keyword, matcher.categories[i]) for keyword, i, _ in data['keywords']]
+        matcher._lengths = [length for _, _, length in data['keywords']]
+        matcher._words = [normalize_keyword(keyword).count(' ') + 1 for keyword, _, _ in data['keywords']]
+        matcher._goto = data['goto']
+        matcher._fail = data['fail']
+        matcher._out = [tuple(ids) for ids in data['out']]
+        return matcher
+
+    def _add(self, keyword: str, entry_id: int):
+        state = 0
+        for ch in keyword:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(())
+            state = nxt
+        self._out[state] = self._out[state] + (entry_id,)
+
+    def _build_failure_links(self):
+        """Breadth-first pass computing failure links and merged outputs"""
+        goto, fail, out = self._goto, self._fail, self._out
+        queue = list(goto[0].values())
+        head = 0
+        while head < len(queue):
+            state = queue[head]
+            head += 1
+            for ch, nxt in goto[state].items():
+                queue.append(nxt)
+                f = fail[state]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                target = goto[f].get(ch, 0)
+                fail[nxt] = target if target != nxt else 0
+                if out[fail[nxt]]:
+                    out[nxt] = out[nxt] + out[fail[nxt]]
+
+    def _scan(self, text: str) -> Iterator[tuple[int, tuple]]:
+        """Yield (end_offset, entry_ids) for every state with outputs"""
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for i, ch in enumerate(text):
+            while True:
+                nxt = goto[state].get(ch)
+                if nxt is not None:
+                    state = nxt
+                    break
+                if state == 0:
+                    break
+                state = fail[state]
+            if out[state]:
+                yield i + 1, out[state]
+
+    def _hits(self, text: str) -> Iterator[tuple[int, int, int]]:
+        """Yield (start, end, entry_id) for whole-word hits in normalized text"""
+        lengths = self._lengths
+        size = len(text)
+        for end, ids in self._scan(text):
+            # Ends mid-token: only allowed when the rest is an inflection
+            if end < size and text[end] != ' ':
+                token_end = text.find(' ', end)
+                if text[end:token_end if token_end != -1 else size] not in SUFFIXES:
+                    continue
+            for entry_id in ids:
+                start = end - lengths[entry_id]
+                if start == 0 or text[start - 1] == ' ':
+                    yield start, end, entry_id
+
+    def find_tokens(self, text: str) -> tuple:
+        """
+        Find every keyword occurrence as a range of normalized tokens.
+
+        Linear in the message length plus the number of hits: hits arrive
+        ordered by end offset, so their tokens are found with a cursor
+        that only moves forward.
+
+        Args:
+            text: Message text (normalized internally)
+
+        Returns:
+            (NormalizedText, hits) where hits are (first_token, last_token,
+            entry_id) tuples ordered by last token. token_spans maps the
+            token indices back to the original text.
+        """
+        normalized = normalize(text)
+        starts = normalized.token_starts
+        words = self._words
+        hits = []
+        last = 0
+        for _, end, entry_id in self._hits(normalized.text):
+            while last + 1 < len(starts) and starts[last + 1] < end:
+                last += 1
+            hits.append((last - words[entry_id] + 1, last, entry_id))
+        return normalized, hits
+
+    def find_all(self, text: str) -> list:
+        """
+        Find every keyword occurrence, including overlapping ones.
+
+        Args:
+            text: Message text (normalized internally)
+
+        Returns:
+            List of Match tuples ordered by end offset. Offsets span the
+            whole original words, e.g. "K1LLING" for the keyword "kill".
+        """
+        normalized, hits = self.find_tokens(text)
+        spans = normalized.token_spans
+        entries = self.entries
+        return [
+            Match(spans[first][0], spans[last][1], entries[entry_id][1], entries[entry_id][0])
+            for first, last, entry_id in hits
+        ]
+
+    def find_categories(self, text: str) -> set:
+        """Return the set of categories with at least one keyword hit"""
+        found = set()
+        total = len(self.categories)
+        entries = self.entries
+        for _, _, entry_id in self._hits(normalize_text(text)):
+            found.add(entries[entry_id][1])
+            if len(found) == total:
+                break
+        return found
@@ -0,0 +1,209 @@
+"""
+In-process metrics for Digital Footprint Shield.
+
+A small, dependency-free registry of counters, gauges and latency
+histograms rendered in the Prometheus text format at GET /api/metrics.
+Each gunicorn worker keeps its own registry; scrape every worker (or
+run a single worker per port) to see the whole node.
+"""
+import functools
+import inspect
+import threading
+import time
+
+# Latency buckets in seconds (upper bounds; +Inf is implicit)
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _label_key(labels: dict) -> tuple:
+    return tuple(sorted(labels.items()))
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(key: tuple) -> str:
+    if not key:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in key) + '}'
+
+
+class Counter:
+    type_name = 'counter'
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(_label_key(labels), 0)
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            yield self.name, key, value
+
+
+class Gauge:
+    """Gauge whose value is read from a callback at scrape time"""
+    type_name = 'gauge'
+
+    def __init__(self, name: str, help_text: str, callback):
+        self.name = name
+        self.help = help_text
+        self.callback = callback
+
+    def samples(self):
+        values = self.callback()
+        if isinstance(values, dict):
+            for labels, value in values.items():
+                yield self.name, labels, value
+        else:
+            yield self.name, (), values
+
+
+class Histogram:
+    type_name = 'histogram'
+
+    def __init__(self, name: str, help_text: str, buckets: tuple = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            counts = series[0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def count(self, **labels) -> int:
+        series = self._series.get(_label_key(labels))
+        return series[2] if series else 0
+
+    def samples(self):
+        with self._lock:
+            items = [(key, list(s[0]), s[1], s[2]) for key, s in self._series.items()]
+        for key, counts, total, count in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                yield f'{self.name}_bucket', key + (('le', repr(bound)),), cumulative
+            yield f'{self.name}_bucket', key + (('le', '+Inf'),), count
+            yield f'{self.name}_sum', key, total
+            yield f'{self.name}_count', key, count
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, help_text: str) -> Counter:
+        return self._register(Counter(name, help_text))
+
+    def histogram(self, name: str, help_text: str, buckets: tuple = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help_text, buckets))
+
+    def gauge(self, name: str, help_text: str, callback) -> Gauge:
+        return self._register(Gauge(name, help_text, callback))
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)"""
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.append(f'# HELP {metric.name} {metric.help}')
+            lines.append(f'# TYPE {metric.name} {metric.type_name}')
+            for sample_name, key, value in metric.samples():
+                lines.append(f'{sample_name}{_format_labels(key)} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+# ============================================
+# METRICS
+# ============================================
+REQUEST_LATENCY = REGISTRY.histogram(
+    'dfs_http_request_duration_seconds', 'HTTP request latency by endpoint')
+REQUESTS = REGISTRY.counter(
+    'dfs_http_requests_total', 'HTTP requests by endpoint, method and status')
+STAGE_LATENCY = REGISTRY.histogram(
+    'dfs_stage_duration_seconds', 'Latency of instrumented hot-path stages')
+STAGE_ERRORS = REGISTRY.counter(
+    'dfs_stage_errors_total', 'Exceptions raised by instrumented stages')
+ANALYSIS_SEVERITY = REGISTRY.counter(
+    'dfs_analysis_severity_total', 'Analyzed messages by detected severity')
+ANALYSIS_CATEGORY = REGISTRY.counter(
+    'dfs_analysis_category_total', 'Detected harassment categories')
+ANALYSIS_SOURCE = REGISTRY.counter(
+    'dfs_analysis_source_total', 'Where each analysis result came from (cache/cluster/ai/keyword)')
+AI_FALLBACKS = REGISTRY.counter(
+    'dfs_ai_fallback_total', 'Messages that fell back to keyword analysis while AI was configured')
+AI_CALLS = REGISTRY.counter(
+    'dfs_ai_provider_calls_total', 'AI provider calls by provider and outcome')
+
+
+def timed(stage: str):
+    """Decorator recording a function's latency under dfs_stage_duration_seconds"""
+    def decorator(fn):
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await fn(*args, **kwargs)
+                except Exception:
+                    STAGE_ERRORS.inc(stage=stage)
+                    raise
+                finally:
+                    STAGE_LATENCY.observe(time.perf_counter() - start, stage=stage)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            except Exception:
+                STAGE_ERRORS.inc(stage=stage)
+                raise
+            finally:
+                STAGE_LATENCY.observe(time.perf_counter() - start, stage=stage)
+        return wrapper
+    return decorator
+
+
+def record_analysis(result: dict, source: str):
+    """Count severity, categories and result source for one analysis"""
+    ANALYSIS_SOURCE.inc(source=source)
+    ANALYSIS_SEVERITY.inc(severity=result.get('severity', 'unknown'))
+    for category in result.get('categories', []):
+        ANALYSIS_CATEGORY.inc(category=category)
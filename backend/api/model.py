@@ -6,25 +6,27 @@ AI INTEGRATION:
 To enable AI-powered analysis, set these environment variables:
 - OPENAI_API_KEY: Your OpenAI API key
 - ANTHROPIC_API_KEY: Your Anthropic API key
+- AI_PROVIDER=fake: Offline stand-in provider for local testing
 
 The code will automatically use AI if keys are present,
-otherwise falls back to keyword-based analysis.
+otherwise falls back to keyword-based analysis. See api/ai.py for
+deadlines, concurrency limits and circuit breaking.
 """
+import asyncio
+import json
 import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
-# Try to import AI libraries (optional)
-try:
-    import openai
-    OPENAI_AVAILABLE = True
-except ImportError:
-    OPENAI_AVAILABLE = False
-
-try:
-    import anthropic
-    ANTHROPIC_AVAILABLE = True
-except ImportError:
-    ANTHROPIC_AVAILABLE = False
+from .ai import build_analyzer_from_env
+from .cache import AnalysisCache
+from .clustering import MessageClusters, signature
+from .conversations import ConversationStore
+from .matcher import KeywordMatcher
+from .metrics import AI_FALLBACKS, REGISTRY, record_analysis, timed
+from .severity import SeverityScorer
+from .templates import TemplateEngine
 
 
 # ============================================
@@ -55,39 +57,97 @@ RISK_MESSAGES = {
 # ============================================
 # HARASSMENT PATTERNS (for keyword analysis)
 # ============================================
+# Generated from lexicon/harassment_lexicon.json by lexicon/build_lexicon.py.
+# The frontend loads the same artifact, so client and server agree.
+MATCHER_ARTIFACT = os.path.join(os.path.dirname(__file__), 'harassment_matcher.json')
+
+
+def _load_matcher_artifact(path: str) -> dict:
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+_artifact = _load_matcher_artifact(MATCHER_ARTIFACT)
+
 HARASSMENT_PATTERNS = {
-    'threats': {
-        'keywords': ['kill', 'hurt', 'harm', 'attack', 'find you', 'coming for', 
-                     'destroy', 'ruin', 'end you', 'make you pay'],
-        'weight': 5
-    },
-    'sexual': {
-        'keywords': ['sexy', 'nudes', 'naked', 'body', 'send pics', 'hot'],
-        'weight': 4
-    },
-    'stalking': {
-        'keywords': ['watching', 'following', 'know where', 'saw you', 
-                     'your house', 'tracked'],
-        'weight': 5
-    },
-    'insults': {
-        'keywords': ['ugly', 'stupid', 'worthless', 'pathetic', 'loser', 
-                     'disgusting', 'idiot', 'trash'],
-        'weight': 2
-    },
-    'manipulation': {
-        'keywords': ['no one will believe', 'your fault', 'you made me', 
-                     'you owe me', 'you deserve', 'crazy'],
-        'weight': 3
-    },
-    'doxxing': {
-        'keywords': ['address', 'phone number', 'tell everyone', 'expose', 
-                     'your family', 'your friends will know'],
-        'weight': 4
-    },
+    category: {
+        'keywords': [kw for kw, cat, _ in _artifact['keywords'] if cat == i],
+        'weight': _artifact['weights'][i]
+    }
+    for i, category in enumerate(_artifact['categories'])
 }
 
+# Precompiled automaton: every message is scanned in a single pass
+HARASSMENT_MATCHER = KeywordMatcher.from_dict(_artifact)
+
+# Weighted scoring over every hit (term weights, repetition, proximity)
+SEVERITY_SCORER = SeverityScorer(HARASSMENT_MATCHER, _artifact['weights'], _artifact['scoring'])
+
+# Lexicon version; clients send it back to skip server re-analysis
+PATTERNS_VERSION = _artifact['patternsVersion']
+
+# Repeated (campaign) messages are analyzed once.
+# Set ANALYSIS_CACHE_DB to share hits between workers on the same node.
+ANALYSIS_CACHE = AnalysisCache(
+    PATTERNS_VERSION,
+    max_entries=int(os.environ.get('ANALYSIS_CACHE_SIZE', '10000')),
+    ttl=float(os.environ.get('ANALYSIS_CACHE_TTL', '3600')),
+    shared_path=os.environ.get('ANALYSIS_CACHE_DB') or None
+)
+
+REGISTRY.gauge(
+    'dfs_analysis_cache_lookups', 'Analysis cache lookups by result (cumulative)',
+    lambda: {
+        (('result', 'hit'),): ANALYSIS_CACHE.hits,
+        (('result', 'shared_hit'),): ANALYSIS_CACHE.shared_hits,
+        (('result', 'miss'),): ANALYSIS_CACHE.misses,
+    }
+)
+REGISTRY.gauge(
+    'dfs_analysis_cache_entries', 'Entries in the in-memory analysis cache',
+    lambda: len(ANALYSIS_CACHE._entries)
+)
+
+# Response templates are compiled once and rendered sets memoized per day
+RESPONSE_TEMPLATES = TemplateEngine()
+
+# Running per-conversation and per-sender threat state, updated one message
+# at a time. Set CONVERSATION_DB to persist it across restarts and workers.
+CONVERSATIONS = ConversationStore(
+    {category: data['weight'] for category, data in HARASSMENT_PATTERNS.items()},
+    max_entries=int(os.environ.get('CONVERSATION_STORE_SIZE', '10000')),
+    ttl=float(os.environ.get('CONVERSATION_TTL', '86400')),
+    half_life=float(os.environ.get('CONVERSATION_HALF_LIFE', '3600')),
+    persist_path=os.environ.get('CONVERSATION_DB') or None
+)
+
+REGISTRY.gauge(
+    'dfs_conversation_states', 'Live conversation and sender states (in memory or CONVERSATION_DB)',
+    lambda: len(CONVERSATIONS)
+)
+
+# Near-duplicate messages (pile-ons) share one AI analysis per cluster
+MESSAGE_CLUSTERS = MessageClusters(
+    max_clusters=int(os.environ.get('MESSAGE_CLUSTER_SIZE', '10000'))
+)
+
+REGISTRY.gauge(
+    'dfs_message_clusters', 'Near-duplicate message clusters held in memory',
+    lambda: len(MESSAGE_CLUSTERS)
+)
 
+# Lowest keyword score of each severity, for analyses without a score (AI)
+SEVERITY_SCORES = {'low': 0, 'medium': 2, 'high': 5, 'severe': 8}
+
+
+# Precomputed once: per-category maximum, in first-seen category order
+CATEGORY_MAX = {}
+for _q in QUESTIONS:
+    CATEGORY_MAX[_q['category']] = CATEGORY_MAX.get(_q['category'], 0) + _q['weight']
+TOTAL_MAX = sum(CATEGORY_MAX.values())
+
+
+@timed('calculate_safety_score')
 def calculate_safety_score(answers: dict) -> dict:
     """
     Calculate safety score from assessment answers.
@@ -98,18 +158,10 @@ def calculate_safety_score(answers: dict) -> dict:
     Returns:
         Dict with overall score, category breakdown, and risk areas
     """
-    category_scores = {}
-    category_max = {}
+    category_scores = dict.fromkeys(CATEGORY_MAX, 0)
     risk_areas = []
     
     for q in QUESTIONS:
-        cat = q['category']
-        if cat not in category_scores:
-            category_scores[cat] = 0
-            category_max[cat] = 0
-        
-        category_max[cat] += q['weight']
-        
         answer = answers.get(q['id'])
         if answer is None:
             continue
@@ -118,22 +170,21 @@ def calculate_safety_score(answers: dict) -> dict:
         is_safe = answer if q['invert'] else not answer
         
         if is_safe:
-            category_scores[cat] += q['weight']
+            category_scores[q['category']] += q['weight']
         elif q['weight'] >= 3 and q['id'] in RISK_MESSAGES:
             risk_areas.append(RISK_MESSAGES[q['id']])
     
     # Calculate percentages
     categories = {}
-    for cat in category_scores:
-        if category_max[cat] > 0:
-            categories[cat] = round((category_scores[cat] / category_max[cat]) * 100)
+    for cat, max_score in CATEGORY_MAX.items():
+        if max_score > 0:
+            categories[cat] = round((category_scores[cat] / max_score) * 100)
         else:
             categories[cat] = 100
     
     # Calculate overall
     total_score = sum(category_scores.values())
-    total_max = sum(category_max.values())
-    overall = round((total_score / total_max) * 100) if total_max > 0 else 50
+    overall = round((total_score / TOTAL_MAX) * 100) if TOTAL_MAX > 0 else 50
     
     return {
         'overall': overall,
@@ -143,6 +194,40 @@ def calculate_safety_score(answers: dict) -> dict:
     }
 
 
+_scoring_model = None
+
+
+def get_scoring_model():
+    """
+    Compile QUESTIONS into a vectorized ScoringModel on first use.
+    Returns None when NumPy is not installed.
+    """
+    global _scoring_model
+    if _scoring_model is None:
+        from .scoring import NUMPY_AVAILABLE, ScoringModel
+        if not NUMPY_AVAILABLE:
+            return None
+        _scoring_model = ScoringModel(QUESTIONS, RISK_MESSAGES)
+    return _scoring_model
+
+
+def score_answer_sets(answer_sets: list) -> list:
+    """
+    Score many assessments at once.
+    
+    Args:
+        answer_sets: List of answer dicts (same shape as calculate_safety_score)
+    
+    Returns:
+        List of score results, in input order
+    """
+    model = get_scoring_model()
+    if model is None:
+        return [calculate_safety_score(answers) for answers in answer_sets]
+    return model.score_many(answer_sets)
+
+
+@timed('analyze_harassment_message')
 def analyze_harassment_message(message: str) -> dict:
     """
     Analyze a message for harassment patterns.
@@ -153,181 +238,329 @@ def analyze_harassment_message(message: str) -> dict:
     Returns:
         Dict with severity and detected categories
     """
+    cached = ANALYSIS_CACHE.get(message)
+    if cached is not None:
+        record_analysis(cached, 'cache')
+        return cached
+    
+    # Near-duplicates of a message the AI already analyzed reuse its result
+    sig = None
+    if get_ai_analyzer() is not None:
+        sig = signature(message)
+        cluster = MESSAGE_CLUSTERS.find(sig)
+        if cluster is not None:
+            record_analysis(cluster['analysis'], 'cluster')
+            return cluster['analysis']
+    
     # Try AI analysis first if available
     ai_result = _try_ai_analysis(message)
     if ai_result:
+        ANALYSIS_CACHE.put(message, ai_result)
+        MESSAGE_CLUSTERS.add(sig, ai_result)
+        record_analysis(ai_result, 'ai')
         return ai_result
     
-    # Fall back to keyword analysis
-    return _keyword_analysis(message)
+    # Fall back to keyword analysis. Only cache it when AI is not configured,
+    # so a temporary provider outage does not pin keyword results.
+    result = _keyword_analysis(message)
+    if get_ai_analyzer() is None:
+        ANALYSIS_CACHE.put(message, result)
+    else:
+        AI_FALLBACKS.inc()
+    record_analysis(result, 'keyword')
+    return result
 
 
-def _keyword_analysis(message: str) -> dict:
-    """Keyword-based harassment analysis"""
-    lower_message = message.lower()
-    detected = []
-    total_score = 0
-    
-    for category, data in HARASSMENT_PATTERNS.items():
-        if any(kw in lower_message for kw in data['keywords']):
-            detected.append(category)
-            total_score += data['weight']
-    
-    # Determine severity
-    if total_score >= 8:
-        severity = 'severe'
-    elif total_score >= 5:
-        severity = 'high'
-    elif total_score >= 2:
-        severity = 'medium'
+# Async callers (asgi.py) run CPU-bound keyword scoring and shared-cache
+# SQLite calls here, keeping the event loop free for in-flight AI calls
+SCORING_THREADS = int(os.environ.get('SCORING_THREADS', '4'))
+
+# Messages of one async batch analyzed concurrently
+BATCH_CONCURRENCY = int(os.environ.get('BATCH_CONCURRENCY', '64'))
+
+_scoring_pool = None
+
+
+def get_scoring_pool() -> ThreadPoolExecutor:
+    """Thread pool for blocking analysis work, created on first use"""
+    global _scoring_pool
+    if _scoring_pool is None:
+        _scoring_pool = ThreadPoolExecutor(max_workers=SCORING_THREADS,
+                                           thread_name_prefix='keyword-scoring')
+    return _scoring_pool
+
+
+async def _cache_call(fn, *args):
+    # The in-memory tier is cheap; only the shared SQLite tier can block
+    if ANALYSIS_CACHE.shared_path:
+        return await asyncio.get_running_loop().run_in_executor(get_scoring_pool(), fn, *args)
+    return fn(*args)
+
+
+@timed('analyze_harassment_message_async')
+async def analyze_harassment_message_async(message: str) -> dict:
+    """
+    Async counterpart of analyze_harassment_message.
+    
+    AI calls are awaited without holding a thread, and keyword scoring
+    runs on the scoring thread pool.
+    
+    Args:
+        message: The message text to analyze
+    
+    Returns:
+        Dict with severity and detected categories
+    """
+    cached = await _cache_call(ANALYSIS_CACHE.get, message)
+    if cached is not None:
+        record_analysis(cached, 'cache')
+        return cached
+    
+    analyzer = get_ai_analyzer()
+    if analyzer is not None:
+        sig = signature(message)
+        cluster = MESSAGE_CLUSTERS.find(sig)
+        if cluster is not None:
+            record_analysis(cluster['analysis'], 'cluster')
+            return cluster['analysis']
+        
+        ai_result = await analyzer.analyze_async(message)
+        if ai_result:
+            await _cache_call(ANALYSIS_CACHE.put, message, ai_result)
+            MESSAGE_CLUSTERS.add(sig, ai_result)
+            record_analysis(ai_result, 'ai')
+            return ai_result
+    
+    loop = asyncio.get_running_loop()
+    result = await loop.run_in_executor(get_scoring_pool(), _keyword_analysis, message)
+    if analyzer is None:
+        await _cache_call(ANALYSIS_CACHE.put, message, result)
     else:
-        severity = 'low'
+        AI_FALLBACKS.inc()
+    record_analysis(result, 'keyword')
+    return result
+
+
+@timed('keyword_analysis')
+def _keyword_analysis(message: str) -> dict:
+    """
+    Keyword-based harassment analysis.
     
-    return {
-        'severity': severity,
-        'categories': detected if detected else ['general harassment'],
-        'score': total_score
-    }
+    Returns:
+        Dict with severity, categories, score and the matched spans
+        (see severity.SeverityScorer)
+    """
+    return SEVERITY_SCORER.analyze(message)
 
 
-def _try_ai_analysis(message: str) -> dict | None:
+def keyword_evidence(analysis: dict) -> dict:
+    """
+    Score and matched spans of a keyword analysis, for highlighting.
+    
+    Returns:
+        Dict with score and matches; empty for AI and client analyses
     """
-    Attempt AI-powered analysis if API keys are available.
-    Returns None if AI is not available.
+    if 'matches' not in analysis:
+        return {}
+    return {'score': analysis['score'], 'matches': analysis['matches']}
+
+
+def message_score(analysis: dict) -> float:
+    """Numeric score of an analysis, derived from severity and categories when absent"""
+    if 'score' in analysis:
+        return analysis['score']
+    weights = sum(HARASSMENT_PATTERNS[c]['weight'] for c in analysis['categories'] if c in HARASSMENT_PATTERNS)
+    return max(weights, SEVERITY_SCORES.get(analysis['severity'], 0))
+
+
+def record_conversation_message(conversation_id: str, message: str, sender: str | None = None,
+                                timestamp: float | None = None) -> dict:
+    """
+    Analyze one new message and fold it into its conversation (and sender).
+    
+    Only the new message is analyzed; earlier messages live on as the
+    running aggregates in CONVERSATIONS.
+    
+    Args:
+        conversation_id: Conversation the message belongs to
+        message: The new message text
+        sender: Optional sender id, tracked across conversations
+        timestamp: Message time in epoch seconds (defaults to now)
+    
+    Returns:
+        Dict with the message analysis and updated conversation/sender summaries
     """
-    # Try OpenAI
-    openai_key = os.environ.get('OPENAI_API_KEY')
-    if openai_key and OPENAI_AVAILABLE:
-        try:
-            return _analyze_with_openai(message, openai_key)
-        except Exception as e:
-            print(f"OpenAI analysis failed: {e}")
-    
-    # Try Anthropic
-    anthropic_key = os.environ.get('ANTHROPIC_API_KEY')
-    if anthropic_key and ANTHROPIC_AVAILABLE:
-        try:
-            return _analyze_with_anthropic(message, anthropic_key)
-        except Exception as e:
-            print(f"Anthropic analysis failed: {e}")
-    
-    return None
-
-
-def _analyze_with_openai(message: str, api_key: str) -> dict:
+    analysis = analyze_harassment_message(message)
+    score = message_score(analysis)
+    result = {
+        'analysis': analysis,
+        'conversation': CONVERSATIONS.record(f'conversation:{conversation_id}', analysis, score, timestamp)
+    }
+    if sender:
+        result['sender'] = CONVERSATIONS.record(f'sender:{sender}', analysis, score, timestamp)
+    return result
+
+
+def client_analysis(analysis, lexicon_version) -> dict | None:
     """
-    Analyze message using OpenAI GPT.
+    Reuse a keyword analysis the client already computed.
+    
+    The frontend scores messages with the same compiled lexicon, so when
+    its lexicon version matches ours (and no AI provider would give a
+    different answer) the server can skip re-analysis.
     
-    Uncomment and configure for production use.
+    Returns:
+        Validated {'severity', 'categories'} dict, or None to re-analyze
     """
-    # client = openai.OpenAI(api_key=api_key)
-    # response = client.chat.completions.create(
-    #     model="gpt-3.5-turbo",
-    #     messages=[
-    #         {
-    #             "role": "system",
-    #             "content": "You analyze messages for harassment. Return JSON with: severity (low/medium/high/severe), categories (array of: threats, sexual, stalking, insults, manipulation, doxxing)"
-    #         },
-    #         {
-    #             "role": "user",
-    #             "content": f"Analyze this message: {message}"
-    #         }
-    #     ],
-    #     response_format={"type": "json_object"}
-    # )
-    # return json.loads(response.choices[0].message.content)
-    
-    # Placeholder - returns None to fall back to keyword analysis
-    return None
-
-
-def _analyze_with_anthropic(message: str, api_key: str) -> dict:
+    if lexicon_version != PATTERNS_VERSION or get_ai_analyzer() is not None:
+        return None
+    if not isinstance(analysis, dict):
+        return None
+    
+    severity = analysis.get('severity')
+    categories = analysis.get('categories')
+    if severity not in ('low', 'medium', 'high', 'severe') or not isinstance(categories, list):
+        return None
+    known = set(HARASSMENT_PATTERNS) | {'general harassment'}
+    if not categories or not all(isinstance(c, str) and c in known for c in categories):
+        return None
+    
+    return {'severity': severity, 'categories': categories}
+
+
+def find_keyword_matches(message: str) -> list:
     """
-    Analyze message using Anthropic Claude.
+    Locate every harassment keyword in a message.
+    
+    Args:
+        message: The message text to scan
     
-    Uncomment and configure for production use.
+    Returns:
+        List of dicts with start/end offsets, category and keyword
+    """
+    return [match._asdict() for match in HARASSMENT_MATCHER.find_all(message)]
+
+
+_ai_analyzer = None
+_ai_analyzer_loaded = False
+
+
+def get_ai_analyzer():
+    """Build the AI analyzer from the environment on first use"""
+    global _ai_analyzer, _ai_analyzer_loaded
+    if not _ai_analyzer_loaded:
+        _ai_analyzer = build_analyzer_from_env(_keyword_analysis, _artifact['categories'])
+        _ai_analyzer_loaded = True
+    return _ai_analyzer
+
+
+def warm_up():
+    """
+    Build the lazily created analysis state now: the AI analyzer (which
+    imports the provider SDKs), the vectorized scoring model and today's
+    response templates.
+    """
+    get_ai_analyzer()
+    get_scoring_model()
+    RESPONSE_TEMPLATES.today()
+
+
+def _try_ai_analysis(message: str) -> dict | None:
     """
-    # client = anthropic.Anthropic(api_key=api_key)
-    # response = client.messages.create(
-    #     model="claude-3-haiku-20240307",
-    #     max_tokens=500,
-    #     messages=[
-    #         {
-    #             "role": "user",
-    #             "content": f"Analyze this message for harassment and return JSON with severity and categories: {message}"
-    #         }
-    #     ]
-    # )
-    # return json.loads(response.content[0].text)
-    
-    return None
-
-
-def generate_response_templates(message: str, analysis: dict) -> list:
+    Attempt AI-powered analysis if a provider is configured.
+    Returns None if AI is not available, too slow or failing.
+    """
+    analyzer = get_ai_analyzer()
+    if analyzer is None:
+        return None
+    return analyzer.analyze(message)
+
+
+def generate_response_templates(message: str, analysis: dict, date: str | None = None,
+                                locale: str = 'en') -> list:
     """
     Generate 4 response templates based on message analysis.
     
     Args:
         message: Original message
         analysis: Analysis result with severity and categories
+        date: Pre-formatted date for the legal template (defaults to today)
+        locale: Template pack ('en' or 'sw')
     
     Returns:
-        List of 4 response template objects
+        List of 4 response template objects (shared; do not mutate)
     """
-    severity = analysis['severity']
-    categories = analysis['categories']
-    date = datetime.now().strftime('%B %d, %Y')
-    
-    return [
-        {
-            'type': 'calm',
-            'text': _generate_calm_response(severity, categories),
-            'note': 'Use this to maintain composure and not escalate.'
-        },
-        {
-            'type': 'legal',
-            'text': _generate_legal_response(severity, categories, date),
-            'note': 'Use if you may need to involve authorities.'
-        },
-        {
-            'type': 'supportive',
-            'text': _generate_supportive_response(severity, categories),
-            'note': 'Use when communicating with friends/family.'
-        },
-        {
-            'type': 'report',
-            'text': _generate_report_response(severity, categories),
-            'note': 'Use as a template when reporting to the platform.'
-        }
-    ]
+    return RESPONSE_TEMPLATES.render(analysis['severity'], analysis['categories'], locale, date)
 
 
-def _generate_calm_response(severity: str, categories: list) -> str:
-    if severity == 'severe' or 'threats' in categories:
-        return "I'm not going to engage with this type of communication. I'm documenting this message and will not respond further."
+def analyze_message_batch(messages: list, locale: str = 'en'):
+    """
+    Analyze many messages and generate response templates for each.
     
-    if 'manipulation' in categories:
-        return "I understand you're upset, but I won't accept responsibility for your behavior. I'm choosing not to continue this conversation."
+    The template date is fixed for the whole batch and each message
+    gets a single matcher pass.
     
-    return "I've received your message. I don't believe this type of communication is helpful. If you'd like to have a respectful conversation, I'm open to that."
-
-
-def _generate_legal_response(severity: str, categories: list, date: str) -> str:
-    if severity == 'severe' or 'threats' in categories or 'stalking' in categories:
-        return f"This message, received on {date}, contains concerning content that I am documenting for potential legal purposes. Continued contact of this nature may be considered harassment under applicable laws. I am retaining all evidence."
+    Args:
+        messages: List of message strings
+        locale: Template pack ('en' or 'sw')
+    
+    Yields:
+        One result dict per message, in input order
+    """
+    date = RESPONSE_TEMPLATES.today(locale)
     
-    return f"I am formally requesting that you cease this type of communication. This message has been documented as of {date}. Continued unwanted contact may be considered harassment."
+    for index, message in enumerate(messages):
+        if not isinstance(message, str):
+            yield {'index': index, 'error': 'Message must be a string'}
+            continue
+        
+        analysis = analyze_harassment_message(message)
+        yield {
+            'index': index,
+            'severity': analysis['severity'],
+            'categories': analysis['categories'],
+            'responses': generate_response_templates(message, analysis, date, locale)
+        }
 
 
-def _generate_supportive_response(severity: str, categories: list) -> str:
-    cat_str = ' and '.join(categories)
+async def analyze_message_batch_async(messages: list, locale: str = 'en',
+                                      concurrency: int = BATCH_CONCURRENCY):
+    """
+    Async counterpart of analyze_message_batch.
     
-    if severity == 'severe':
-        return f"I need to share something concerning with you. I've been receiving harassing messages that include {cat_str}. I've been documenting everything and may need support in deciding next steps."
+    Up to `concurrency` messages are analyzed at once; results are still
+    yielded in input order.
     
-    return f"I've been receiving some uncomfortable messages and wanted to share this with you. I'm handling it by not responding and documenting."
-
-
-def _generate_report_response(severity: str, categories: list) -> str:
-    cat_str = ', '.join(categories)
-    return f"I am reporting a user for harassment. The message(s) I received contain {cat_str}. This communication was unwanted and makes me feel unsafe. I am attaching screenshots as evidence."
+    Args:
+        messages: List of message strings
+        locale: Template pack ('en' or 'sw')
+        concurrency: Messages in flight at a time
+    
+    Yields:
+        One result dict per message, in input order
+    """
+    date = RESPONSE_TEMPLATES.today(locale)
+    
+    async def analyze(index, message):
+        if not isinstance(message, str):
+            return {'index': index, 'error': 'Message must be a string'}
+        analysis = await analyze_harassment_message_async(message)
+        return {
+            'index': index,
+            'severity': analysis['severity'],
+            'categories': analysis['categories'],
+            'responses': generate_response_templates(message, analysis, date, locale)
+        }
+    
+    pending = deque()
+    try:
+        for index, message in enumerate(messages):
+            pending.append(asyncio.ensure_future(analyze(index, message)))
+            if len(pending) >= concurrency:
+                yield await pending.popleft()
+        while pending:
+            yield await pending.popleft()
+    finally:
+        # Consumer went away (e.g. client disconnected mid-stream)
+        for task in pending:
+            task.cancel()
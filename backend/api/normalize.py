@@ -0,0 +1,222 @@
+"""
+Text normalization for keyword matching.
+
+Turns a message into a stream of normalized word tokens so keywords are
+matched on whole words, and common evasions still match:
+
+- case and Unicode confusables:  "КILL", "kíll"   -> "kil"
+- leetspeak:                     "k1ll", "h0t"    -> "kil", "hot"
+- de-spacing:                    "n u d e s"      -> "nudes"
+- repeated characters:           "killlll"        -> "kil"
+
+Keywords go through the same function, so repeat-collapsing ("kill" ->
+"kil") is applied symmetrically. `normalize_text` (used on the hot path)
+is a handful of whole-string translate/regex passes that run in C;
+`normalize` additionally tracks where each token came from, for callers
+that need offsets. Both are linear in message length.
+
+The tables below are also written into the compiled matcher artifact so
+the frontend normalizes exactly the same way.
+"""
+import re
+import unicodedata
+from typing import NamedTuple
+
+# Leetspeak / symbol substitutions applied inside tokens
+LEET_MAP = {
+    '0': 'o', '1': 'i', '3': 'e', '4': 'a', '5': 's', '7': 't', '8': 'b',
+    '@': 'a', '$': 's', '!': 'i', '|': 'i', '+': 't',
+}
+
+# Look-alike letters from other scripts (after NFKD and mark stripping)
+CONFUSABLES = {
+    'а': 'a', 'в': 'b', 'е': 'e', 'ё': 'e', 'к': 'k', 'м': 'm', 'н': 'h',
+    'о': 'o', 'р': 'p', 'с': 'c', 'т': 't', 'у': 'y', 'х': 'x', 'і': 'i',
+    'ј': 'j', 'ѕ': 's', 'ԁ': 'd', 'ɡ': 'g', 'ı': 'i', 'ł': 'l', 'ø': 'o',
+    'α': 'a', 'β': 'b', 'ε': 'e', 'η': 'n', 'ι': 'i', 'κ': 'k', 'ν': 'v',
+    'ο': 'o', 'ρ': 'p', 'τ': 't', 'υ': 'u', 'χ': 'x',
+}
+
+# Symbols that can stand for letters; trimmed from token edges ("kill!!")
+SYMBOLS = '@$!|+'
+APOSTROPHES = "'’"
+
+# Inflections allowed after a keyword ("kill" also matches "killing")
+SUFFIXES = ('s', 'es', 'd', 'ed', 'ing', 'er', 'ers', 'est')
+
+# At least this many single-character tokens in a row are joined ("n u d e s")
+MIN_SPACED_RUN = 3
+
+_WORD_EXTRA = set('0123456789' + SYMBOLS + APOSTROPHES)
+_EDGE_CHARS = SYMBOLS + APOSTROPHES
+_LEET_TABLE = str.maketrans({**LEET_MAP, **{a: None for a in APOSTROPHES}})
+_REPEAT_RE = re.compile(r'(.)\1+')
+_TOKEN_RE = re.compile(r'\S+')
+_EDGE_RE = re.compile('[{}]+'.format(re.escape(_EDGE_CHARS)))
+# A symbol at the start or end of a token
+_EDGE_TOKEN_RE = re.compile(r'(?<!\S)[{0}]|[{0}](?!\S)'.format(re.escape(_EDGE_CHARS)))
+# A token from its first non-edge character on (all-symbol tokens are skipped)
+_CORE_RE = re.compile(r'[{0}]*([^\s{0}]\S*)'.format(re.escape(_EDGE_CHARS)))
+_SPACE_RE = re.compile(' ')
+# Expects single-spaced text padded with a space on both sides
+_SPACED_RE = re.compile(r' (\S(?: \S){%d,})(?= )' % (MIN_SPACED_RUN - 1))
+
+# ASCII fast path: lower-case letters, keep digits/symbols/apostrophes,
+# every other character becomes a separator
+_ASCII_TABLE = str.maketrans({
+    chr(i): (chr(i).lower() if chr(i).isalpha() or chr(i) in _WORD_EXTRA else ' ')
+    for i in range(128)
+})
+
+_fold_cache = {}
+
+
+class NormalizedText(NamedTuple):
+    """Normalized token stream plus where each token came from"""
+    text: str
+    token_starts: list    # offset of each token in `text`
+    token_spans: list     # (start, end) of each token in the original message
+
+
+def _fold_char(ch: str) -> str:
+    """Lower-case, decompose, drop marks and map confusables for one char"""
+    folded = _fold_cache.get(ch)
+    if folded is None:
+        parts = []
+        for c in unicodedata.normalize('NFKD', ch.lower()):
+            if unicodedata.category(c).startswith('M'):
+                continue
+            c = CONFUSABLES.get(c, c)
+            parts.append(c if c.isalpha() or c in _WORD_EXTRA else ' ')
+        folded = ''.join(parts)
+        if len(_fold_cache) < 65536:
+            _fold_cache[ch] = folded
+    return folded
+
+
+def _fold(text: str) -> str:
+    if text.isascii():
+        return text.translate(_ASCII_TABLE)
+    return ''.join(map(_fold_char, text))
+
+
+def _strip_edge(match) -> str:
+    # Symbol runs at a token edge are dropped; inner ones are leetspeak
+    text, (start, end) = match.string, match.span()
+    if start == 0 or text[start - 1] == ' ' or end == len(text) or text[end] == ' ':
+        return ''
+    return match.group()
+
+
+def _join_spaced(match) -> str:
+    return ' ' + match.group(1).replace(' ', '')
+
+
+def _collapse(match) -> str:
+    return match.group(1)
+
+
+def normalize_text(text: str) -> str:
+    """
+    Normalize a message for matching (text only, no offsets).
+
+    Args:
+        text: Raw message text
+
+    Returns:
+        Space-separated normalized tokens; identical to normalize(text).text
+    """
+    folded = _EDGE_RE.sub(_strip_edge, _fold(text)).translate(_LEET_TABLE)
+    padded = ' ' + ' '.join(folded.split()) + ' '
+    joined = _SPACED_RE.sub(_join_spaced, padded)[1:-1]
+    return _REPEAT_RE.sub(_collapse, joined)
+
+
+def normalize(text: str) -> NormalizedText:
+    """
+    Normalize a message for matching.
+
+    Args:
+        text: Raw message text
+
+    Returns:
+        NormalizedText with space-separated tokens and original spans
+    """
+    if text.isascii():
+        folded, origin = text.translate(_ASCII_TABLE), None
+    else:
+        parts = []
+        origin = []
+        for i, ch in enumerate(text):
+            piece = _fold_char(ch)
+            parts.append(piece)
+            origin.extend([i] * len(piece))
+        folded = ''.join(parts)
+
+    # Clean tokens, remembering original spans
+    if _EDGE_TOKEN_RE.search(folded) is None:
+        # Common case: no symbols to strip, so tokens are the whitespace runs
+        words = folded.translate(_LEET_TABLE).split()
+        spans = [m.span() for m in _TOKEN_RE.finditer(folded)]
+    else:
+        words, spans = [], []
+        for m in _CORE_RE.finditer(folded):
+            token = m.group(1).rstrip(_EDGE_CHARS)
+            start = m.start(1)
+            words.append(token.translate(_LEET_TABLE))
+            spans.append((start, start + len(token)))
+    if origin is not None:
+        spans = [(origin[start], origin[end - 1] + 1) for start, end in spans]
+
+    # Fast path: no spaced-out run to join, so tokens map one to one
+    padded = ' ' + ' '.join(words) + ' '
+    if _SPACED_RE.search(padded) is None:
+        joined = _REPEAT_RE.sub(_collapse, padded[1:-1])
+        starts = [0] + [m.end() for m in _SPACE_RE.finditer(joined)] if joined else []
+        return NormalizedText(joined, starts, spans)
+    tokens = [(word, start, end) for word, (start, end) in zip(words, spans)]
+
+    # Join runs of single characters ("n u d e s") and collapse repeats
+    out_tokens = []
+    spans = []
+    i = 0
+    n = len(tokens)
+    while i < n:
+        j = i
+        while j < n and len(tokens[j][0]) == 1:
+            j += 1
+        if j - i >= MIN_SPACED_RUN:
+            out_tokens.append(''.join(t[0] for t in tokens[i:j]))
+            spans.append((tokens[i][1], tokens[j - 1][2]))
+            i = j
+            continue
+        out_tokens.append(tokens[i][0])
+        spans.append((tokens[i][1], tokens[i][2]))
+        i += 1
+
+    starts = []
+    offset = 0
+    for k, token in enumerate(out_tokens):
+        token = _REPEAT_RE.sub(_collapse, token)
+        out_tokens[k] = token
+        starts.append(offset)
+        offset += len(token) + 1
+
+    return NormalizedText(' '.join(out_tokens), starts, spans)
+
+
+def normalize_keyword(keyword: str) -> str:
+    """Normalize a lexicon keyword exactly like message text"""
+    return normalize_text(keyword)
+
+
+def tables() -> dict:
+    """Normalization tables for the compiled artifact (frontend parity)"""
+    return {
+        'leet': LEET_MAP,
+        'confusables': CONFUSABLES,
+        'symbols': SYMBOLS,
+        'apostrophes': APOSTROPHES,
+        'suffixes': list(SUFFIXES),
+        'minSpacedRun': MIN_SPACED_RUN,
+    }
@@ -0,0 +1,74 @@
+"""
+Opt-in sampling profiler for individual requests.
+
+When PROFILE_SAMPLE_RATE is set (e.g. 0.01 for 1% of requests), or a
+request carries the X-Profile: 1 header while PROFILE_ENABLED=1, a
+background thread samples the request thread's Python stack every
+PROFILE_INTERVAL_MS milliseconds. The collapsed stacks are written to
+PROFILE_DIR as <time>-<endpoint>.folded, ready for flamegraph.pl or
+speedscope. Sampling keeps overhead low and independent of call depth.
+"""
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+
+PROFILE_ENABLED = os.environ.get('PROFILE_ENABLED') == '1'
+PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', '0'))
+PROFILE_INTERVAL_MS = float(os.environ.get('PROFILE_INTERVAL_MS', '5'))
+PROFILE_DIR = os.environ.get(
+    'PROFILE_DIR',
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'profiles')
+)
+
+
+def should_profile(header_value: str | None) -> bool:
+    if PROFILE_ENABLED and header_value == '1':
+        return True
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+
+class StackSampler:
+    """Samples one thread's stack on a timer until stopped"""
+
+    def __init__(self, thread_id: int, interval: float = PROFILE_INTERVAL_MS / 1000):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='request-profiler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            parts = []
+            while frame is not None:
+                code = frame.f_code
+                parts.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})')
+                frame = frame.f_back
+            self.stacks[';'.join(reversed(parts))] += 1
+
+    def stop(self) -> Counter:
+        self._stop.set()
+        self._thread.join()
+        return self.stacks
+
+    def dump(self, label: str) -> str | None:
+        """Write collapsed stacks to PROFILE_DIR; returns the file path"""
+        if not self.stacks:
+            return None
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        safe_label = ''.join(c if c.isalnum() else '_' for c in label)
+        path = os.path.join(PROFILE_DIR, f'{time.strftime("%Y%m%d-%H%M%S")}-{os.getpid()}-{safe_label}.folded')
+        with open(path, 'w') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f'{stack} {count}\n')
+        return path
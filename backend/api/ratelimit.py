@@ -0,0 +1,387 @@
+"""
+Per-client rate limiting and load shedding for the API.
+
+Two checks run before an expensive request is handled:
+
+- Load shedding: when more than MAX_IN_FLIGHT requests are already being
+  served on this node (all workers sharing RATE_LIMIT_DB), protected
+  endpoints are refused at once instead of queueing behind the backlog.
+- Rate limiting: every client (IP address) has a token bucket per
+  protected endpoint. Buckets refill continuously at the endpoint's rate
+  and allow short bursts; an empty bucket means the request is refused.
+
+Refused requests get 429 with a Retry-After header and are counted in
+dfs_rejected_requests_total. Buckets live in a small SQLite table
+(RATE_LIMIT_DB) so every gunicorn worker on a node enforces one shared
+limit; each check is a single atomic upsert. Each process publishes its
+in-flight count to the same file, and the node's depth is their sum. Set
+RATE_LIMIT_DB to an empty string to keep buckets and depth in process
+memory instead.
+
+A request stays in flight until its response is closed, so streamed
+bodies count for as long as they are being written. Sync gunicorn
+workers serve one request each, so the node depth never exceeds the
+worker count there; MAX_IN_FLIGHT matters for threaded (gthread) and
+async (asgi.py) workers.
+"""
+import math
+import os
+import sqlite3
+import threading
+import time
+
+from .metrics import REGISTRY
+
+RATE_LIMIT_DB = os.environ.get(
+    'RATE_LIMIT_DB',
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'ratelimit.db')
+)
+
+# Multiplies every endpoint's rate and burst; 0 disables rate limiting
+RATE_LIMIT_SCALE = float(os.environ.get('RATE_LIMIT_SCALE', '1'))
+
+# Requests in flight on the node before protected endpoints are shed (0: never)
+MAX_IN_FLIGHT = int(os.environ.get('MAX_IN_FLIGHT', '64'))
+
+# Reverse proxies in front of the app whose X-Forwarded-For entries are trusted
+TRUSTED_PROXIES = int(os.environ.get('TRUSTED_PROXIES', '0'))
+
+# Retry-After sent when a request is shed for load
+SHED_RETRY_AFTER = 1
+
+# Protected endpoints: (requests per minute, burst) per client
+RATE_LIMITS = {
+    'api.generate_responses': (60, 20),
+    'api.generate_responses_batch': (6, 3),
+    'api.save_incident': (30, 10),
+    'api.calculate_score': (60, 20),
+    'api.calculate_score_batch': (6, 3),
+    'api.add_conversation_message': (120, 30),
+    'api.submit_job': (30, 10),
+    'api.import_incidents_file': (6, 2),
+}
+
+# Buckets untouched this long are full again and can be dropped
+IDLE_TTL = 3600
+
+# Sweep idle buckets after this many checks
+PURGE_EVERY = 10000
+
+REJECTED = REGISTRY.counter('dfs_rejected_requests_total', 'Requests refused by admission control')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS rate_buckets (
+    key TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    updated REAL NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS in_flight (
+    pid INTEGER PRIMARY KEY,
+    requests INTEGER NOT NULL
+);
+"""
+
+# Refill, then take one token only if one is available. No row comes back
+# when the bucket is empty, so check-and-take is a single atomic statement.
+TAKE = """
+INSERT INTO rate_buckets (key, tokens, updated) VALUES (:key, :burst - 1, :now)
+ON CONFLICT (key) DO UPDATE SET
+    tokens = MIN(:burst, tokens + (:now - updated) * :rate) - 1,
+    updated = :now
+WHERE MIN(:burst, tokens + (:now - updated) * :rate) >= 1
+RETURNING tokens
+"""
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    # Checks run inline (also on the ASGI event loop): wait briefly, then fail open
+    conn = sqlite3.connect(path, timeout=0.1, isolation_level=None)
+    conn.execute('PRAGMA journal_mode = WAL')
+    # Bucket and depth state is disposable; losing the last writes on a crash is fine
+    conn.execute('PRAGMA synchronous = OFF')
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        # Exists but belongs to another user
+        return True
+    return True
+
+
+class TokenBucketLimiter:
+    """
+    Token buckets keyed by client and endpoint.
+
+    Args:
+        path: SQLite file shared between workers, or None for process memory
+        max_keys: In-memory buckets kept before idle ones are dropped
+    """
+
+    def __init__(self, path: str | None = None, max_keys: int = 100000):
+        self.path = path
+        self.max_keys = max_keys
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._checks = 0
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._reset_after_fork)
+
+    def _reset_after_fork(self):
+        # SQLite connections must not be used across fork; reopen on demand
+        self._local = threading.local()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = _connect(self.path)
+        return conn
+
+    def acquire(self, key: str, rate: float, burst: float, now: float | None = None) -> float:
+        """
+        Take one token from a bucket.
+
+        Args:
+            key: Bucket key (client and endpoint)
+            rate: Tokens added per second
+            burst: Bucket capacity
+            now: Current time in epoch seconds (defaults to now)
+
+        Returns:
+            0 when the request may proceed, otherwise seconds until a
+            token is available
+        """
+        now = time.time() if now is None else now
+        if self.path:
+            return self._acquire_shared(key, rate, burst, now)
+
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (burst, now))
+            tokens = min(burst, tokens + (now - updated) * rate)
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, now)
+                if len(self._buckets) > self.max_keys:
+                    self._purge_memory(now)
+                return 0.0
+            self._buckets[key] = (tokens, now)
+            return (1 - tokens) / rate
+
+    def _acquire_shared(self, key: str, rate: float, burst: float, now: float) -> float:
+        try:
+            conn = self._conn()
+            taken = conn.execute(TAKE, {'key': key, 'burst': burst, 'rate': rate, 'now': now}).fetchone()
+            if taken is not None:
+                self._checks += 1
+                if self._checks % PURGE_EVERY == 0:
+                    conn.execute('DELETE FROM rate_buckets WHERE updated < ?', (now - IDLE_TTL,))
+                return 0.0
+            row = conn.execute('SELECT tokens, updated FROM rate_buckets WHERE key = ?', (key,)).fetchone()
+        except sqlite3.OperationalError:
+            # Store busy or unavailable: fail open rather than refuse traffic
+            return 0.0
+        if row is None:
+            return 0.0
+        tokens = min(burst, row[0] + (now - row[1]) * rate)
+        return max(0.0, (1 - tokens) / rate)
+
+    def _purge_memory(self, now: float):
+        idle = [key for key, (_, updated) in self._buckets.items() if updated < now - IDLE_TTL]
+        for key in idle:
+            del self._buckets[key]
+        # Still over capacity: drop the oldest half
+        if len(self._buckets) > self.max_keys:
+            by_age = sorted(self._buckets, key=lambda key: self._buckets[key][1])
+            for key in by_age[:len(by_age) // 2]:
+                del self._buckets[key]
+
+
+class InFlightCounter:
+    """
+    Requests in flight across every process sharing a SQLite file.
+
+    Each process writes its own count to a row keyed by its pid, so
+    processes never contend on one counter and a count lost to a busy
+    store is corrected by the next write. Rows left behind by processes
+    that died mid-request are dropped when the total is read.
+
+    Args:
+        path: SQLite file shared between workers
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._reset_after_fork)
+
+    def _reset_after_fork(self):
+        # SQLite connections must not be used across fork; reopen on demand
+        self._local = threading.local()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = _connect(self.path)
+        return conn
+
+    def publish(self, requests: int):
+        """Record this process's current number of requests in flight"""
+        try:
+            self._conn().execute(
+                'INSERT INTO in_flight (pid, requests) VALUES (?, ?) '
+                'ON CONFLICT (pid) DO UPDATE SET requests = excluded.requests',
+                (os.getpid(), requests)
+            )
+        except sqlite3.OperationalError:
+            pass
+
+    def total(self) -> int | None:
+        """Requests in flight on the node, or None when the store is unavailable"""
+        try:
+            conn = self._conn()
+            rows = conn.execute('SELECT pid, requests FROM in_flight WHERE requests > 0').fetchall()
+            total = 0
+            for pid, requests in rows:
+                if pid != os.getpid() and not _alive(pid):
+                    conn.execute('DELETE FROM in_flight WHERE pid = ?', (pid,))
+                    continue
+                total += requests
+            return total
+        except sqlite3.OperationalError:
+            return None
+
+
+class AdmissionController:
+    """
+    Load shedding plus per-client rate limits for protected endpoints.
+
+    Args:
+        limiter: Token buckets, or None to disable rate limiting
+        limits: {endpoint: (requests per minute, burst)}
+        max_in_flight: Requests in flight before protected endpoints are shed
+        scale: Multiplier for every rate and burst
+        counter: Node-wide in-flight count, or None to shed on this process's count
+    """
+
+    def __init__(self, limiter: TokenBucketLimiter | None, limits: dict = RATE_LIMITS,
+                 max_in_flight: int = MAX_IN_FLIGHT, scale: float = 1.0,
+                 counter: InFlightCounter | None = None):
+        self.limiter = limiter
+        self.limits = {
+            endpoint: (per_minute * scale / 60, max(1.0, burst * scale))
+            for endpoint, (per_minute, burst) in limits.items()
+        }
+        self.max_in_flight = max_in_flight
+        self.counter = counter
+        self.in_flight = 0
+        self._lock = threading.Lock()
+        self._publish_lock = threading.Lock()
+        self._publish_pending = False
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._reset_after_fork)
+
+    def _reset_after_fork(self):
+        # A forked worker starts with none of the parent's requests
+        self._lock = threading.Lock()
+        self._publish_lock = threading.Lock()
+        self._publish_pending = False
+        self.in_flight = 0
+
+    def enter(self):
+        """Count a request as in flight (every endpoint, so depth reflects all load)"""
+        with self._lock:
+            self.in_flight += 1
+        self._publish()
+
+    def leave(self):
+        """Stop counting a request; call once its response has been closed"""
+        with self._lock:
+            self.in_flight -= 1
+        self._publish()
+
+    def _publish(self):
+        """
+        Write the current count to the shared store, outside the request lock.
+
+        One thread writes at a time; changes made while it writes are folded
+        into its next write instead of queueing their own. The flag is
+        re-checked after releasing, so the last write is always the current
+        count.
+        """
+        if self.counter is None:
+            return
+        self._publish_pending = True
+        while self._publish_pending and self._publish_lock.acquire(blocking=False):
+            try:
+                self._publish_pending = False
+                self.counter.publish(self.in_flight)
+            finally:
+                self._publish_lock.release()
+
+    def depth(self) -> int:
+        """Requests in flight on the node (this process's count without a shared store)"""
+        if self.counter is not None:
+            total = self.counter.total()
+            if total is not None:
+                return total
+        return self.in_flight
+
+    def check(self, endpoint: str, client: str) -> int | None:
+        """
+        Decide whether a request (already counted by enter) may proceed.
+
+        Returns:
+            None to admit, otherwise the Retry-After seconds for a 429
+        """
+        limit = self.limits.get(endpoint)
+        if limit is None:
+            return None
+
+        # The request itself is already counted in the depth
+        if self.max_in_flight and self.depth() > self.max_in_flight:
+            REJECTED.inc(endpoint=endpoint, reason='overload')
+            return SHED_RETRY_AFTER
+
+        if self.limiter is not None:
+            rate, burst = limit
+            wait = self.limiter.acquire(f'{client}|{endpoint}', rate, burst)
+            if wait > 0:
+                REJECTED.inc(endpoint=endpoint, reason='rate_limit')
+                return max(1, math.ceil(wait))
+        return None
+
+
+def client_address(remote_addr: str | None, forwarded_for: str | None) -> str:
+    """
+    The client's IP address.
+
+    X-Forwarded-For is only honoured for the TRUSTED_PROXIES hops added by
+    our own proxies; anything to the left of them is client-controlled.
+    """
+    if TRUSTED_PROXIES and forwarded_for:
+        hops = [hop.strip() for hop in forwarded_for.split(',') if hop.strip()]
+        if hops:
+            return hops[-min(TRUSTED_PROXIES, len(hops))]
+    return remote_addr or 'unknown'
+
+
+ADMISSION = AdmissionController(
+    TokenBucketLimiter(RATE_LIMIT_DB or None) if RATE_LIMIT_SCALE > 0 else None,
+    max_in_flight=MAX_IN_FLIGHT,
+    scale=RATE_LIMIT_SCALE or 1.0,
+    counter=InFlightCounter(RATE_LIMIT_DB) if RATE_LIMIT_DB and MAX_IN_FLIGHT else None
+)
+
+REGISTRY.gauge(
+    'dfs_requests_in_flight', 'Requests being served by this process',
+    lambda: ADMISSION.in_flight
+)
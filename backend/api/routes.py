@@ -4,42 +4,142 @@ Handles score calculation, response generation, and incident storage.
 """
 import json
 import os
+import threading
+import time
 from datetime import datetime
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, g, request, jsonify
 from .model import (
+    CONVERSATIONS,
+    RESPONSE_TEMPLATES,
     calculate_safety_score,
     analyze_harassment_message,
-    generate_response_templates
+    analyze_message_batch,
+    client_analysis,
+    generate_response_templates,
+    keyword_evidence,
+    record_conversation_message,
+    score_answer_sets,
+    warm_up as warm_up_model
 )
+from .ids import new_incident_id
+from .jobs import QueueFull
+from .metrics import REGISTRY, REQUEST_LATENCY, REQUESTS, timed
+from .profiler import StackSampler, should_profile
+from .ratelimit import ADMISSION, client_address
+from .storage import FILTER_COLUMNS, IncidentStore
+from .tasks import get_job_queue, start_job_workers
+from .transfer import EXPORT_FORMATS, import_incidents, read_incidents
 
 # Create blueprint
 api_bp = Blueprint('api', __name__)
 
-# Data storage path (simple JSON file for hackathon MVP)
+# Data storage: SQLite (WAL) database; incidents.json is migrated on first use
 DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data')
-INCIDENTS_FILE = os.path.join(DATA_DIR, 'incidents.json')
+INCIDENTS_FILE = os.environ.get('INCIDENTS_JSON', os.path.join(DATA_DIR, 'incidents.json'))
+INCIDENTS_DB = os.environ.get('INCIDENTS_DB', os.path.join(DATA_DIR, 'incidents.db'))
 
+_incident_store = None
 
-def ensure_data_dir():
-    """Ensure data directory exists"""
-    if not os.path.exists(DATA_DIR):
-        os.makedirs(DATA_DIR)
 
+def get_incident_store():
+    """Open the incident store once per process"""
+    global _incident_store
+    if _incident_store is None:
+        _incident_store = IncidentStore(INCIDENTS_DB, legacy_json_path=INCIDENTS_FILE)
+    return _incident_store
 
+
+def warm_up():
+    """
+    Prepare per-process state before the first request (see wsgi.create_app).
+    
+    Opens the incident store (schema, search index, legacy migration) and
+    builds the lazy analysis state. SQLite connections are reopened after a
+    fork, so this is safe to run in a gunicorn --preload master.
+    
+    Also starts the background job workers, except under gunicorn: its
+    master must not run threads across the fork, so every gunicorn worker
+    starts its own right after forking (gunicorn.conf.py).
+    """
+    get_incident_store()
+    warm_up_model()
+    if not os.environ.get('SERVER_SOFTWARE', '').startswith('gunicorn/'):
+        start_job_workers()
+
+
+@timed('load_incidents')
 def load_incidents():
-    """Load incidents from JSON file"""
-    ensure_data_dir()
-    if os.path.exists(INCIDENTS_FILE):
-        with open(INCIDENTS_FILE, 'r') as f:
-            return json.load(f)
-    return []
+    """Load all incidents from the store"""
+    return get_incident_store().all()
+
+
+# Largest batch returned as a single JSON document; bigger batches must stream
+MAX_BATCH_SIZE = 500
+
+# Largest page GET /incidents will return in one response
+MAX_PAGE_SIZE = 1000
+
+
+@api_bp.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+    g.profiler = None
+    if should_profile(request.headers.get('X-Profile')):
+        g.profiler = StackSampler(threading.get_ident()).start()
+
+
+@api_bp.before_request
+def admit_request():
+    """Shed load and enforce per-client rate limits (see ratelimit.py)"""
+    ADMISSION.enter()
+    g.admitted = True
+    retry_after = ADMISSION.check(
+        request.endpoint,
+        client_address(request.remote_addr, request.headers.get('X-Forwarded-For'))
+    )
+    if retry_after is not None:
+        response = jsonify({'error': 'Too many requests, please retry later'})
+        response.status_code = 429
+        response.headers['Retry-After'] = str(retry_after)
+        return response
+
+
+@api_bp.after_request
+def hold_admission(response):
+    # Streamed bodies are produced after the view returns; stay in flight
+    # until the server closes the response
+    if g.pop('admitted', False):
+        response.call_on_close(ADMISSION.leave)
+    return response
 
 
-def save_incidents(incidents):
-    """Save incidents to JSON file"""
-    ensure_data_dir()
-    with open(INCIDENTS_FILE, 'w') as f:
-        json.dump(incidents, f, indent=2)
+@api_bp.teardown_request
+def release_request(exc):
+    # Only still set when no response was finalized
+    if g.pop('admitted', False):
+        ADMISSION.leave()
+
+
+@api_bp.after_request
+def record_request_metrics(response):
+    endpoint = request.endpoint or 'unknown'
+    elapsed = time.perf_counter() - g.get('request_start', time.perf_counter())
+    REQUEST_LATENCY.observe(elapsed, endpoint=endpoint)
+    REQUESTS.inc(endpoint=endpoint, method=request.method, status=response.status_code)
+    
+    profiler = g.get('profiler')
+    if profiler is not None:
+        profiler.stop()
+        path = profiler.dump(endpoint)
+        if path:
+            response.headers['X-Profile-File'] = os.path.basename(path)
+    return response
+
+
+@api_bp.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus scrape endpoint for this worker"""
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
 
 
 @api_bp.route('/calculate-score', methods=['POST'])
@@ -79,6 +179,45 @@ def calculate_score():
         return jsonify({'error': str(e)}), 500
 
 
+@api_bp.route('/calculate-score/batch', methods=['POST'])
+def calculate_score_batch():
+    """
+    Score many assessments in one vectorized pass.
+    
+    Request body:
+    {
+        "answerSets": [
+            {"social_public": true, "two_factor": false, ...},
+            ...
+        ]
+    }
+    
+    Returns:
+    {
+        "results": [{"overall": 65, "categories": {...}, "riskAreas": [...], ...}, ...],
+        "count": 2
+    }
+    """
+    try:
+        data = request.get_json()
+        
+        if not data or not isinstance(data.get('answerSets'), list):
+            return jsonify({'error': 'Missing answerSets list in request body'}), 400
+        
+        answer_sets = data['answerSets']
+        if not all(isinstance(answers, dict) for answers in answer_sets):
+            return jsonify({'error': 'Each answer set must be an object'}), 400
+        
+        results = score_answer_sets(answer_sets)
+        return jsonify({
+            'results': results,
+            'count': len(results)
+        })
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
 @api_bp.route('/generate-responses', methods=['POST'])
 def generate_responses():
     """
@@ -86,9 +225,15 @@ def generate_responses():
     
     Request body:
     {
-        "message": "The harassment message text..."
+        "message": "The harassment message text...",
+        "analysis": {"severity": "high", "categories": [...]},   (optional)
+        "lexiconVersion": "...",                                   (optional)
+        "locale": "sw"                                   (optional, default "en")
     }
     
+    When the client already scored the message with the same compiled
+    lexicon (matching lexiconVersion), its analysis is reused as-is.
+    
     Returns:
     {
         "severity": "high",
@@ -98,7 +243,10 @@ def generate_responses():
             {"type": "legal", "text": "...", "note": "..."},
             {"type": "supportive", "text": "...", "note": "..."},
             {"type": "report", "text": "...", "note": "..."}
-        ]
+        ],
+        "score": 7.0,                                    (keyword analysis only)
+        "matches": [{"start": 0, "end": 4, "category": "threats",
+                     "keyword": "kill", "weight": 7.0}, ...]
     }
     """
     try:
@@ -108,17 +256,85 @@ def generate_responses():
             return jsonify({'error': 'Missing message in request body'}), 400
         
         message = data['message']
+        locale = data.get('locale', 'en')
+        if locale not in RESPONSE_TEMPLATES.locales:
+            return jsonify({'error': f'Unsupported locale: {locale}'}), 400
         
-        # Analyze the message
-        analysis = analyze_harassment_message(message)
+        # Analyze the message (unless the client already did, identically)
+        analysis = client_analysis(data.get('analysis'), data.get('lexiconVersion'))
+        if analysis is None:
+            analysis = analyze_harassment_message(message)
         
         # Generate response templates
-        responses = generate_response_templates(message, analysis)
+        responses = generate_response_templates(message, analysis, locale=locale)
         
         return jsonify({
             'severity': analysis['severity'],
             'categories': analysis['categories'],
-            'responses': responses
+            'responses': responses,
+            **keyword_evidence(analysis)
+        })
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@api_bp.route('/generate-responses/batch', methods=['POST'])
+def generate_responses_batch():
+    """
+    Analyze many messages (e.g. a captured comment thread) in one request.
+    
+    Request body:
+    {
+        "messages": ["first comment...", "second comment...", ...],
+        "locale": "sw"                                   (optional, default "en")
+    }
+    
+    Add ?stream=1 (or send Accept: application/x-ndjson) to receive one
+    JSON result per line as soon as it is ready instead of a single document.
+    A failure part-way through ends the stream with an {"error": ...} line.
+    
+    Returns:
+    {
+        "results": [
+            {"index": 0, "severity": "high", "categories": [...], "responses": [...]},
+            ...
+        ],
+        "count": 2
+    }
+    """
+    try:
+        data = request.get_json()
+        
+        if not data or not isinstance(data.get('messages'), list):
+            return jsonify({'error': 'Missing messages list in request body'}), 400
+        
+        messages = data['messages']
+        locale = data.get('locale', 'en')
+        if locale not in RESPONSE_TEMPLATES.locales:
+            return jsonify({'error': f'Unsupported locale: {locale}'}), 400
+        stream = (request.args.get('stream') in ('1', 'true') or
+                  request.accept_mimetypes.best == 'application/x-ndjson')
+        
+        if stream:
+            def generate():
+                try:
+                    for result in analyze_message_batch(messages, locale):
+                        yield json.dumps(result) + '\n'
+                except Exception as e:
+                    # Headers are already sent; report the failure in the body
+                    yield json.dumps({'error': str(e)}) + '\n'
+            return Response(generate(), mimetype='application/x-ndjson')
+        
+        if len(messages) > MAX_BATCH_SIZE:
+            return jsonify({
+                'error': f'Batch too large ({len(messages)} > {MAX_BATCH_SIZE}); use ?stream=1'
+            }), 413
+        
+        results = list(analyze_message_batch(messages, locale))
+        return jsonify({
+            'results': results,
+            'count': len(results)
         })
     
     except Exception as e:
@@ -142,8 +358,10 @@ def save_incident():
     Returns:
     {
         "success": true,
-        "incident_id": "inc_12345",
-        "message": "Incident saved successfully"
+        "incident_id": "inc_01HV6Z3K8QW4YB2N7T5RDEXA9M",
+        "message": "Incident saved successfully",
+        "cluster_id": "clu_01HV6Z3K8QW4YB2N7T5RDEXA9M",   (near-duplicate cluster)
+        "cluster_count": 12
     }
     """
     try:
@@ -154,7 +372,7 @@ def save_incident():
         
         # Create incident record
         incident = {
-            'id': f"inc_{datetime.now().strftime('%Y%m%d%H%M%S')}",
+            'id': new_incident_id(),
             'type': data.get('type', 'general'),
             'platform': data.get('platform', 'unknown'),
             'message': data.get('message', ''),
@@ -163,16 +381,17 @@ def save_incident():
             'timestamp': datetime.now().isoformat(),
         }
         
-        # Load existing incidents and append
-        incidents = load_incidents()
-        incidents.append(incident)
-        save_incidents(incidents)
+        cluster = get_incident_store().append(incident)
         
-        return jsonify({
+        result = {
             'success': True,
             'incident_id': incident['id'],
             'message': 'Incident saved successfully'
-        })
+        }
+        if cluster is not None:
+            result['cluster_id'] = cluster['id']
+            result['cluster_count'] = cluster['count']
+        return jsonify(result)
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -181,32 +400,251 @@ def save_incident():
 @api_bp.route('/incidents', methods=['GET'])
 def get_incidents():
     """
-    Retrieve all saved incidents.
+    Retrieve saved incidents.
+    
+    Query parameters (all optional):
+        platform, severity, type: exact-match filters
+        since, until: inclusive ISO timestamp range
+        cluster: only incidents in this near-duplicate cluster
+        limit: page size (enables pagination, max MAX_PAGE_SIZE)
+        cursor: next_cursor value from the previous page
+        order: "asc" (default, oldest first) or "desc"
+        format: "ndjson" to stream one incident per line
     
     Returns:
     {
         "incidents": [...],
-        "count": 5
+        "count": 5,
+        "next_cursor": "42"    (only when paginating and more may follow)
     }
     """
     try:
-        incidents = load_incidents()
-        return jsonify({
+        args = request.args
+        filters = {col: args[col] for col in FILTER_COLUMNS if args.get(col)}
+        descending = args.get('order', 'asc') == 'desc'
+        
+        try:
+            cursor = int(args['cursor']) if args.get('cursor') else None
+            limit = int(args['limit']) if args.get('limit') else None
+        except ValueError:
+            return jsonify({'error': 'cursor and limit must be integers'}), 400
+        
+        if limit is not None:
+            limit = max(1, min(limit, MAX_PAGE_SIZE))
+        
+        rows = get_incident_store().query(
+            filters,
+            since=args.get('since'),
+            until=args.get('until'),
+            cursor=cursor,
+            limit=limit,
+            descending=descending,
+            cluster_id=args.get('cluster')
+        )
+        
+        if args.get('format') == 'ndjson':
+            def generate():
+                for _, incident in rows:
+                    yield json.dumps(incident) + '\n'
+            return Response(generate(), mimetype='application/x-ndjson')
+        
+        incidents = []
+        last_seq = None
+        for last_seq, incident in rows:
+            incidents.append(incident)
+        
+        result = {
             'incidents': incidents,
             'count': len(incidents)
+        }
+        if limit is not None and len(incidents) == limit:
+            result['next_cursor'] = str(last_seq)
+        
+        return jsonify(result)
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@api_bp.route('/incidents/export', methods=['GET'])
+def export_incidents():
+    """
+    Stream incidents as a compressed backup file.
+
+    Query parameters (all optional):
+        format: "ndjson.gz" (default) or "dfsc" (columnar, see transfer.py)
+        platform, severity, type, since, until, cluster: as for GET /incidents
+
+    Returns:
+        The file, streamed in chunks (Content-Disposition: attachment)
+    """
+    try:
+        args = request.args
+        fmt = args.get('format', 'ndjson.gz')
+        if fmt not in EXPORT_FORMATS:
+            return jsonify({'error': f'Unsupported format: {fmt}'}), 400
+        writer, mimetype, extension = EXPORT_FORMATS[fmt]
+
+        rows = get_incident_store().query(
+            {col: args[col] for col in FILTER_COLUMNS if args.get(col)},
+            since=args.get('since'),
+            until=args.get('until'),
+            cluster_id=args.get('cluster')
+        )
+        filename = f"incidents-{datetime.now().strftime('%Y%m%d-%H%M%S')}{extension}"
+        return Response(
+            writer(incident for _, incident in rows),
+            mimetype=mimetype,
+            headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+        )
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@api_bp.route('/incidents/import', methods=['POST'])
+def import_incidents_file():
+    """
+    Import an export file (ndjson.gz, dfsc or plain NDJSON) as the request body.
+
+    The body is read in chunks and stored in batches. Incidents whose id
+    is already stored are skipped, so a failed import can be re-sent.
+
+    Returns:
+    {
+        "success": true,
+        "imported": 980,
+        "skipped": 20
+    }
+    """
+    try:
+        stats = import_incidents(get_incident_store(), read_incidents(request.stream))
+        if 'error' in stats:
+            return jsonify(dict(stats, success=False)), 400
+        return jsonify(dict(stats, success=True))
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@api_bp.route('/incidents/search', methods=['GET'])
+def search_incidents():
+    """
+    Full-text search over incident messages and notes.
+    
+    Query parameters:
+        q: search words (all must match; "word*" matches a prefix)
+        platform, severity, type: exact-match filters (optional)
+        limit: page size (default 20, max MAX_PAGE_SIZE)
+        offset: results to skip (default 0)
+    
+    Returns:
+    {
+        "results": [{"incident": {...}, "score": 3.17}, ...],   (best first)
+        "count": 20,
+        "total": 125,
+        "facets": {"platform": {"Instagram": 80, ...}, "severity": {...}, "type": {...}},
+        "truncated": false    (true: only the newest SEARCH_SCAN_LIMIT matches were
+                               ranked and counted)
+    }
+    """
+    try:
+        args = request.args
+        if not args.get('q', '').strip():
+            return jsonify({'error': 'Missing q query parameter'}), 400
+        
+        try:
+            limit = int(args.get('limit', 20))
+            offset = int(args.get('offset', 0))
+        except ValueError:
+            return jsonify({'error': 'limit and offset must be integers'}), 400
+        
+        store = get_incident_store()
+        if not store.search_enabled:
+            return jsonify({'error': 'Full-text search is not available on this server'}), 503
+        
+        try:
+            found = store.search(
+                args['q'],
+                {col: args[col] for col in FILTER_COLUMNS if args.get(col)},
+                limit=max(1, min(limit, MAX_PAGE_SIZE)),
+                offset=max(0, offset)
+            )
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        return jsonify({
+            'results': [{'incident': incident, 'score': score} for incident, score in found['results']],
+            'count': len(found['results']),
+            'total': found['total'],
+            'facets': found['facets'],
+            'truncated': found['truncated']
         })
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
+@api_bp.route('/clusters', methods=['GET'])
+def get_clusters():
+    """
+    Near-duplicate incident clusters, largest first.
+    
+    Query parameters (all optional):
+        min_count: smallest cluster size to include (default 2)
+        limit: page size (default 50, max MAX_PAGE_SIZE)
+        offset: clusters to skip (default 0)
+    
+    Returns:
+    {
+        "clusters": [{"id": "clu_...", "representative": "...", "count": 340,
+                      "first_seen": "...", "last_seen": "..."}, ...],
+        "count": 1
+    }
+    
+    Use GET /incidents?cluster=<id> for a cluster's incidents.
+    """
+    try:
+        args = request.args
+        try:
+            min_count = int(args.get('min_count', 2))
+            limit = int(args.get('limit', 50))
+            offset = int(args.get('offset', 0))
+        except ValueError:
+            return jsonify({'error': 'min_count, limit and offset must be integers'}), 400
+        
+        clusters = get_incident_store().clusters(
+            min_count=min_count,
+            limit=max(1, min(limit, MAX_PAGE_SIZE)),
+            offset=max(0, offset)
+        )
+        return jsonify({
+            'clusters': clusters,
+            'count': len(clusters)
+        })
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@api_bp.route('/clusters/<cluster_id>', methods=['GET'])
+def get_cluster(cluster_id):
+    """Summary of one near-duplicate incident cluster"""
+    try:
+        cluster = get_incident_store().cluster(cluster_id)
+        if cluster is None:
+            return jsonify({'error': f'Cluster {cluster_id} not found'}), 404
+        return jsonify(cluster)
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
 @api_bp.route('/incidents/<incident_id>', methods=['DELETE'])
 def delete_incident(incident_id):
     """Delete a specific incident"""
     try:
-        incidents = load_incidents()
-        incidents = [i for i in incidents if i['id'] != incident_id]
-        save_incidents(incidents)
+        get_incident_store().delete(incident_id)
         
         return jsonify({
             'success': True,
@@ -215,3 +653,196 @@ def delete_incident(incident_id):
     
     except Exception as e:
         return jsonify({'error': str(e)}), 500
+
+
+def _parse_timestamp(value) -> float | None:
+    """Epoch seconds from a number or an ISO 8601 string (None stays None)"""
+    if value is None:
+        return None
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    if isinstance(value, str):
+        return datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp()
+    raise ValueError('timestamp must be epoch seconds or an ISO 8601 string')
+
+
+@api_bp.route('/conversations/<conversation_id>/messages', methods=['POST'])
+def add_conversation_message(conversation_id):
+    """
+    Analyze a new message and update its conversation's running threat state.
+    
+    Only the new message is analyzed; the conversation keeps decay-weighted
+    per-category scores and flags escalation across messages.
+    
+    Request body:
+    {
+        "message": "The new message text...",
+        "sender": "user-123",                         (optional)
+        "timestamp": "2024-05-01T12:00:00Z"           (optional, default now)
+    }
+    
+    Returns:
+    {
+        "analysis": {"severity": "medium", "categories": [...], ...},
+        "conversation": {"severity": "high", "trend": "rising", "escalated": true, ...},
+        "sender": {...}                               (when sender is given)
+    }
+    """
+    try:
+        data = request.get_json()
+        
+        if not data or not isinstance(data.get('message'), str):
+            return jsonify({'error': 'Missing message in request body'}), 400
+        
+        try:
+            timestamp = _parse_timestamp(data.get('timestamp'))
+        except ValueError as e:
+            return jsonify({'error': f'Invalid timestamp: {e}'}), 400
+        
+        sender = data.get('sender')
+        return jsonify(record_conversation_message(
+            conversation_id, data['message'], str(sender) if sender else None, timestamp
+        ))
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@api_bp.route('/conversations/<conversation_id>', methods=['GET'])
+def get_conversation(conversation_id):
+    """Current threat state of a conversation"""
+    try:
+        summary = CONVERSATIONS.get(f'conversation:{conversation_id}')
+        if summary is None:
+            return jsonify({'error': f'Conversation {conversation_id} not found'}), 404
+        return jsonify(summary)
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@api_bp.route('/conversations/<conversation_id>', methods=['DELETE'])
+def delete_conversation(conversation_id):
+    """Forget a conversation's threat state"""
+    try:
+        if not CONVERSATIONS.forget(f'conversation:{conversation_id}'):
+            return jsonify({'error': f'Conversation {conversation_id} not found'}), 404
+        return jsonify({
+            'success': True,
+            'message': f'Conversation {conversation_id} deleted'
+        })
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@api_bp.route('/senders/<sender>', methods=['GET'])
+def get_sender(sender):
+    """Threat state of a sender across all their conversations"""
+    try:
+        summary = CONVERSATIONS.get(f'sender:{sender}')
+        if summary is None:
+            return jsonify({'error': f'Sender {sender} not found'}), 404
+        return jsonify(summary)
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@api_bp.route('/jobs', methods=['POST'])
+def submit_job():
+    """
+    Queue heavy analysis to run in the background.
+    
+    Request body:
+    {
+        "kind": "analyze_messages",        (or "calculate_scores", "analyze_evidence")
+        "payload": {"messages": ["...", ...], "locale": "en"}
+    }
+    
+    Batches containing a severe message run ahead of other work. Poll
+    GET /jobs/<job_id> for status and GET /jobs/<job_id>/result for the
+    output. Returns 503 with Retry-After while the queue is full.
+    
+    Returns (202):
+    {
+        "job_id": "job_...",
+        "kind": "analyze_messages",
+        "priority": 0,
+        "status": "queued",
+        ...
+    }
+    """
+    try:
+        data = request.get_json()
+        
+        if not data or 'kind' not in data:
+            return jsonify({'error': 'Missing kind in request body'}), 400
+        
+        try:
+            job = get_job_queue().submit(data['kind'], data.get('payload'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        except QueueFull as e:
+            response = jsonify({'error': str(e)})
+            response.headers['Retry-After'] = str(e.retry_after)
+            return response, 503
+        
+        return jsonify(job), 202
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@api_bp.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Status of a background job"""
+    try:
+        job = get_job_queue().get(job_id)
+        if job is None:
+            return jsonify({'error': f'Job {job_id} not found'}), 404
+        return jsonify(job)
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@api_bp.route('/jobs/<job_id>/result', methods=['GET'])
+def get_job_result(job_id):
+    """
+    Result of a finished job.
+    
+    Returns 200 with the job and its "result" once done, 202 while it is
+    queued or running, and 409 if it failed or was cancelled.
+    """
+    try:
+        job = get_job_queue().get(job_id, include_result=True)
+        if job is None:
+            return jsonify({'error': f'Job {job_id} not found'}), 404
+        if job['status'] in ('queued', 'running'):
+            return jsonify(job), 202
+        if job['status'] != 'done':
+            return jsonify(job), 409
+        return jsonify(job)
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@api_bp.route('/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    """Cancel a job that has not started yet"""
+    try:
+        queue = get_job_queue()
+        if not queue.cancel(job_id):
+            job = queue.get(job_id)
+            if job is None:
+                return jsonify({'error': f'Job {job_id} not found'}), 404
+            return jsonify({'error': f"Job {job_id} is {job['status']}"}), 409
+        return jsonify({
+            'success': True,
+            'message': f'Job {job_id} cancelled'
+        })
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
@@ -0,0 +1,146 @@
+"""
+Vectorized bulk safety scoring.
+
+Compiles the QUESTIONS table into NumPy weight / invert / category-index
+arrays once, then scores a whole matrix of answer sets in a handful of
+array operations. Used for re-scoring cohorts of assessments (e.g. after
+a weight change) where a per-row Python loop is far too slow.
+
+NumPy is optional: without it, bulk scoring falls back to calling the
+per-request scorer row by row.
+"""
+from datetime import datetime
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+# Matches the riskAreas cap in calculate_safety_score
+MAX_RISK_AREAS = 5
+
+
+class ScoringModel:
+    """
+    Precompiled scoring tables for one version of the question set.
+
+    Args:
+        questions: List of {'id', 'category', 'weight', 'invert'} dicts
+        risk_messages: Map of question id to risk-area message
+    """
+
+    def __init__(self, questions: list, risk_messages: dict):
+        if not NUMPY_AVAILABLE:
+            raise RuntimeError('NumPy is required for ScoringModel')
+
+        self.question_ids = [q['id'] for q in questions]
+        self.column = {qid: i for i, qid in enumerate(self.question_ids)}
+
+        # Categories in first-seen order, same as calculate_safety_score
+        self.categories = list(dict.fromkeys(q['category'] for q in questions))
+        cat_pos = {cat: i for i, cat in enumerate(self.categories)}
+
+        self.weights = np.array([q['weight'] for q in questions], dtype=np.float64)
+        self.invert = np.array([q['invert'] for q in questions], dtype=bool)
+        self.category_index = np.array([cat_pos[q['category']] for q in questions], dtype=np.intp)
+
+        # One-hot (questions x categories) so category sums are one matmul
+        self.category_onehot = np.zeros((len(questions), len(self.categories)))
+        self.category_onehot[np.arange(len(questions)), self.category_index] = 1.0
+        self.category_max = self.weights @ self.category_onehot
+        self.total_max = float(self.weights.sum())
+
+        self.risk_columns = np.array(
+            [q['weight'] >= 3 and q['id'] in risk_messages for q in questions], dtype=bool
+        )
+        self.risk_text = [risk_messages.get(qid) for qid in self.question_ids]
+
+    def encode(self, answer_sets: list) -> tuple:
+        """
+        Convert answer dicts into (answered, values) boolean matrices.
+
+        Unknown question ids are ignored; a None answer counts as unanswered.
+        """
+        n, m = len(answer_sets), len(self.question_ids)
+        answered = np.zeros((n, m), dtype=bool)
+        values = np.zeros((n, m), dtype=bool)
+        # Column at a time: one C-level list build per question
+        for col, qid in enumerate(self.question_ids):
+            raw = [answers.get(qid) for answers in answer_sets]
+            answered[:, col] = [answer is not None for answer in raw]
+            values[:, col] = [bool(answer) for answer in raw]
+        return answered, values
+
+    def score_matrix(self, answered, values) -> dict:
+        """
+        Score every row of an (n x questions) answer matrix at once.
+
+        Returns:
+            Dict of arrays: 'overall' (n,), 'categories' (n x categories)
+            and 'risk' (n x questions, True where a risk area applies)
+        """
+        safe = answered & (values == self.invert)
+        safe_weights = safe * self.weights
+        category_scores = safe_weights @ self.category_onehot
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            category_pct = np.where(
+                self.category_max > 0,
+                np.round(category_scores / self.category_max * 100),
+                100
+            )
+        if self.total_max > 0:
+            overall = np.round(safe_weights.sum(axis=1) / self.total_max * 100)
+        else:
+            overall = np.full(len(safe), 50.0)
+
+        risk = answered & ~safe & self.risk_columns
+        return {
+            'overall': overall.astype(np.int64),
+            'categories': category_pct.astype(np.int64),
+            'risk': risk
+        }
+
+    def score_many(self, answer_sets: list) -> list:
+        """Score answer dicts; each result matches calculate_safety_score"""
+        answered, values = self.encode(answer_sets)
+        scored = self.score_matrix(answered, values)
+        timestamp = datetime.now().isoformat()
+
+        overall = scored['overall'].tolist()
+
+        # Cohorts have few distinct category / risk patterns: build each
+        # result fragment once per pattern and share it between rows
+        # (treat the returned dicts as read-only)
+        cat_dicts, cat_rows = self._category_patterns(scored['categories'])
+
+        risk_bits = 1 << np.arange(len(self.question_ids), dtype=np.int64)
+        risk_codes = (scored['risk'] * risk_bits).sum(axis=1).tolist()
+        risk_lists = {}
+        for code in set(risk_codes):
+            texts = [self.risk_text[col] for col in range(len(self.question_ids)) if code >> col & 1]
+            risk_lists[code] = texts[:MAX_RISK_AREAS]
+
+        return [
+            {
+                'overall': overall[i],
+                'categories': cat_dicts[cat_rows[i]],
+                'riskAreas': risk_lists[risk_codes[i]],
+                'timestamp': timestamp
+            }
+            for i in range(len(answer_sets))
+        ]
+
+    def _category_patterns(self, category_pct) -> tuple:
+        """Deduplicate category rows; returns (dicts, row -> dict index)"""
+        k = len(self.categories)
+        if 101 ** k < 2 ** 62:
+            # Percentages are 0..100, so each row packs into one int64
+            codes = category_pct @ (101 ** np.arange(k, dtype=np.int64))
+            _, first, inverse = np.unique(codes, return_index=True, return_inverse=True)
+            unique_rows = category_pct[first]
+        else:
+            unique_rows, inverse = np.unique(category_pct, axis=0, return_inverse=True)
+        dicts = [dict(zip(self.categories, row)) for row in unique_rows.tolist()]
+        return dicts, inverse.reshape(-1).tolist()
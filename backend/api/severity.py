@@ -0,0 +1,181 @@
+"""
+Weighted, context-aware severity scoring for keyword analysis.
+
+Scores a message from every keyword hit found by the matcher's single
+pass, using the scoring rules compiled into the matcher artifact from
+lexicon/harassment_lexicon.json:
+
+- each hit is worth its category weight times a per-term weight
+  ("sorry" counts for less than "kill"), more when it is SHOUTED
+- overlapping hits of one category ("know where" inside "i know where
+  you live") count once, as the strongest (on a tie, the widest) of them
+- a category scores its strongest hit plus a share of its other hits,
+  so repetition raises the score but cannot grow it without bound
+- proximity rules add a boost when two terms appear within a few words
+  of each other ("know where" ... "your house")
+
+Scoring is linear in the message length: hits arrive ordered by
+position and each one updates a constant amount of running state. Every
+counted hit is returned with its offsets in the original message, for
+highlighting in evidence exports. Offsets count UTF-16 code units (JS
+string indices), so they agree with the frontend, which scores messages
+the same way (frontend/src/utils/keywordMatcher.js), even after emoji.
+"""
+import bisect
+import math
+import re
+
+from .matcher import KeywordMatcher
+
+# Characters outside the BMP take two UTF-16 code units
+ASTRAL_RE = re.compile('[\U00010000-\U0010FFFF]')
+
+
+class SeverityScorer:
+    """
+    Severity scoring over a compiled KeywordMatcher.
+
+    Args:
+        matcher: Compiled keyword matcher
+        weights: Category weights, in matcher category order
+        scoring: The artifact's compiled 'scoring' section
+    """
+
+    def __init__(self, matcher: KeywordMatcher, weights: list, scoring: dict):
+        self.matcher = matcher
+        self.categories = matcher.categories
+        self.thresholds = [tuple(threshold) for threshold in scoring['thresholds']]
+        self.repeat_weight = scoring['repeatWeight']
+        self.repeat_cap = scoring['repeatCap']
+        self.caps_boost = scoring['capsBoost']
+
+        cat_index = {category: i for i, category in enumerate(self.categories)}
+        self._entry_category = [cat_index[category] for _, category in matcher.entries]
+        self._entry_weight = [
+            weights[cat] * term_weight
+            for cat, term_weight in zip(self._entry_category, scoring['termWeights'])
+        ]
+
+        # entry id -> ((rule index, side), ...); side 0 = 'terms', 1 = 'near'
+        self.rules = [(rule['window'], rule['boost']) for rule in scoring['proximity']]
+        rule_sides = [[] for _ in matcher.entries]
+        for index, rule in enumerate(scoring['proximity']):
+            for side, entry_ids in enumerate((rule['terms'], rule['near'])):
+                for entry_id in entry_ids:
+                    rule_sides[entry_id].append((index, side))
+        self._entry_rules = [tuple(sides) for sides in rule_sides]
+
+    def severity(self, score: float) -> str:
+        for severity, threshold in self.thresholds:
+            if score >= threshold:
+                return severity
+        return 'low'
+
+    def analyze(self, message: str) -> dict:
+        """
+        Score a message.
+
+        Args:
+            message: The message text to analyze
+
+        Returns:
+            Dict with severity, detected categories (in lexicon order),
+            score and the counted matches ({start, end, category,
+            keyword, weight}, UTF-16 offsets into the original message)
+        """
+        normalized, hits = self.matcher.find_tokens(message)
+        spans = normalized.token_spans
+        entries = self.matcher.entries
+        entry_category, entry_weight, entry_rules = self._entry_category, self._entry_weight, self._entry_rules
+        caps_boost = self.caps_boost
+
+        size = len(self.categories)
+        peak = [0.0] * size
+        rest = [0.0] * size
+        # Open group of overlapping hits per category: [first, last, weight, match]
+        groups = [None] * size
+        matches = []
+        # Last token of the latest hit on each side of each proximity rule
+        seen = [[None, None] for _ in self.rules]
+        boost = 0.0
+
+        for first, last, entry_id in hits:
+            cat = entry_category[entry_id]
+            start, end = spans[first][0], spans[last][1]
+            weight = entry_weight[entry_id]
+            if caps_boost != 1 and message[start:end].isupper():
+                weight *= caps_boost
+
+            group = groups[cat]
+            if group is not None and first <= group[1]:
+                match = group[3]
+                group[0], group[1] = min(group[0], first), max(group[1], last)
+                match['start'], match['end'] = spans[group[0]][0], spans[group[1]][1]
+                if weight >= group[2]:
+                    group[2] = weight
+                    match['keyword'] = entries[entry_id][0]
+            else:
+                if group is not None:
+                    _close(group, cat, peak, rest)
+                match = {'start': start, 'end': end, 'category': self.categories[cat],
+                         'keyword': entries[entry_id][0], 'weight': 0}
+                matches.append(match)
+                groups[cat] = [first, last, weight, match]
+
+            for rule, side in entry_rules[entry_id]:
+                sides = seen[rule]
+                if sides is None:
+                    continue
+                other = sides[1 - side]
+                if other is not None and first - other <= self.rules[rule][0]:
+                    boost += self.rules[rule][1]
+                    # Each rule counts once per message
+                    seen[rule] = None
+                else:
+                    sides[side] = last
+
+        for cat, group in enumerate(groups):
+            if group is not None:
+                _close(group, cat, peak, rest)
+
+        score = boost
+        detected = []
+        for cat in range(size):
+            if peak[cat]:
+                detected.append(self.categories[cat])
+                score += peak[cat] + min(self.repeat_weight * rest[cat], self.repeat_cap * peak[cat])
+        score = _round2(score)
+        if matches and not message.isascii():
+            _to_utf16(message, matches)
+
+        return {
+            'severity': self.severity(score),
+            'categories': detected if detected else ['general harassment'],
+            'score': score,
+            'matches': matches
+        }
+
+
+def _close(group: list, cat: int, peak: list, rest: list):
+    """Fold a finished group of overlapping hits into its category totals"""
+    weight = group[2]
+    group[3]['weight'] = _round2(weight)
+    if weight > peak[cat]:
+        rest[cat] += peak[cat]
+        peak[cat] = weight
+    else:
+        rest[cat] += weight
+
+
+def _round2(value: float) -> float:
+    # Half up, like the frontend's Math.round (round() would round half to even)
+    return math.floor(value * 100 + 0.5) / 100
+
+
+def _to_utf16(message: str, matches: list):
+    """Shift code point offsets to UTF-16 offsets (one extra unit per astral character)"""
+    astral = [m.start() for m in ASTRAL_RE.finditer(message)]
+    if astral:
+        for match in matches:
+            match['start'] += bisect.bisect_left(astral, match['start'])
+            match['end'] += bisect.bisect_left(astral, match['end'])
@@ -0,0 +1,572 @@
+"""
+Incident storage for Digital Footprint Shield.
+
+Incidents live in a SQLite database in WAL mode so that saves are a
+single indexed insert (no whole-file rewrite) and several gunicorn
+workers can write concurrently without losing each other's records.
+The legacy incidents.json file is imported once on first use.
+
+The message and notes of every incident are kept in a contentless FTS5
+index, maintained by triggers so saves and deletes from any worker
+update it incrementally.
+
+Incidents are grouped into near-duplicate clusters at save time (MinHash
+signatures with LSH band lookups, see clustering.py). An incident whose
+message is identical to its cluster's representative stores only the
+cluster reference; reads put the text back.
+"""
+import json
+import os
+import re
+import sqlite3
+import threading
+
+from .clustering import (
+    CLUSTER_THRESHOLD,
+    band_keys,
+    pack_signature,
+    signature,
+    similarity,
+    unpack_signature
+)
+from .ids import new_cluster_id
+from .metrics import timed
+
+# Columns that can be filtered on with an exact match (all indexed)
+FILTER_COLUMNS = ('platform', 'severity', 'type')
+
+# Run an incremental vacuum + WAL checkpoint after this many deletes
+COMPACT_EVERY = 1000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS incidents (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT NOT NULL,
+    type TEXT,
+    platform TEXT,
+    severity TEXT,
+    timestamp TEXT,
+    data TEXT NOT NULL,
+    cluster_id TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_incidents_id ON incidents(id);
+CREATE INDEX IF NOT EXISTS idx_incidents_platform ON incidents(platform, seq);
+CREATE INDEX IF NOT EXISTS idx_incidents_severity ON incidents(severity, seq);
+CREATE INDEX IF NOT EXISTS idx_incidents_type ON incidents(type, seq);
+CREATE INDEX IF NOT EXISTS idx_incidents_timestamp ON incidents(timestamp);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+# Created after incidents.cluster_id exists (older databases gain it by ALTER)
+CLUSTER_SCHEMA = """
+CREATE INDEX IF NOT EXISTS idx_incidents_cluster ON incidents(cluster_id, seq);
+CREATE TABLE IF NOT EXISTS clusters (
+    id TEXT PRIMARY KEY,
+    signature BLOB NOT NULL,
+    representative TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    first_seen TEXT,
+    last_seen TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_clusters_count ON clusters(count);
+CREATE TABLE IF NOT EXISTS cluster_bands (
+    band INTEGER NOT NULL,
+    cluster_id TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_cluster_bands ON cluster_bands(band);
+CREATE INDEX IF NOT EXISTS idx_cluster_bands_cluster ON cluster_bands(cluster_id);
+"""
+
+# Most clusters compared against a new message (shared LSH buckets)
+CLUSTER_CANDIDATES = 64
+
+# Representative texts cached per process (they never change)
+REPRESENTATIVE_CACHE_SIZE = 10000
+
+# Indexed message text: an exact copy's message lives on its cluster
+_SEARCH_MESSAGE = ("COALESCE(json_extract({row}.data, '$.message'), "
+                   "(SELECT representative FROM clusters WHERE id = {row}.cluster_id))")
+
+# Full-text index over message and notes; rowid is incidents.seq.
+# Contentless: the text itself stays in incidents.data only.
+SEARCH_INDEX = (
+    """CREATE VIRTUAL TABLE incident_search USING fts5(
+        message, notes, content='', tokenize='porter unicode61 remove_diacritics 2'
+    )""",
+    # Backfill incidents saved before the index existed
+    f"""INSERT INTO incident_search (rowid, message, notes)
+        SELECT seq, {_SEARCH_MESSAGE.format(row='incidents')}, json_extract(data, '$.notes')
+        FROM incidents""",
+)
+
+# Recreated on startup so existing databases pick up changes
+SEARCH_TRIGGERS = (
+    'DROP TRIGGER IF EXISTS incidents_search_insert',
+    f"""CREATE TRIGGER incidents_search_insert AFTER INSERT ON incidents BEGIN
+        INSERT INTO incident_search (rowid, message, notes)
+        VALUES (new.seq, {_SEARCH_MESSAGE.format(row='new')}, json_extract(new.data, '$.notes'));
+    END""",
+    'DROP TRIGGER IF EXISTS incidents_search_delete',
+    f"""CREATE TRIGGER incidents_search_delete AFTER DELETE ON incidents BEGIN
+        INSERT INTO incident_search (incident_search, rowid, message, notes)
+        VALUES ('delete', old.seq, {_SEARCH_MESSAGE.format(row='old')}, json_extract(old.data, '$.notes'));
+    END""",
+)
+
+# bm25 column weights: a hit in the message counts double one in the notes
+SEARCH_WEIGHTS = (1.0, 0.5)
+
+# Matches (newest first) considered for ranking and facets per search
+SEARCH_SCAN_LIMIT = int(os.environ.get('SEARCH_SCAN_LIMIT', '10000'))
+
+_SEARCH_TERM_RE = re.compile(r'\w+\*?')
+
+
+class IncidentStore:
+    """
+    SQLite-backed incident store.
+
+    Each thread gets its own connection; SQLite's own locking keeps
+    writers in separate processes consistent.
+    """
+
+    def __init__(self, db_path: str, legacy_json_path: str | None = None):
+        self.db_path = db_path
+        self.legacy_json_path = legacy_json_path
+        self._local = threading.local()
+        self._deletes = 0
+        self._representatives = {}
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._reset_after_fork)
+
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        conn = self._conn()
+        conn.executescript(SCHEMA)
+        if 'cluster_id' not in {row[1] for row in conn.execute('PRAGMA table_info(incidents)')}:
+            conn.execute('ALTER TABLE incidents ADD COLUMN cluster_id TEXT')
+        conn.executescript(CLUSTER_SCHEMA)
+        self.search_enabled = self._ensure_search_index()
+        if legacy_json_path:
+            self._migrate_legacy_json()
+
+    def _reset_after_fork(self):
+        # SQLite connections must not be used across fork; reopen on demand
+        self._local = threading.local()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            # Only takes effect on a fresh database, before any table exists
+            conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
+            conn.execute('PRAGMA journal_mode = WAL')
+            conn.execute('PRAGMA synchronous = NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def _ensure_search_index(self) -> bool:
+        """Create (and backfill) the full-text index once; False without FTS5"""
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            exists = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE name = 'incident_search'"
+            ).fetchone()
+            if not exists:
+                conn.execute(SEARCH_INDEX[0])
+            for statement in SEARCH_TRIGGERS:
+                conn.execute(statement)
+            if not exists:
+                conn.execute(SEARCH_INDEX[1])
+            conn.execute('COMMIT')
+            return True
+        except sqlite3.OperationalError:
+            # SQLite built without FTS5: everything but search still works
+            conn.execute('ROLLBACK')
+            return False
+
+    def _migrate_legacy_json(self):
+        """
+        Import incidents.json once, then rename it out of the way.
+
+        Every worker may call this at startup: the import runs under the
+        write lock and is recorded in meta, so exactly one worker does it,
+        and a file another worker already renamed means nothing is left
+        to import. Rows are clustered like any other save.
+        """
+        path = self.legacy_json_path
+        if not os.path.exists(path):
+            return
+
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            done = conn.execute(
+                "SELECT value FROM meta WHERE key = 'legacy_json_migrated'"
+            ).fetchone()
+            incidents = None
+            if not done:
+                try:
+                    with open(path, 'r') as f:
+                        incidents = json.load(f)
+                except FileNotFoundError:
+                    pass
+            if incidents is not None:
+                for incident in incidents:
+                    self._insert(conn, incident)
+                conn.execute(
+                    "INSERT INTO meta (key, value) VALUES ('legacy_json_migrated', ?)",
+                    (str(len(incidents)),)
+                )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+        try:
+            os.replace(path, path + '.migrated')
+        except FileNotFoundError:
+            # Renamed by another worker in the meantime
+            pass
+
+    @timed('incident_save')
+    def append(self, incident: dict) -> dict | None:
+        """
+        Store a new incident record in its near-duplicate cluster.
+
+        Returns:
+            {'id', 'count'} of the incident's cluster, or None when it
+            has no message text
+        """
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            cluster = self._insert(conn, incident)
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return cluster
+
+    def extend(self, incidents: list) -> tuple:
+        """
+        Store a batch of incidents (e.g. an import) in one transaction.
+
+        Incidents whose id is already stored are skipped, so an import can
+        be re-run or resumed. Clusters are reassigned in this store.
+
+        Returns:
+            (imported, skipped) counts
+        """
+        conn = self._conn()
+        imported = skipped = 0
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            for incident in incidents:
+                if conn.execute('SELECT 1 FROM incidents WHERE id = ?', (incident.get('id'),)).fetchone():
+                    skipped += 1
+                    continue
+                incident = dict(incident)
+                incident.pop('cluster_id', None)
+                self._insert(conn, incident)
+                imported += 1
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return imported, skipped
+
+    def _insert(self, conn, incident: dict) -> dict | None:
+        """Insert one incident into its cluster (inside a transaction)"""
+        message = incident.get('message')
+        if not isinstance(message, str) or not message.strip():
+            conn.execute(INSERT_INCIDENT, _row(incident))
+            return None
+
+        cluster = self._assign_cluster(conn, message, signature(message), incident.get('timestamp'))
+        record = dict(incident, cluster_id=cluster['id'])
+        if message == cluster['representative']:
+            del record['message']
+        conn.execute(INSERT_INCIDENT, _row(record))
+        return {'id': cluster['id'], 'count': cluster['count']}
+
+    def _assign_cluster(self, conn, message: str, sig: tuple, timestamp: str | None) -> dict:
+        """Join the most similar existing cluster or start one (inside a transaction)"""
+        keys = band_keys(sig)
+        candidates = conn.execute(
+            'SELECT DISTINCT c.id, c.signature, c.representative, c.count '
+            'FROM cluster_bands b JOIN clusters c ON c.id = b.cluster_id '
+            f"WHERE b.band IN ({', '.join('?' * len(keys))}) LIMIT ?",
+            keys + [CLUSTER_CANDIDATES]
+        ).fetchall()
+
+        best, best_score = None, CLUSTER_THRESHOLD
+        for cluster_id, packed, representative, count in candidates:
+            score = similarity(sig, unpack_signature(packed))
+            if score >= best_score:
+                best, best_score = (cluster_id, representative, count), score
+
+        if best is not None:
+            cluster_id, representative, count = best
+            conn.execute(
+                'UPDATE clusters SET count = count + 1, last_seen = ? WHERE id = ?',
+                (timestamp, cluster_id)
+            )
+            return {'id': cluster_id, 'representative': representative, 'count': count + 1}
+
+        cluster_id = new_cluster_id()
+        conn.execute(
+            'INSERT INTO clusters (id, signature, representative, count, first_seen, last_seen) '
+            'VALUES (?, ?, ?, 1, ?, ?)',
+            (cluster_id, pack_signature(sig), message, timestamp, timestamp)
+        )
+        conn.executemany(
+            'INSERT INTO cluster_bands (band, cluster_id) VALUES (?, ?)',
+            [(key, cluster_id) for key in keys]
+        )
+        return {'id': cluster_id, 'representative': message, 'count': 1}
+
+    def _representative(self, cluster_id: str) -> str | None:
+        text = self._representatives.get(cluster_id)
+        if text is None:
+            row = self._conn().execute(
+                'SELECT representative FROM clusters WHERE id = ?', (cluster_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            if len(self._representatives) >= REPRESENTATIVE_CACHE_SIZE:
+                self._representatives.clear()
+            text = self._representatives[cluster_id] = row[0]
+        return text
+
+    def _decode(self, data: str) -> dict:
+        """Incident from its stored JSON, with a referenced message filled in"""
+        incident = json.loads(data)
+        if 'message' not in incident and incident.get('cluster_id'):
+            incident['message'] = self._representative(incident['cluster_id'])
+        return incident
+
+    def get(self, incident_id: str) -> dict | None:
+        """Fetch one incident by id, or None if it does not exist"""
+        row = self._conn().execute(
+            'SELECT data FROM incidents WHERE id = ? ORDER BY seq LIMIT 1',
+            (incident_id,)
+        ).fetchone()
+        return self._decode(row[0]) if row else None
+
+    @timed('incident_load')
+    def all(self) -> list:
+        """Return every incident in insertion order"""
+        rows = self._conn().execute('SELECT data FROM incidents ORDER BY seq')
+        return [self._decode(data) for (data,) in rows]
+
+    def query(self, filters: dict | None = None, since: str | None = None,
+              until: str | None = None, cursor: int | None = None,
+              limit: int | None = None, descending: bool = False,
+              cluster_id: str | None = None):
+        """
+        Iterate incidents matching the filters, in insertion order.
+
+        Rows are read lazily from SQLite, so callers can stream results
+        without holding the whole set in memory.
+
+        Args:
+            filters: Exact-match values keyed by FILTER_COLUMNS
+            since/until: Inclusive ISO timestamp bounds
+            cursor: Sequence number of the last row already seen
+            limit: Maximum number of rows to return
+            descending: Newest first instead of oldest first
+            cluster_id: Only incidents in this near-duplicate cluster
+
+        Yields:
+            (seq, incident) tuples; seq is the cursor for the next page
+        """
+        clauses = []
+        params = []
+        for column, value in (filters or {}).items():
+            if column not in FILTER_COLUMNS:
+                raise ValueError(f'Cannot filter on {column}')
+            clauses.append(f'{column} = ?')
+            params.append(value)
+        if since:
+            clauses.append('timestamp >= ?')
+            params.append(since)
+        if until:
+            clauses.append('timestamp <= ?')
+            params.append(until)
+        if cluster_id:
+            clauses.append('cluster_id = ?')
+            params.append(cluster_id)
+        if cursor is not None:
+            clauses.append('seq < ?' if descending else 'seq > ?')
+            params.append(cursor)
+
+        sql = 'SELECT seq, data FROM incidents'
+        if clauses:
+            sql += ' WHERE ' + ' AND '.join(clauses)
+        sql += ' ORDER BY seq DESC' if descending else ' ORDER BY seq'
+        if limit is not None:
+            sql += ' LIMIT ?'
+            params.append(limit)
+
+        for seq, data in self._conn().execute(sql, params):
+            yield seq, self._decode(data)
+
+    @timed('incident_search')
+    def search(self, text: str, filters: dict | None = None, limit: int = 20, offset: int = 0) -> dict:
+        """
+        Full-text search over incident messages and notes.
+
+        Every word of the query must match (stemmed, case- and
+        accent-insensitive); a trailing * matches a prefix. Ranking and
+        facets cover the newest SEARCH_SCAN_LIMIT matches, which keeps
+        very broad queries fast on large stores.
+
+        Args:
+            text: Search query
+            filters: Exact-match values keyed by FILTER_COLUMNS
+            limit: Maximum number of results
+            offset: Results to skip, for paging
+
+        Returns:
+            Dict with 'results' ([(incident, score)], best first), 'total',
+            'facets' ({column: {value: count}}) and 'truncated' (more
+            than SEARCH_SCAN_LIMIT matches; total and facets are then
+            lower bounds)
+        """
+        if not self.search_enabled:
+            raise RuntimeError('Full-text search is not available (SQLite built without FTS5)')
+
+        terms = _SEARCH_TERM_RE.findall(text)
+        if not terms:
+            raise ValueError('Search query has no words')
+        # Quote every term so user input is never parsed as FTS5 syntax
+        match = ' '.join(f'"{t[:-1]}"*' if t.endswith('*') else f'"{t}"' for t in terms)
+
+        clauses = ['incident_search MATCH ?']
+        params = [match]
+        for column, value in (filters or {}).items():
+            if column not in FILTER_COLUMNS:
+                raise ValueError(f'Cannot filter on {column}')
+            clauses.append(f'i.{column} = ?')
+            params.append(value)
+
+        conn = self._conn()
+        columns = ', '.join(f'i.{column}' for column in FILTER_COLUMNS)
+        candidates = conn.execute(
+            f'SELECT i.seq, bm25(incident_search, {SEARCH_WEIGHTS[0]}, {SEARCH_WEIGHTS[1]}), {columns} '
+            'FROM incident_search JOIN incidents i ON i.seq = incident_search.rowid '
+            'WHERE ' + ' AND '.join(clauses) + ' ORDER BY incident_search.rowid DESC LIMIT ?',
+            params + [SEARCH_SCAN_LIMIT + 1]
+        ).fetchall()
+        truncated = len(candidates) > SEARCH_SCAN_LIMIT
+        del candidates[SEARCH_SCAN_LIMIT:]
+
+        facets = {column: {} for column in FILTER_COLUMNS}
+        for row in candidates:
+            for column, value in zip(FILTER_COLUMNS, row[2:]):
+                facets[column][value] = facets[column].get(value, 0) + 1
+
+        # bm25 is lower-is-better; newer incidents win ties
+        candidates.sort(key=lambda row: (row[1], -row[0]))
+        page = candidates[offset:offset + limit]
+        data = dict(conn.execute(
+            f"SELECT seq, data FROM incidents WHERE seq IN ({', '.join('?' * len(page))})",
+            [row[0] for row in page]
+        )) if page else {}
+
+        return {
+            'results': [(self._decode(data[seq]), round(-rank, 4)) for seq, rank, *_ in page],
+            'total': len(candidates),
+            'facets': facets,
+            'truncated': truncated,
+        }
+
+    def count(self) -> int:
+        return self._conn().execute('SELECT COUNT(*) FROM incidents').fetchone()[0]
+
+    @timed('incident_delete')
+    def delete(self, incident_id: str) -> int:
+        """Delete incidents with this id; returns the number removed"""
+        conn = self._conn()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            clusters = [cluster_id for (cluster_id,) in conn.execute(
+                'SELECT cluster_id FROM incidents WHERE id = ? AND cluster_id IS NOT NULL',
+                (incident_id,)
+            )]
+            # Rows go first: the search trigger may still read the cluster's text
+            deleted = conn.execute('DELETE FROM incidents WHERE id = ?', (incident_id,)).rowcount
+            for cluster_id in clusters:
+                conn.execute('UPDATE clusters SET count = count - 1 WHERE id = ?', (cluster_id,))
+                if conn.execute('DELETE FROM clusters WHERE id = ? AND count <= 0',
+                                (cluster_id,)).rowcount:
+                    conn.execute('DELETE FROM cluster_bands WHERE cluster_id = ?', (cluster_id,))
+                    self._representatives.pop(cluster_id, None)
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+        self._deletes += deleted
+        if self._deletes >= COMPACT_EVERY:
+            self.compact()
+        return deleted
+
+    def clusters(self, min_count: int = 2, limit: int = 50, offset: int = 0) -> list:
+        """Near-duplicate clusters with at least min_count incidents, largest first"""
+        rows = self._conn().execute(
+            'SELECT id, representative, count, first_seen, last_seen FROM clusters '
+            'WHERE count >= ? ORDER BY count DESC, id LIMIT ? OFFSET ?',
+            (min_count, limit, offset)
+        )
+        return [_cluster_summary(row) for row in rows]
+
+    def cluster(self, cluster_id: str) -> dict | None:
+        row = self._conn().execute(
+            'SELECT id, representative, count, first_seen, last_seen FROM clusters WHERE id = ?',
+            (cluster_id,)
+        ).fetchone()
+        return _cluster_summary(row) if row else None
+
+    def compact(self):
+        """Release pages freed by deletes and truncate the WAL file"""
+        self._deletes = 0
+        conn = self._conn()
+        conn.execute('PRAGMA incremental_vacuum')
+        conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+
+
+INSERT_INCIDENT = (
+    'INSERT INTO incidents (id, type, platform, severity, timestamp, data, cluster_id) '
+    'VALUES (?, ?, ?, ?, ?, ?, ?)'
+)
+
+
+def _row(incident: dict) -> tuple:
+    return (
+        incident.get('id'),
+        incident.get('type'),
+        incident.get('platform'),
+        incident.get('severity'),
+        incident.get('timestamp'),
+        json.dumps(incident),
+        incident.get('cluster_id'),
+    )
+
+
+def _cluster_summary(row: tuple) -> dict:
+    cluster_id, representative, count, first_seen, last_seen = row
+    return {
+        'id': cluster_id,
+        'representative': representative,
+        'count': count,
+        'first_seen': first_seen,
+        'last_seen': last_seen,
+    }
@@ -0,0 +1,126 @@
+"""
+Background job kinds for the job queue (see jobs.py).
+
+- analyze_messages: batch harassment analysis + response templates
+  (AI calls included); batches with a severe message jump the line
+- calculate_scores: bulk safety-score calculation
+- analyze_evidence: evidence timeline analysis (app.py)
+"""
+import os
+
+from .jobs import (
+    PRIORITY_HIGH,
+    PRIORITY_NORMAL,
+    PRIORITY_SEVERE,
+    JobQueue,
+    WorkerPool,
+    job_kind
+)
+from .metrics import REGISTRY
+from .model import RESPONSE_TEMPLATES, _keyword_analysis, analyze_message_batch, score_answer_sets
+
+JOBS_DB = os.environ.get(
+    'JOBS_DB',
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'jobs.db')
+)
+
+# In-process worker threads per app process (0: only standalone workers)
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', '2'))
+
+# Queued + running jobs accepted before submissions are refused
+JOB_MAX_PENDING = int(os.environ.get('JOB_MAX_PENDING', '1000'))
+
+JOB_MAX_ATTEMPTS = int(os.environ.get('JOB_MAX_ATTEMPTS', '3'))
+
+# Largest list accepted in one job payload
+JOB_MAX_ITEMS = int(os.environ.get('JOB_MAX_ITEMS', '10000'))
+
+# Messages keyword-scanned at submit time to pick a batch's priority
+PRIORITY_SCAN = 100
+
+SEVERITY_PRIORITY = {'severe': PRIORITY_SEVERE, 'high': PRIORITY_HIGH}
+
+
+def _items(payload, field: str) -> list:
+    if not isinstance(payload, dict) or not isinstance(payload.get(field), list):
+        raise ValueError(f'Payload must contain a {field} list')
+    if len(payload[field]) > JOB_MAX_ITEMS:
+        raise ValueError(f'Too many {field} ({len(payload[field])} > {JOB_MAX_ITEMS})')
+    return payload[field]
+
+
+def _prepare_list(field: str):
+    def prepare(payload) -> int:
+        _items(payload, field)
+        return PRIORITY_NORMAL
+    return prepare
+
+
+def _prepare_messages(payload) -> int:
+    messages = _items(payload, 'messages')
+    if payload.get('locale', 'en') not in RESPONSE_TEMPLATES.locales:
+        raise ValueError(f"Unsupported locale: {payload.get('locale')}")
+    priority = PRIORITY_NORMAL
+    for message in messages[:PRIORITY_SCAN]:
+        if isinstance(message, str):
+            priority = min(priority, SEVERITY_PRIORITY.get(_keyword_analysis(message)['severity'],
+                                                           PRIORITY_NORMAL))
+            if priority == PRIORITY_SEVERE:
+                break
+    return priority
+
+
+@job_kind('analyze_messages', prepare=_prepare_messages)
+def analyze_messages(payload) -> dict:
+    results = list(analyze_message_batch(payload['messages'], payload.get('locale', 'en')))
+    return {'results': results, 'count': len(results)}
+
+
+@job_kind('calculate_scores', prepare=_prepare_list('answer_sets'))
+def calculate_scores(payload) -> dict:
+    results = score_answer_sets(payload['answer_sets'])
+    return {'results': results, 'count': len(results)}
+
+
+@job_kind('analyze_evidence', prepare=_prepare_list('evidence'))
+def analyze_evidence(payload) -> dict:
+    from app import analyze_evidence_data
+    return analyze_evidence_data(payload['evidence'])
+
+
+_job_queue = None
+
+
+def get_job_queue() -> JobQueue:
+    """Open the job queue (and start this process's worker threads) once"""
+    global _job_queue
+    if _job_queue is None:
+        _job_queue = JobQueue(JOBS_DB, max_pending=JOB_MAX_PENDING, max_attempts=JOB_MAX_ATTEMPTS)
+        if JOB_WORKERS > 0:
+            WorkerPool(_job_queue, workers=JOB_WORKERS).start()
+    return _job_queue
+
+
+def start_job_workers():
+    """
+    Open the job queue and start this process's worker threads now rather
+    than on the first job request, so jobs left queued by a previous run
+    resume after a restart.
+    """
+    get_job_queue()
+
+
+def _reset_after_fork():
+    # Worker threads do not survive fork; a forked process starts its own
+    global _job_queue
+    _job_queue = None
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+REGISTRY.gauge(
+    'dfs_job_queue_jobs', 'Background jobs by status',
+    lambda: {(('status', status),): count for status, count in _job_queue.depth().items()}
+    if _job_queue is not None else {}
+)
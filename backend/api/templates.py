@@ -0,0 +1,216 @@
+"""
+Response template packs and a memoizing renderer.
+
+The four responses only depend on severity, the detected categories and
+today's date, so the number of distinct outputs is tiny. Templates are
+compiled once into literal/field parts, and every rendered set is kept
+per (locale, severity, categories, date) until the date changes.
+
+Each locale pack lists, per response type, variants tried in order: a
+variant applies when the severity is one of its severities or any
+category is one of its categories; a variant without conditions always
+applies. Available fields are {date}, {categories_and} (joined with the
+pack's conjunction) and {categories_list} (comma separated).
+"""
+from datetime import date as date_cls
+from string import Formatter
+
+SW_MONTHS = ('Januari', 'Februari', 'Machi', 'Aprili', 'Mei', 'Juni', 'Julai',
+             'Agosti', 'Septemba', 'Oktoba', 'Novemba', 'Desemba')
+
+# Rendered sets kept before the memo is reset (bounds AI-produced category mixes)
+MAX_VARIANTS = 4096
+
+TEMPLATE_PACKS = {
+    'en': {
+        'format_date': lambda day: day.strftime('%B %d, %Y'),
+        'conjunction': ' and ',
+        'templates': [
+            {
+                'type': 'calm',
+                'note': 'Use this to maintain composure and not escalate.',
+                'variants': [
+                    ({'severity': ('severe',), 'categories': ('threats',)},
+                     "I'm not going to engage with this type of communication. I'm documenting this message and will not respond further."),
+                    ({'categories': ('manipulation',)},
+                     "I understand you're upset, but I won't accept responsibility for your behavior. I'm choosing not to continue this conversation."),
+                    ({},
+                     "I've received your message. I don't believe this type of communication is helpful. If you'd like to have a respectful conversation, I'm open to that."),
+                ],
+            },
+            {
+                'type': 'legal',
+                'note': 'Use if you may need to involve authorities.',
+                'variants': [
+                    ({'severity': ('severe',), 'categories': ('threats', 'stalking')},
+                     "This message, received on {date}, contains concerning content that I am documenting for potential legal purposes. Continued contact of this nature may be considered harassment under applicable laws. I am retaining all evidence."),
+                    ({},
+                     "I am formally requesting that you cease this type of communication. This message has been documented as of {date}. Continued unwanted contact may be considered harassment."),
+                ],
+            },
+            {
+                'type': 'supportive',
+                'note': 'Use when communicating with friends/family.',
+                'variants': [
+                    ({'severity': ('severe',)},
+                     "I need to share something concerning with you. I've been receiving harassing messages that include {categories_and}. I've been documenting everything and may need support in deciding next steps."),
+                    ({},
+                     "I've been receiving some uncomfortable messages and wanted to share this with you. I'm handling it by not responding and documenting."),
+                ],
+            },
+            {
+                'type': 'report',
+                'note': 'Use as a template when reporting to the platform.',
+                'variants': [
+                    ({},
+                     "I am reporting a user for harassment. The message(s) I received contain {categories_list}. This communication was unwanted and makes me feel unsafe. I am attaching screenshots as evidence."),
+                ],
+            },
+        ],
+    },
+    'sw': {
+        'format_date': lambda day: f'{day.day} {SW_MONTHS[day.month - 1]} {day.year}',
+        'conjunction': ' na ',
+        'templates': [
+            {
+                'type': 'calm',
+                'note': 'Tumia hii kudumisha utulivu bila kuongeza hali.',
+                'variants': [
+                    ({'severity': ('severe',), 'categories': ('threats',)},
+                     "Sitashiriki katika mawasiliano ya aina hii. Ninahifadhi ujumbe huu kama ushahidi na sitajibu tena."),
+                    ({'categories': ('manipulation',)},
+                     "Naelewa umekasirika, lakini sitakubali lawama kwa tabia yako. Nimeamua kutoendelea na mazungumzo haya."),
+                    ({},
+                     "Nimepokea ujumbe wako. Sioni mawasiliano ya aina hii kuwa na manufaa. Ukitaka mazungumzo ya heshima, niko tayari."),
+                ],
+            },
+            {
+                'type': 'legal',
+                'note': 'Tumia ikiwa huenda ukahitaji kushirikisha mamlaka.',
+                'variants': [
+                    ({'severity': ('severe',), 'categories': ('threats', 'stalking')},
+                     "Ujumbe huu, uliopokelewa {date}, una maudhui ya kutia wasiwasi ambayo ninayahifadhi kwa madhumuni ya kisheria. Kuendelea kuwasiliana kwa namna hii kunaweza kuhesabiwa kama unyanyasaji chini ya sheria husika. Ninahifadhi ushahidi wote."),
+                    ({},
+                     "Ninaomba rasmi usimamishe mawasiliano ya aina hii. Ujumbe huu umerekodiwa tarehe {date}. Kuendelea na mawasiliano yasiyotakiwa kunaweza kuhesabiwa kama unyanyasaji."),
+                ],
+            },
+            {
+                'type': 'supportive',
+                'note': 'Tumia unapowasiliana na marafiki/familia.',
+                'variants': [
+                    ({'severity': ('severe',)},
+                     "Ninahitaji kukushirikisha jambo la kutia wasiwasi. Nimekuwa nikipokea ujumbe wa unyanyasaji unaojumuisha {categories_and}. Nimekuwa nikihifadhi ushahidi wote na huenda nikahitaji msaada kuamua hatua zinazofuata."),
+                    ({},
+                     "Nimekuwa nikipokea ujumbe usiopendeza na nilitaka kukushirikisha. Ninadhibiti hali kwa kutojibu na kuhifadhi ushahidi."),
+                ],
+            },
+            {
+                'type': 'report',
+                'note': 'Tumia kama kiolezo unaporipoti kwenye jukwaa.',
+                'variants': [
+                    ({},
+                     "Ninaripoti mtumiaji kwa unyanyasaji. Ujumbe niliopokea una {categories_list}. Mawasiliano haya hayakuombwa na yananifanya nijisikie siko salama. Ninaambatanisha picha za skrini kama ushahidi."),
+                ],
+            },
+        ],
+    },
+}
+
+
+def _compile(template: str) -> tuple:
+    """Split a format string into (literal, field-or-None) pairs once"""
+    return tuple((literal, field) for literal, field, _, _ in Formatter().parse(template))
+
+
+def _compile_pack(pack: dict) -> dict:
+    templates = []
+    for template in pack['templates']:
+        variants = [
+            (frozenset(when.get('severity', ())), frozenset(when.get('categories', ())), _compile(text))
+            for when, text in template['variants']
+        ]
+        templates.append((template['type'], template['note'], variants))
+    return {
+        'format_date': pack['format_date'],
+        'conjunction': pack['conjunction'],
+        'templates': templates,
+    }
+
+
+class TemplateEngine:
+    """
+    Renders response sets from compiled template packs, memoized per day.
+
+    Args:
+        packs: {locale: pack} in the TEMPLATE_PACKS layout
+        max_variants: Memo size before it is reset
+    """
+
+    def __init__(self, packs: dict = TEMPLATE_PACKS, max_variants: int = MAX_VARIANTS):
+        self._packs = {locale: _compile_pack(pack) for locale, pack in packs.items()}
+        self.max_variants = max_variants
+        self._variants = {}
+        self._day = None
+        self._dates = {}
+
+    @property
+    def locales(self) -> tuple:
+        return tuple(self._packs)
+
+    def _roll_day(self):
+        """Drop yesterday's variants and preformat today's date per locale"""
+        today = date_cls.today()
+        if today != self._day:
+            self._dates = {locale: pack['format_date'](today) for locale, pack in self._packs.items()}
+            self._variants = {}
+            self._day = today
+
+    def today(self, locale: str = 'en') -> str:
+        self._roll_day()
+        return self._dates[locale]
+
+    def render(self, severity: str, categories: list, locale: str = 'en', date: str | None = None) -> list:
+        """
+        Render the four responses.
+
+        Args:
+            severity: Analysis severity
+            categories: Detected categories (order is kept in the text)
+            locale: Template pack to use
+            date: Preformatted date (defaults to today in the pack's format)
+
+        Returns:
+            List of {'type', 'text', 'note'} dicts; shared between calls,
+            so treat it as read-only
+        """
+        if locale not in self._packs:
+            raise ValueError(f'Unsupported locale: {locale}')
+        self._roll_day()
+        if date is None:
+            date = self._dates[locale]
+
+        key = (locale, severity, tuple(categories), date)
+        rendered = self._variants.get(key)
+        if rendered is None:
+            if len(self._variants) >= self.max_variants:
+                self._variants = {}
+            rendered = self._render(self._packs[locale], severity, categories, date)
+            self._variants[key] = rendered
+        return rendered
+
+    @staticmethod
+    def _render(pack: dict, severity: str, categories: list, date: str) -> list:
+        fields = {
+            'date': date,
+            'categories_and': pack['conjunction'].join(categories),
+            'categories_list': ', '.join(categories),
+        }
+        responses = []
+        for response_type, note, variants in pack['templates']:
+            for severities, trigger_categories, parts in variants:
+                if ((not severities and not trigger_categories) or severity in severities or
+                        not trigger_categories.isdisjoint(categories)):
+                    break
+            text = ''.join(literal + (fields[field] if field is not None else '') for literal, field in parts)
+            responses.append({'type': response_type, 'text': text, 'note': note})
+        return responses
@@ -0,0 +1,431 @@
+"""
+Streaming incident export and import.
+
+Incidents are written and read in fixed-size chunks, so memory stays
+flat however large the store is. Two formats:
+
+- ndjson.gz: one JSON incident per line, gzip-compressed; readable with
+  zcat/jq and any NDJSON tool.
+- dfsc: compact columnar binary (below), about a quarter smaller than
+  ndjson.gz. Repeated platforms, severities and pile-on messages sit
+  next to each other in a column, where compression removes them.
+
+Import detects the format from the first bytes (plain NDJSON works too).
+Decompression runs in bounded steps and lines, headers and row groups
+have size limits, so a small hostile file cannot expand in memory.
+
+DFSC layout, all integers unsigned little-endian:
+
+    magic        b'DFSC'
+    version      u8 (1)
+    header       u32 size, then UTF-8 JSON {"columns": [...]}
+    row groups   repeated:
+        rows     u32 (> 0)
+        columns  for each header column, in order:
+                 u32 size, then a zlib-compressed column block
+    end          u32 0
+
+A column block holds one u32 byte length per row (0xFFFFFFFF for null)
+followed by the rows' UTF-8 values, concatenated. The "extra" column
+holds any other incident fields as a JSON object.
+
+From backend/:
+
+    python -m api.transfer export backup.dfsc
+    python -m api.transfer export case.ndjson.gz --platform Instagram --since 2024-01-01
+    python -m api.transfer import backup.dfsc
+"""
+import argparse
+import json
+import struct
+import sys
+import zlib
+from typing import BinaryIO, Iterator
+
+from .ids import new_incident_id
+
+MAGIC = b'DFSC'
+VERSION = 1
+COLUMNS = ('id', 'timestamp', 'type', 'platform', 'severity', 'message', 'notes', 'extra')
+NULL = 0xFFFFFFFF
+
+# Rows per DFSC row group and per import transaction
+ROW_GROUP_SIZE = 1000
+
+# Bytes read from an import stream at a time
+READ_SIZE = 64 * 1024
+
+# Uncompressed NDJSON buffered before each gzip flush
+NDJSON_CHUNK = 64 * 1024
+
+# Longest NDJSON line (one incident) accepted on import
+MAX_LINE_BYTES = 8 * 1024 * 1024
+
+# Largest DFSC header, rows per row group and decompressed row group
+MAX_HEADER_BYTES = 64 * 1024
+MAX_GROUP_ROWS = 100 * ROW_GROUP_SIZE
+MAX_GROUP_BYTES = 32 * 1024 * 1024
+
+_U32 = struct.Struct('<I')
+
+
+# ============================================
+# EXPORT
+# ============================================
+
+def export_ndjson_gz(incidents: Iterator[dict]) -> Iterator[bytes]:
+    """Gzip-compressed NDJSON, yielded in chunks"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    lines = []
+    size = 0
+    for incident in incidents:
+        line = json.dumps(incident, ensure_ascii=False) + '\n'
+        lines.append(line)
+        size += len(line)
+        if size >= NDJSON_CHUNK:
+            chunk = compressor.compress(''.join(lines).encode('utf-8'))
+            lines, size = [], 0
+            if chunk:
+                yield chunk
+    yield compressor.compress(''.join(lines).encode('utf-8')) + compressor.flush()
+
+
+def _encode_column(values: list) -> bytes:
+    lengths = []
+    parts = []
+    for value in values:
+        if value is None:
+            lengths.append(NULL)
+        else:
+            data = value.encode('utf-8')
+            lengths.append(len(data))
+            parts.append(data)
+    return zlib.compress(struct.pack(f'<{len(lengths)}I', *lengths) + b''.join(parts))
+
+
+def _row_group(rows: list) -> bytes:
+    columns = {column: [] for column in COLUMNS}
+    for incident in rows:
+        # Named columns hold strings; anything else keeps its type in extra
+        extra = {key: value for key, value in incident.items()
+                 if key not in COLUMNS[:-1] or not isinstance(value, str)}
+        for column in COLUMNS[:-1]:
+            value = incident.get(column)
+            columns[column].append(value if isinstance(value, str) else None)
+        columns['extra'].append(json.dumps(extra, ensure_ascii=False) if extra else None)
+
+    out = [_U32.pack(len(rows))]
+    for column in COLUMNS:
+        block = _encode_column(columns[column])
+        out.append(_U32.pack(len(block)))
+        out.append(block)
+    return b''.join(out)
+
+
+def export_columnar(incidents: Iterator[dict], rows_per_group: int = ROW_GROUP_SIZE) -> Iterator[bytes]:
+    """DFSC columnar binary, yielded one row group at a time"""
+    header = json.dumps({'columns': list(COLUMNS)}).encode('utf-8')
+    yield MAGIC + bytes([VERSION]) + _U32.pack(len(header)) + header
+    rows = []
+    for incident in incidents:
+        rows.append(incident)
+        if len(rows) >= rows_per_group:
+            yield _row_group(rows)
+            rows = []
+    if rows:
+        yield _row_group(rows)
+    yield _U32.pack(0)
+
+
+# format -> (writer, mimetype, file extension)
+EXPORT_FORMATS = {
+    'ndjson.gz': (export_ndjson_gz, 'application/gzip', '.ndjson.gz'),
+    'dfsc': (export_columnar, 'application/octet-stream', '.dfsc'),
+}
+
+
+# ============================================
+# IMPORT
+# ============================================
+
+class _Peeked:
+    """Binary stream whose first bytes were already read for detection"""
+
+    def __init__(self, head: bytes, stream: BinaryIO):
+        self.head = head
+        self.stream = stream
+
+    def read(self, size: int) -> bytes:
+        if self.head:
+            data, self.head = self.head[:size], self.head[size:]
+            if len(data) < size:
+                data += self.stream.read(size - len(data))
+            return data
+        return self.stream.read(size)
+
+
+def _read_exact(stream, size: int) -> bytes:
+    parts = []
+    remaining = size
+    while remaining:
+        data = stream.read(remaining)
+        if not data:
+            raise ValueError('Truncated DFSC file')
+        parts.append(data)
+        remaining -= len(data)
+    return b''.join(parts)
+
+
+def _read_exact_or_less(stream, size: int) -> bytes:
+    parts = []
+    remaining = size
+    while remaining:
+        data = stream.read(remaining)
+        if not data:
+            break
+        parts.append(data)
+        remaining -= len(data)
+    return b''.join(parts)
+
+
+def _decompressed(stream, compressed: bool) -> Iterator[bytes]:
+    """Stream contents in pieces of at most READ_SIZE bytes, gunzipped if compressed"""
+    if not compressed:
+        while True:
+            data = stream.read(READ_SIZE)
+            if not data:
+                return
+            yield data
+
+    decompressor = zlib.decompressobj(47)
+    pending = b''
+    full = False
+    while True:
+        # A full output piece may leave more output without new input
+        if not pending and not full:
+            pending = stream.read(READ_SIZE)
+            if not pending:
+                break
+        if decompressor.eof:
+            # Concatenated gzip members (e.g. appended backups)
+            decompressor = zlib.decompressobj(47)
+        data = decompressor.decompress(pending, READ_SIZE)
+        pending = decompressor.unused_data if decompressor.eof else decompressor.unconsumed_tail
+        full = len(data) == READ_SIZE and not decompressor.eof
+        if data:
+            yield data
+    if not decompressor.eof:
+        raise ValueError('Truncated gzip stream')
+
+
+def _read_ndjson(stream, compressed: bool) -> Iterator[dict]:
+    buffer = b''
+    line_number = 0
+    for data in _decompressed(stream, compressed):
+        buffer += data
+        *lines, buffer = buffer.split(b'\n')
+        for line in lines:
+            line_number += 1
+            if line.strip():
+                yield _parse_line(line, line_number)
+        if len(buffer) > MAX_LINE_BYTES:
+            raise ValueError(f'Line {line_number + 1} is longer than {MAX_LINE_BYTES} bytes')
+    if buffer.strip():
+        yield _parse_line(buffer, line_number + 1)
+
+
+def _parse_line(line: bytes, line_number: int) -> dict:
+    try:
+        incident = json.loads(line)
+    except ValueError:
+        raise ValueError(f'Line {line_number} is not valid JSON') from None
+    if not isinstance(incident, dict):
+        raise ValueError(f'Line {line_number} is not a JSON object')
+    return incident
+
+
+def _read_columnar(stream) -> Iterator[dict]:
+    version = _read_exact(stream, 1)[0]
+    if version != VERSION:
+        raise ValueError(f'Unsupported DFSC version {version}')
+    size = _U32.unpack(_read_exact(stream, 4))[0]
+    if size > MAX_HEADER_BYTES:
+        raise ValueError(f'DFSC header is larger than {MAX_HEADER_BYTES} bytes')
+    header = json.loads(_read_exact(stream, size))
+    columns = header.get('columns') if isinstance(header, dict) else None
+    if not isinstance(columns, list) or not all(isinstance(column, str) for column in columns):
+        raise ValueError('DFSC header has no list of column names')
+
+    while True:
+        rows = _U32.unpack(_read_exact(stream, 4))[0]
+        if rows == 0:
+            return
+        if rows > MAX_GROUP_ROWS:
+            raise ValueError(f'DFSC row group has more than {MAX_GROUP_ROWS} rows')
+        values = {}
+        budget = MAX_GROUP_BYTES
+        for column in columns:
+            size = _U32.unpack(_read_exact(stream, 4))[0]
+            if size > budget:
+                raise ValueError(f'DFSC row group is larger than {MAX_GROUP_BYTES} bytes')
+            # Decompress at most the remaining budget (plus one byte to detect overflow)
+            decompressor = zlib.decompressobj()
+            block = decompressor.decompress(_read_exact(stream, size), budget + 1)
+            if len(block) > budget:
+                raise ValueError(f'DFSC row group is larger than {MAX_GROUP_BYTES} bytes')
+            if not decompressor.eof:
+                raise ValueError('Corrupt DFSC column block')
+            budget -= len(block)
+            lengths = struct.unpack_from(f'<{rows}I', block)
+            offset = 4 * rows
+            decoded = []
+            for length in lengths:
+                if length == NULL:
+                    decoded.append(None)
+                else:
+                    if offset + length > len(block):
+                        raise ValueError('Corrupt DFSC column block')
+                    decoded.append(block[offset:offset + length].decode('utf-8'))
+                    offset += length
+            values[column] = decoded
+
+        for i in range(rows):
+            incident = {}
+            for column in columns:
+                value = values[column][i]
+                if value is None:
+                    continue
+                if column == 'extra':
+                    extra = json.loads(value)
+                    if not isinstance(extra, dict):
+                        raise ValueError('DFSC extra value is not a JSON object')
+                    incident.update(extra)
+                else:
+                    incident[column] = value
+            yield incident
+
+
+def read_incidents(stream: BinaryIO) -> Iterator[dict]:
+    """
+    Incidents from an export stream, format detected from its first bytes.
+
+    Args:
+        stream: Binary file-like object (file, request body)
+
+    Yields:
+        Incident dicts, in file order
+
+    Raises:
+        ValueError: Malformed input
+    """
+    head = _read_exact_or_less(stream, 4)
+    stream = _Peeked(head, stream)
+    if head == MAGIC:
+        stream.read(4)
+        return _read_columnar(stream)
+    return _read_ndjson(stream, compressed=head[:2] == b'\x1f\x8b')
+
+
+# Fields stored in their own indexed columns: strings (or null) only
+STRING_FIELDS = ('id', 'timestamp', 'type', 'platform', 'severity')
+
+
+def import_incidents(store, incidents: Iterator[dict], batch_size: int = ROW_GROUP_SIZE) -> dict:
+    """
+    Store incidents in batches (one transaction each).
+
+    Incidents without an id get a new one; ids already in the store are
+    skipped. A malformed record stops the import; earlier batches stay.
+
+    Returns:
+        {'imported', 'skipped'} plus 'error' when the input was malformed
+    """
+    stats = {'imported': 0, 'skipped': 0}
+    batch = []
+
+    def flush():
+        imported, skipped = store.extend(batch)
+        stats['imported'] += imported
+        stats['skipped'] += skipped
+        batch.clear()
+
+    try:
+        for number, incident in enumerate(incidents, 1):
+            for field in STRING_FIELDS:
+                if not isinstance(incident.get(field), (str, type(None))):
+                    raise ValueError(f'Incident {number}: "{field}" must be a string')
+            if not incident.get('id'):
+                incident['id'] = new_incident_id()
+            batch.append(incident)
+            if len(batch) >= batch_size:
+                flush()
+    except (ValueError, zlib.error, struct.error) as e:
+        stats['error'] = str(e)
+    if batch:
+        flush()
+    return stats
+
+
+# ============================================
+# CLI
+# ============================================
+
+def main(argv=None) -> int:
+    from .routes import INCIDENTS_DB
+    from .storage import FILTER_COLUMNS, IncidentStore
+
+    parser = argparse.ArgumentParser(description='Export or import incidents')
+    parser.add_argument('--db', default=INCIDENTS_DB, help='incident database (default: INCIDENTS_DB)')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    export = commands.add_parser('export', help='write incidents to a file (- for stdout)')
+    export.add_argument('output')
+    export.add_argument('--format', choices=sorted(EXPORT_FORMATS),
+                        help='default: from the file extension, else ndjson.gz')
+    for column in FILTER_COLUMNS:
+        export.add_argument(f'--{column}')
+    export.add_argument('--since')
+    export.add_argument('--until')
+    export.add_argument('--cluster')
+
+    load = commands.add_parser('import', help='read incidents from a file (- for stdin)')
+    load.add_argument('input')
+    args = parser.parse_args(argv)
+
+    store = IncidentStore(args.db)
+
+    if args.command == 'export':
+        fmt = args.format or ('dfsc' if args.output.endswith('.dfsc') else 'ndjson.gz')
+        writer = EXPORT_FORMATS[fmt][0]
+        filters = {column: getattr(args, column) for column in FILTER_COLUMNS if getattr(args, column)}
+        rows = store.query(filters, since=args.since, until=args.until, cluster_id=args.cluster)
+        count = 0
+
+        def incidents():
+            nonlocal count
+            for _, incident in rows:
+                count += 1
+                yield incident
+
+        out = sys.stdout.buffer if args.output == '-' else open(args.output, 'wb')
+        try:
+            for chunk in writer(incidents()):
+                out.write(chunk)
+        finally:
+            if out is not sys.stdout.buffer:
+                out.close()
+        print(f'exported {count} incidents ({fmt})', file=sys.stderr)
+        return 0
+
+    source = sys.stdin.buffer if args.input == '-' else open(args.input, 'rb')
+    try:
+        stats = import_incidents(store, read_incidents(source))
+    finally:
+        if source is not sys.stdin.buffer:
+            source.close()
+    print(json.dumps(stats), file=sys.stderr)
+    return 1 if 'error' in stats else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -1,71 +1,240 @@
 # api/routes.py - Add to your existing routes
 from flask import Blueprint, request, jsonify
+from datetime import datetime, timezone
+import json
 import logging
+import math
 
 api_bp = Blueprint('api', __name__)
 
+# Platforms the extension captures from (content.js PLATFORM_SELECTORS)
+PLATFORMS = {
+    'twitter': 'Twitter',
+    'facebook': 'Facebook',
+    'instagram': 'Instagram',
+    'reddit': 'Reddit',
+    'youtube': 'YouTube',
+}
+
+MINUTES_PER_DAY = 24 * 60
+
+# Timeline analysis settings
+ROLLING_WINDOW_MINUTES = 10
+BURST_MIN_COUNT = 10       # an hour needs at least this many comments...
+BURST_FACTOR = 3           # ...and this many times the average active hour
+
+# Escalation signal: a score of 0-100 from how fast, bursty, large and
+# widespread the pile-on is, independent of the severity thresholds
+PILE_ON_RATE = 5           # comments per minute in the peak window that max out intensity
+HIGH_VOLUME = 1000         # total comments that max out volume
+ESCALATION_WEIGHTS = {'rapid_rate': 40, 'burst': 20, 'high_volume': 25, 'multi_platform': 15}
+ESCALATION_LEVELS = ((60, 'coordinated'), (30, 'elevated'))
+
+# Distinct sources counted separately; the rest are pooled under 'other'
+MAX_SOURCES = 100
+
+
+class InvalidEvidence(ValueError):
+    """Raised for evidence entries that are not JSON objects"""
+
+
 # Add this new endpoint to your existing routes
 @api_bp.route('/analyze-evidence', methods=['POST'])
 def analyze_evidence():
     """
     Analyze harassment evidence and suggest responses
     Expects: { "evidence": [{ "source": "twitter", "count": 3, "timestamp": "07:47:24" }, ...] }
-    Returns: Analysis with severity and recommended responses
+    or, for large imports, an application/x-ndjson body with one entry per line
+    (read incrementally: memory grows with the sources and the time span
+    covered, never with the number of entries)
+    Returns: Analysis with severity, escalation signal and recommended responses
     """
     try:
-        data = request.get_json()
-        
-        if not data or 'evidence' not in data:
-            return jsonify({'error': 'Evidence data is required'}), 400
-        
-        evidence_log = data['evidence']
+        if request.mimetype == 'application/x-ndjson':
+            evidence_log = iter_ndjson(request.stream)
+        else:
+            data = request.get_json()
+            
+            if not data or 'evidence' not in data:
+                return jsonify({'error': 'Evidence data is required'}), 400
+            if not isinstance(data['evidence'], list):
+                return jsonify({'error': 'Evidence must be a list of entries'}), 400
+            
+            evidence_log = data['evidence']
         
         # Analyze the evidence
         analysis_result = analyze_evidence_data(evidence_log)
         
         return jsonify(analysis_result)
         
+    except InvalidEvidence as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         logging.error(f"Analysis error: {str(e)}")
         return jsonify({'error': 'Analysis failed'}), 500
 
+def iter_ndjson(stream):
+    """Yield one evidence entry per non-blank NDJSON line"""
+    for number, line in enumerate(stream, 1):
+        line = line.strip()
+        if line:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                raise InvalidEvidence(f'Line {number} is not valid JSON') from None
+            if not isinstance(entry, dict):
+                raise InvalidEvidence(f'Line {number} is not a JSON object')
+            yield entry
+
+class EvidenceAggregator:
+    """
+    Single-pass evidence aggregator.
+    
+    Keeps per-source counts (at most MAX_SOURCES) and per-minute comment
+    counts, so memory does not grow with the number of entries. "HH:MM"
+    timestamps use at most 1440 minute counters; ISO timestamps use one
+    per active minute, so memory grows with the time span the log covers.
+    Entries may arrive in any order, which is why the minutes are kept
+    rather than a sliding window.
+    """
+    
+    def __init__(self):
+        self.total_comments = 0
+        self.source_counts = {}
+        self.minute_counts = {}
+    
+    def add(self, entry):
+        if not isinstance(entry, dict):
+            raise InvalidEvidence('Evidence entries must be JSON objects')
+        # A negative count would hide comments (and bursts) from the totals
+        count = max(0, _to_int(entry.get('count', 0)))
+        source = entry.get('source', 'unknown')
+        if not isinstance(source, str):
+            source = 'unknown'
+        if source not in self.source_counts and len(self.source_counts) >= MAX_SOURCES:
+            source = 'other'
+        
+        self.total_comments += count
+        self.source_counts[source] = self.source_counts.get(source, 0) + count
+        
+        minute = parse_minute(entry.get('timestamp'))
+        if minute is not None:
+            self.minute_counts[minute] = self.minute_counts.get(minute, 0) + count
+    
+    def hourly_counts(self):
+        hours = {}
+        for minute, count in self.minute_counts.items():
+            hour = minute // 60
+            hours[hour] = hours.get(hour, 0) + count
+        return dict(sorted(hours.items()))
+    
+    def detect_bursts(self, hours):
+        """Hours well above the average active hour"""
+        if not hours:
+            return []
+        average = sum(hours.values()) / len(hours)
+        return [
+            {'hour': hour_label(hour), 'count': count}
+            for hour, count in hours.items()
+            if count >= BURST_MIN_COUNT and count >= BURST_FACTOR * average
+        ]
+    
+    def peak_window(self):
+        """Largest comment count in any ROLLING_WINDOW_MINUTES window"""
+        minutes = sorted(self.minute_counts.items())
+        peak = 0
+        peak_start = None
+        window = 0
+        left = 0
+        for minute, count in minutes:
+            window += count
+            while minutes[left][0] <= minute - ROLLING_WINDOW_MINUTES:
+                window -= minutes[left][1]
+                left += 1
+            if window > peak:
+                peak = window
+                peak_start = minutes[left][0]
+        return peak, peak_start
+
 def analyze_evidence_data(evidence_log):
     """Analyze evidence patterns and suggest responses"""
-    twitter_count = 0
-    unknown_count = 0
-    total_comments = 0
-    sources = set()
+    aggregator = EvidenceAggregator()
     
     # Analyze the evidence
     for entry in evidence_log:
-        count = entry.get('count', 0)
-        source = entry.get('source', 'unknown')
-        
-        total_comments += count
-        sources.add(source)
-        
-        if source == 'twitter':
-            twitter_count += count
-        elif source == 'unknown':
-            unknown_count += count
+        aggregator.add(entry)
+    
+    total_comments = aggregator.total_comments
+    source_counts = aggregator.source_counts
+    sources = set(source_counts)
+    twitter_count = source_counts.get('twitter', 0)
+    unknown_count = source_counts.get('unknown', 0)
+    
+    hours = aggregator.hourly_counts()
+    bursts = aggregator.detect_bursts(hours)
+    peak_count, peak_start = aggregator.peak_window()
     
     # Determine severity based on patterns
     severity = calculate_severity(total_comments, len(sources), twitter_count, unknown_count)
+    escalation = calculate_escalation(total_comments, source_counts, bursts, peak_count)
     
     # Get recommended responses based on severity
     recommended_responses = get_recommended_responses(severity)
     
     return {
         'severity': severity,
-        'summary': generate_summary(total_comments, sources, twitter_count, unknown_count),
+        'summary': generate_summary(total_comments, sources, source_counts),
         'autoSelected': recommended_responses,
+        'escalation': escalation,
         'analysis': {
             'totalComments': total_comments,
             'uniqueSources': len(sources),
-            'sourcesDetected': list(sources)
+            'sourcesDetected': list(sources),
+            'sourceCounts': source_counts,
+            'hourly': [{'hour': hour_label(hour), 'count': count} for hour, count in hours.items()],
+            'bursts': bursts,
+            'peakWindow': {
+                'minutes': ROLLING_WINDOW_MINUTES,
+                'count': peak_count,
+                'start': minute_label(peak_start) if peak_start is not None else None,
+                'ratePerMinute': round(peak_count / ROLLING_WINDOW_MINUTES, 2)
+            }
         }
     }
 
+def parse_minute(timestamp):
+    """
+    Convert an evidence timestamp to a minute key.
+    "HH:MM[:SS]" gives minutes since midnight; ISO datetimes give
+    minutes since the epoch. Returns None when unparseable.
+    """
+    if not isinstance(timestamp, str) or not timestamp:
+        return None
+    try:
+        if 'T' in timestamp or '-' in timestamp:
+            dt = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+            if dt.tzinfo is None:
+                dt = dt.replace(tzinfo=timezone.utc)
+            return int(dt.timestamp()) // 60
+        parts = timestamp.split(':')
+        return int(parts[0]) * 60 + int(parts[1])
+    except (ValueError, IndexError):
+        return None
+
+def minute_label(minute):
+    if minute < MINUTES_PER_DAY:
+        return f"{minute // 60:02d}:{minute % 60:02d}"
+    return datetime.fromtimestamp(minute * 60, timezone.utc).strftime('%Y-%m-%d %H:%M')
+
+def hour_label(hour):
+    return minute_label(hour * 60)[:-2] + '00'
+
+def _to_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return 0
+
 def calculate_severity(total_comments, unique_sources, twitter_count, unknown_count):
     """Calculate severity level based on evidence patterns"""
     if total_comments > 10 or unique_sources >= 3:
@@ -75,6 +244,33 @@ def calculate_severity(total_comments, unique_sources, twitter_count, unknown_co
     else:
         return 'Low'
 
+def calculate_escalation(total_comments, source_counts, bursts, peak_count):
+    """
+    Escalation signal from the shape of the timeline.
+    
+    Unlike severity, which is already 'High' above 10 comments, the score
+    keeps growing with the peak rolling rate, burst hours, volume and the
+    number of platforms involved.
+    
+    Returns:
+        {'score': 0-100, 'level': 'baseline'|'elevated'|'coordinated',
+         'reasons': [signals that contributed at least half their weight]}
+    """
+    platforms = sum(1 for source, count in source_counts.items() if source != 'unknown' and count > 0)
+    components = {
+        'rapid_rate': min(1.0, peak_count / ROLLING_WINDOW_MINUTES / PILE_ON_RATE),
+        'burst': min(1.0, len(bursts) / 2),
+        'high_volume': min(1.0, math.log10(1 + total_comments) / math.log10(1 + HIGH_VOLUME)),
+        'multi_platform': min(1.0, max(0, platforms - 1) / 3),
+    }
+    score = round(sum(ESCALATION_WEIGHTS[name] * value for name, value in components.items()))
+    level = next((name for threshold, name in ESCALATION_LEVELS if score >= threshold), 'baseline')
+    return {
+        'score': score,
+        'level': level,
+        'reasons': [name for name, value in components.items() if value >= 0.5],
+    }
+
 def get_recommended_responses(severity):
     """Get recommended response templates based on severity"""
     responses = {
@@ -96,13 +292,17 @@ def get_recommended_responses(severity):
     }
     return responses.get(severity, [])
 
-def generate_summary(total_comments, sources, twitter_count, unknown_count):
+def generate_summary(total_comments, sources, source_counts):
     """Generate analysis summary"""
     source_desc = []
-    if twitter_count > 0:
-        source_desc.append(f"{twitter_count} Twitter comments")
-    if unknown_count > 0:
-        source_desc.append(f"{unknown_count} unknown source comments")
+    for source, name in PLATFORMS.items():
+        if source_counts.get(source, 0) > 0:
+            source_desc.append(f"{source_counts[source]} {name} comments")
+    for source, count in source_counts.items():
+        if source not in PLATFORMS and source != 'unknown' and count > 0:
+            source_desc.append(f"{count} {source} comments")
+    if source_counts.get('unknown', 0) > 0:
+        source_desc.append(f"{source_counts['unknown']} unknown source comments")
     
     sources_text = " and ".join(source_desc)
     return f"Found {total_comments} total comments from {sources_text} across {len(sources)} sources."
\ No newline at end of file
@@ -0,0 +1,381 @@
+"""
+ASGI entry point for Digital Footprint Shield.
+
+Serves the same /api routes as the Flask blueprints, on an event loop:
+
+    cd backend
+    uvicorn asgi:app --workers 4
+
+The analysis endpoints (/api/generate-responses and its /batch variant)
+are handled natively: AI provider calls are awaited without holding a
+thread, keyword scoring runs on a small thread pool, and a batch keeps up
+to BATCH_CONCURRENCY messages in flight. With AI_MAX_CONCURRENCY raised
+accordingly, one worker holds thousands of analysis requests at once.
+
+Every other route runs the regular Flask view on a thread pool through a
+small WSGI bridge (request and response bodies are streamed), so storage
+and the remaining endpoints never block the event loop and behave exactly
+as they do under gunicorn.
+"""
+import asyncio
+import io
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs
+
+from api.metrics import REQUEST_LATENCY, REQUESTS
+from api.model import (
+    RESPONSE_TEMPLATES,
+    analyze_harassment_message_async,
+    analyze_message_batch_async,
+    client_analysis,
+    generate_response_templates,
+    keyword_evidence
+)
+from api.ratelimit import ADMISSION, client_address
+from api.routes import MAX_BATCH_SIZE
+from wsgi import app as flask_app
+
+# Threads running bridged Flask views (storage, scoring, evidence analysis)
+BLOCKING_THREADS = int(os.environ.get('ASGI_BLOCKING_THREADS', '32'))
+
+# Largest request body read into memory by the native handlers
+MAX_BODY_BYTES = int(os.environ.get('ASGI_MAX_BODY_BYTES', str(16 * 1024 * 1024)))
+
+# Threads running admission control (SQLite-backed limits and in-flight count)
+ADMISSION_THREADS = int(os.environ.get('ASGI_ADMISSION_THREADS', '4'))
+
+_blocking_pool = ThreadPoolExecutor(max_workers=BLOCKING_THREADS, thread_name_prefix='asgi-wsgi')
+
+# Separate from _blocking_pool, so shedding never waits behind the slow
+# bridged views it is meant to protect
+_admission_pool = ThreadPoolExecutor(max_workers=ADMISSION_THREADS, thread_name_prefix='asgi-admission')
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+# ============================================
+# HTTP HELPERS
+# ============================================
+
+def _headers(scope) -> dict:
+    return {name.decode('latin-1').lower(): value.decode('latin-1') for name, value in scope['headers']}
+
+
+def _best_accept(accept: str) -> str | None:
+    """Highest-quality media type of an Accept header"""
+    best, best_q = None, -1.0
+    for part in accept.split(','):
+        media_type, _, params = part.strip().partition(';')
+        q = 1.0
+        for param in params.split(';'):
+            name, _, value = param.strip().partition('=')
+            if name == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if media_type and q > best_q:
+            best, best_q = media_type, q
+    return best
+
+
+async def _read_body(receive) -> bytes:
+    body = bytearray()
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            raise HTTPError(400, 'Client disconnected')
+        body += message.get('body', b'')
+        if len(body) > MAX_BODY_BYTES:
+            raise HTTPError(413, 'Request body too large')
+        if not message.get('more_body', False):
+            return bytes(body)
+
+
+async def _read_json(receive):
+    """Parsed JSON body, or None when it is empty or invalid"""
+    body = await _read_body(receive)
+    try:
+        return json.loads(body) if body else None
+    except ValueError:
+        return None
+
+
+def _dumps(payload) -> bytes:
+    # Same encoding as Flask's jsonify in production
+    return (json.dumps(payload, sort_keys=True, separators=(',', ':')) + '\n').encode('utf-8')
+
+
+async def _send_json(send, payload, status: int = 200, headers: tuple = ()):
+    body = _dumps(payload)
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', b'application/json'),
+                    (b'content-length', str(len(body)).encode()), *headers],
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+# ============================================
+# NATIVE ASYNC ROUTES
+# ============================================
+
+async def generate_responses(scope, receive, send) -> int:
+    """Async POST /api/generate-responses (see api.routes.generate_responses)"""
+    try:
+        data = await _read_json(receive)
+
+        if not isinstance(data, dict) or 'message' not in data:
+            await _send_json(send, {'error': 'Missing message in request body'}, 400)
+            return 400
+
+        message = data['message']
+        locale = data.get('locale', 'en')
+        if locale not in RESPONSE_TEMPLATES.locales:
+            await _send_json(send, {'error': f'Unsupported locale: {locale}'}, 400)
+            return 400
+
+        analysis = client_analysis(data.get('analysis'), data.get('lexiconVersion'))
+        if analysis is None:
+            analysis = await analyze_harassment_message_async(message)
+
+        await _send_json(send, {
+            'severity': analysis['severity'],
+            'categories': analysis['categories'],
+            'responses': generate_response_templates(message, analysis, locale=locale),
+            **keyword_evidence(analysis)
+        })
+        return 200
+
+    except HTTPError as e:
+        await _send_json(send, {'error': str(e)}, e.status)
+        return e.status
+    except Exception as e:
+        await _send_json(send, {'error': str(e)}, 500)
+        return 500
+
+
+async def generate_responses_batch(scope, receive, send) -> int:
+    """Async POST /api/generate-responses/batch (see api.routes.generate_responses_batch)"""
+    started = False
+    try:
+        data = await _read_json(receive)
+
+        if not isinstance(data, dict) or not isinstance(data.get('messages'), list):
+            await _send_json(send, {'error': 'Missing messages list in request body'}, 400)
+            return 400
+
+        messages = data['messages']
+        locale = data.get('locale', 'en')
+        if locale not in RESPONSE_TEMPLATES.locales:
+            await _send_json(send, {'error': f'Unsupported locale: {locale}'}, 400)
+            return 400
+
+        query = parse_qs(scope.get('query_string', b'').decode('latin-1'))
+        stream = (query.get('stream', [''])[0] in ('1', 'true') or
+                  _best_accept(_headers(scope).get('accept', '')) == 'application/x-ndjson')
+
+        if stream:
+            await send({
+                'type': 'http.response.start',
+                'status': 200,
+                'headers': [(b'content-type', b'application/x-ndjson')],
+            })
+            started = True
+            async for result in analyze_message_batch_async(messages, locale):
+                await send({
+                    'type': 'http.response.body',
+                    'body': (json.dumps(result) + '\n').encode('utf-8'),
+                    'more_body': True,
+                })
+            await send({'type': 'http.response.body', 'body': b''})
+            return 200
+
+        if len(messages) > MAX_BATCH_SIZE:
+            await _send_json(send, {
+                'error': f'Batch too large ({len(messages)} > {MAX_BATCH_SIZE}); use ?stream=1'
+            }, 413)
+            return 413
+
+        results = [result async for result in analyze_message_batch_async(messages, locale)]
+        await _send_json(send, {
+            'results': results,
+            'count': len(results)
+        })
+        return 200
+
+    except Exception as e:
+        if started:
+            # The 200 and some lines are already out: end the stream with an error line
+            await send({'type': 'http.response.body', 'body': _dumps({'error': str(e)})})
+            return 200
+        if isinstance(e, HTTPError):
+            await _send_json(send, {'error': str(e)}, e.status)
+            return e.status
+        await _send_json(send, {'error': str(e)}, 500)
+        return 500
+
+
+# (method, path) -> (handler, endpoint label shared with the Flask views)
+NATIVE_ROUTES = {
+    ('POST', '/api/generate-responses'): (generate_responses, 'api.generate_responses'),
+    ('POST', '/api/generate-responses/batch'): (generate_responses_batch, 'api.generate_responses_batch'),
+}
+
+
+# ============================================
+# WSGI BRIDGE
+# ============================================
+
+class _ReceiveStream(io.RawIOBase):
+    """wsgi.input that pulls body chunks from the ASGI receive channel"""
+
+    def __init__(self, receive, loop):
+        self._receive = receive
+        self._loop = loop
+        self._buffer = b''
+        self._done = False
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        while not self._buffer and not self._done:
+            message = asyncio.run_coroutine_threadsafe(self._receive(), self._loop).result()
+            if message['type'] == 'http.disconnect':
+                self._done = True
+                break
+            self._buffer = message.get('body', b'')
+            self._done = not message.get('more_body', False)
+        size = min(len(b), len(self._buffer))
+        b[:size] = self._buffer[:size]
+        self._buffer = self._buffer[size:]
+        return size
+
+
+def _environ(scope, body, server) -> dict:
+    headers = _headers(scope)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', ''),
+        'PATH_INFO': scope['path'],
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': (scope.get('client') or ('', 0))[0],
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.input_terminated': True,
+        'wsgi.errors': io.StringIO(),
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in headers.items():
+        if name == 'content-type':
+            environ['CONTENT_TYPE'] = value
+        elif name == 'content-length':
+            environ['CONTENT_LENGTH'] = value
+        else:
+            environ['HTTP_' + name.upper().replace('-', '_')] = value
+    return environ
+
+
+async def call_wsgi(wsgi_app, scope, receive, send):
+    """Run a WSGI app for one request on the blocking pool, streaming both ways"""
+    loop = asyncio.get_running_loop()
+    server = scope.get('server') or ('localhost', 80)
+    environ = _environ(scope, io.BufferedReader(_ReceiveStream(receive, loop)), server)
+
+    def blocking_send(message):
+        asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+    def run():
+        response = {}
+
+        def start_response(status, headers, exc_info=None):
+            response['status'] = int(status.split(' ', 1)[0])
+            response['headers'] = [(name.lower().encode('latin-1'), value.encode('latin-1'))
+                                   for name, value in headers]
+
+        def start():
+            blocking_send({'type': 'http.response.start',
+                           'status': response['status'], 'headers': response['headers']})
+
+        result = wsgi_app(environ, start_response)
+        try:
+            started = False
+            for chunk in result:
+                if not chunk:
+                    continue
+                if not started:
+                    start()
+                    started = True
+                blocking_send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+            if not started:
+                start()
+            blocking_send({'type': 'http.response.body', 'body': b''})
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
+
+    await loop.run_in_executor(_blocking_pool, run)
+
+
+# ============================================
+# APPLICATION
+# ============================================
+
+async def app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                _blocking_pool.shutdown(wait=False)
+                _admission_pool.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    if scope['type'] != 'http':
+        return
+
+    route = NATIVE_ROUTES.get((scope['method'], scope['path'].rstrip('/') or '/'))
+    if route is None:
+        # Flask records its own request metrics for bridged views
+        await call_wsgi(flask_app, scope, receive, send)
+        return
+
+    handler, endpoint = route
+    start = time.perf_counter()
+    status = 500
+    # Admission may read and write SQLite (RATE_LIMIT_DB); keep it off the loop
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(_admission_pool, ADMISSION.enter)
+    try:
+        client = scope.get('client')
+        retry_after = await loop.run_in_executor(_admission_pool, ADMISSION.check, endpoint, client_address(
+            client[0] if client else None, _headers(scope).get('x-forwarded-for')
+        ))
+        if retry_after is not None:
+            status = 429
+            await _send_json(send, {'error': 'Too many requests, please retry later'}, 429,
+                             ((b'retry-after', str(retry_after).encode()),))
+        else:
+            status = await handler(scope, receive, send)
+    finally:
+        # Submitted even if this task is cancelled while waiting on it
+        await loop.run_in_executor(_admission_pool, ADMISSION.leave)
+        REQUEST_LATENCY.observe(time.perf_counter() - start, endpoint=endpoint)
+        REQUESTS.inc(endpoint=endpoint, method=scope['method'], status=status)
@@ -0,0 +1 @@
+# Benchmark harness for the backend hot paths (see benchmarks/run.py)
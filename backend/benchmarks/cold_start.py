@@ -0,0 +1,29 @@
+"""
+Cold-start probe for the cold_import and first_request benchmarks.
+
+Runs in a fresh interpreter (python -m benchmarks.cold_start, from
+backend/) and prints JSON with the seconds spent creating the app
+(importing wsgi) and serving the first requests.
+"""
+import json
+import time
+
+
+def main():
+    start = time.perf_counter()
+    from wsgi import app
+    created = time.perf_counter()
+
+    client = app.test_client()
+    client.post('/api/generate-responses', json={'message': 'you are pathetic, I know where you live'})
+    client.get('/api/incidents?limit=1')
+    served = time.perf_counter()
+
+    print(json.dumps({
+        'create_app': created - start,
+        'first_request': served - created,
+    }))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,315 @@
+"""
+Benchmark runner for the backend hot paths.
+
+Usage (from backend/):
+    python -m benchmarks.run                       # scale 1000, compare to baseline
+    python -m benchmarks.run --scale 100000
+    python -m benchmarks.run --only keyword_analysis,incident_save --repeat 5
+    python -m benchmarks.run --save-baseline       # record new baseline numbers
+    python -m benchmarks.run --only cold_import,first_request
+    python -m benchmarks.run --require-baseline    # CI: fail without a baseline
+
+Each benchmark reports throughput (items/s) and p50/p99 latency per
+operation, taken from the fastest of --repeat runs. Results are compared
+with benchmarks/baseline.json for the same scale; the run exits non-zero
+when throughput drops or p99 grows beyond the configured tolerance.
+A scale (or benchmark) with no baseline is only reported, unless
+--require-baseline is given, in which case the run fails.
+Baselines are machine-specific: record them with --save-baseline on the
+hardware that runs the comparison and commit the file from there.
+
+The cold-start benchmarks (cold_import, first_request) start
+COLD_START_RUNS fresh interpreters whatever the scale; items/s is
+worker boots per second.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from . import workloads
+
+BASELINE_FILE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+
+# Evidence logs are analyzed in chunks of this many entries per call
+EVIDENCE_CHUNK = 100
+# Incidents are read back in pages of this size
+INCIDENT_PAGE = 100
+# Fresh interpreters started per cold-start benchmark
+COLD_START_RUNS = 5
+
+
+def _percentile(sorted_values: list, pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def _measure(fn, inputs) -> list:
+    """Call fn once per input, returning per-call latencies in seconds"""
+    clock = time.perf_counter
+    latencies = []
+    for item in inputs:
+        start = clock()
+        fn(item)
+        latencies.append(clock() - start)
+    return latencies
+
+
+def _summarize(latencies: list, items: int) -> dict:
+    total = sum(latencies)
+    ordered = sorted(latencies)
+    return {
+        'items': items,
+        'seconds': round(total, 4),
+        'throughput': round(items / total, 1) if total else 0.0,
+        'p50_us': round(_percentile(ordered, 50) * 1e6, 2),
+        'p99_us': round(_percentile(ordered, 99) * 1e6, 2),
+    }
+
+
+# ============================================
+# BENCHMARKS
+# ============================================
+def bench_keyword_analysis(n: int) -> dict:
+    from api.model import _keyword_analysis
+    messages = workloads.messages(n)
+    return _summarize(_measure(_keyword_analysis, messages), n)
+
+
+def bench_calculate_safety_score(n: int) -> dict:
+    from api.model import calculate_safety_score
+    answer_sets = workloads.answer_sets(n)
+    return _summarize(_measure(calculate_safety_score, answer_sets), n)
+
+
+def bench_generate_response_templates(n: int) -> dict:
+    from api.model import _keyword_analysis, generate_response_templates
+    pairs = [(m, _keyword_analysis(m)) for m in workloads.messages(n)]
+    return _summarize(_measure(lambda pair: generate_response_templates(*pair), pairs), n)
+
+
+def bench_incident_save(n: int) -> dict:
+    from api.ids import new_incident_id
+    from api.storage import IncidentStore
+    from datetime import datetime
+
+    tmp = tempfile.mkdtemp(prefix='bench-incidents-')
+    try:
+        store = IncidentStore(os.path.join(tmp, 'incidents.db'))
+
+        def save(payload):
+            store.append({
+                'id': new_incident_id(),
+                **payload,
+                'timestamp': datetime.now().isoformat(),
+            })
+
+        return _summarize(_measure(save, workloads.incidents(n)), n)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def bench_incident_load(n: int) -> dict:
+    from api.storage import IncidentStore
+
+    tmp = tempfile.mkdtemp(prefix='bench-incidents-')
+    try:
+        store = IncidentStore(os.path.join(tmp, 'incidents.db'))
+        for i, payload in enumerate(workloads.incidents(n)):
+            store.append({'id': f'inc_{i:012d}', **payload, 'timestamp': f'{i:012d}'})
+
+        cursor = [None]
+
+        def load_page(_):
+            last = None
+            for last, _incident in store.query(cursor=cursor[0], limit=INCIDENT_PAGE):
+                pass
+            cursor[0] = last
+
+        pages = -(-n // INCIDENT_PAGE)
+        return _summarize(_measure(load_page, range(pages)), n)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def bench_analyze_evidence_data(n: int) -> dict:
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from app import analyze_evidence_data
+    entries = workloads.evidence_entries(n)
+    chunks = [entries[i:i + EVIDENCE_CHUNK] for i in range(0, n, EVIDENCE_CHUNK)]
+    return _summarize(_measure(analyze_evidence_data, chunks), n)
+
+
+def _cold_start_samples() -> list:
+    """Run the cold-start probe in fresh interpreters against a temporary store"""
+    backend = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    tmp = tempfile.mkdtemp(prefix='bench-cold-')
+    try:
+        # Every store under the temp dir, and no job threads, so the probe
+        # never touches (or migrates) the files in backend/data
+        env = dict(
+            os.environ,
+            INCIDENTS_DB=os.path.join(tmp, 'incidents.db'),
+            INCIDENTS_JSON=os.path.join(tmp, 'incidents.json'),
+            JOBS_DB=os.path.join(tmp, 'jobs.db'),
+            RATE_LIMIT_DB=os.path.join(tmp, 'ratelimit.db'),
+            JOB_WORKERS='0',
+        )
+        for name in ('ANALYSIS_CACHE_DB', 'CONVERSATION_DB'):
+            if env.get(name):
+                env[name] = os.path.join(tmp, f'{name.lower()}.db')
+
+        def probe() -> dict:
+            result = subprocess.run(
+                [sys.executable, '-m', 'benchmarks.cold_start'],
+                cwd=backend, env=env, capture_output=True, text=True, check=True
+            )
+            return json.loads(result.stdout)
+
+        # Workers normally start against an existing database
+        probe()
+        return [probe() for _ in range(COLD_START_RUNS)]
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def bench_cold_import(n: int) -> dict:
+    samples = _cold_start_samples()
+    return _summarize([s['create_app'] for s in samples], len(samples))
+
+
+def bench_first_request(n: int) -> dict:
+    samples = _cold_start_samples()
+    return _summarize([s['first_request'] for s in samples], len(samples))
+
+
+BENCHMARKS = {
+    'keyword_analysis': bench_keyword_analysis,
+    'calculate_safety_score': bench_calculate_safety_score,
+    'generate_response_templates': bench_generate_response_templates,
+    'incident_save': bench_incident_save,
+    'incident_load': bench_incident_load,
+    'analyze_evidence_data': bench_analyze_evidence_data,
+    'cold_import': bench_cold_import,
+    'first_request': bench_first_request,
+}
+
+
+# ============================================
+# BASELINE COMPARISON
+# ============================================
+def load_baseline(path: str) -> dict:
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def compare(results: dict, baseline: dict, tolerance: float, p99_tolerance: float) -> list:
+    """Return human-readable regression messages (empty when all pass)"""
+    regressions = []
+    for name, current in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        floor = base['throughput'] * (1 - tolerance)
+        if current['throughput'] < floor:
+            regressions.append(
+                f"{name}: throughput {current['throughput']}/s < {floor:.1f}/s "
+                f"(baseline {base['throughput']}/s, tolerance {tolerance:.0%})"
+            )
+        ceiling = base['p99_us'] * (1 + p99_tolerance)
+        if current['p99_us'] > ceiling:
+            regressions.append(
+                f"{name}: p99 {current['p99_us']}us > {ceiling:.1f}us "
+                f"(baseline {base['p99_us']}us, tolerance {p99_tolerance:.0%})"
+            )
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Benchmark backend hot paths')
+    parser.add_argument('--scale', type=int, default=1000,
+                        help='items per benchmark (10^3 - 10^6)')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='runs per benchmark; the fastest is reported')
+    parser.add_argument('--only', default='',
+                        help='comma-separated benchmark names')
+    parser.add_argument('--baseline', default=BASELINE_FILE)
+    parser.add_argument('--save-baseline', action='store_true',
+                        help='write results as the new baseline for this scale')
+    parser.add_argument('--require-baseline', action='store_true',
+                        help='fail when this scale or a benchmark has no baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='allowed throughput drop (fraction)')
+    parser.add_argument('--p99-tolerance', type=float, default=1.0,
+                        help='allowed p99 latency growth (fraction)')
+    parser.add_argument('--output', help='also write results JSON here')
+    args = parser.parse_args(argv)
+
+    names = [n for n in args.only.split(',') if n] or list(BENCHMARKS)
+    unknown = [n for n in names if n not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmark(s): {', '.join(unknown)}")
+
+    # Benchmarks measure the local code paths only
+    for var in ('OPENAI_API_KEY', 'ANTHROPIC_API_KEY', 'AI_PROVIDER'):
+        os.environ.pop(var, None)
+
+    results = {}
+    print(f"{'benchmark':<30} {'items/s':>12} {'p50 us':>10} {'p99 us':>10}")
+    for name in names:
+        # Best of N runs filters out scheduler and warm-up noise
+        runs = [BENCHMARKS[name](args.scale) for _ in range(max(1, args.repeat))]
+        result = max(runs, key=lambda r: r['throughput'])
+        results[name] = result
+        print(f"{name:<30} {result['throughput']:>12} {result['p50_us']:>10} {result['p99_us']:>10}")
+
+    scale_key = str(args.scale)
+    baseline = load_baseline(args.baseline)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'scale': args.scale, 'results': results}, f, indent=2)
+
+    if args.save_baseline:
+        baseline.setdefault('scales', {}).setdefault(scale_key, {}).update(results)
+        baseline['environment'] = {
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'system': platform.system(),
+        }
+        with open(args.baseline, 'w') as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f'Baseline saved for scale {scale_key}')
+        return 0
+
+    scale_baseline = baseline.get('scales', {}).get(scale_key)
+    if not scale_baseline:
+        print(f'No baseline for scale {scale_key}; run with --save-baseline to record one')
+        return 1 if args.require_baseline else 0
+
+    regressions = compare(results, scale_baseline, args.tolerance, args.p99_tolerance)
+    if args.require_baseline:
+        regressions += [f'{name}: no baseline at scale {scale_key}'
+                        for name in results if name not in scale_baseline]
+    if regressions:
+        print('\nREGRESSIONS:')
+        for line in regressions:
+            print(f'  {line}')
+        return 1
+
+    print('\nNo regressions against baseline')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,87 @@
+"""
+Seeded workload generators for the benchmark harness.
+
+Everything is derived from the demo samples in demo-samples/, scaled up
+with a fixed random seed so runs are reproducible across machines.
+"""
+import json
+import os
+import random
+
+SAMPLES_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'demo-samples')
+SEED = 1337
+
+FILLER = ['hey', 'you', 'know', 'this', 'is', 'just', 'the', 'start', 'lol',
+          'seriously', 'again', 'online', 'everyone', 'today', 'sawa', 'wewe']
+
+
+def _load(name: str) -> dict:
+    with open(os.path.join(SAMPLES_DIR, name), 'r') as f:
+        return json.load(f)
+
+
+def messages(n: int, seed: int = SEED) -> list:
+    """Harassment messages built from sample texts plus filler words"""
+    rng = random.Random(seed)
+    texts = [m['text'] for m in _load('sample_harassment_messages.json')['messages']]
+    result = []
+    for _ in range(n):
+        parts = [rng.choice(texts)]
+        for _ in range(rng.randint(0, 3)):
+            parts.append(' '.join(rng.choice(FILLER) for _ in range(rng.randint(1, 8))))
+            if rng.random() < 0.3:
+                parts.append(rng.choice(texts))
+        rng.shuffle(parts)
+        result.append(' '.join(parts))
+    return result
+
+
+def answer_sets(n: int, seed: int = SEED) -> list:
+    """Assessment answers: sample scenarios with random flips and gaps"""
+    rng = random.Random(seed)
+    data = _load('sample_privacy_questions.json')
+    scenarios = [s['answers'] for s in data['scenarios']]
+    result = []
+    for _ in range(n):
+        answers = {}
+        for qid, value in rng.choice(scenarios).items():
+            roll = rng.random()
+            if roll < 0.1:
+                continue
+            answers[qid] = (not value) if roll < 0.3 else value
+        result.append(answers)
+    return result
+
+
+def incidents(n: int, seed: int = SEED) -> list:
+    """save-incident payloads (without id/timestamp)"""
+    rng = random.Random(seed)
+    samples = _load('sample_harassment_messages.json')['messages']
+    platforms = ['Instagram', 'Twitter', 'Facebook', 'TikTok', 'WhatsApp']
+    result = []
+    for text in messages(n, seed):
+        sample = rng.choice(samples)
+        result.append({
+            'type': sample['category'],
+            'platform': rng.choice(platforms),
+            'message': text,
+            'severity': sample['severity'],
+            'notes': rng.choice(['', 'Reported to platform', 'Screenshot saved']),
+        })
+    return result
+
+
+def evidence_entries(n: int, seed: int = SEED) -> list:
+    """Extension evidence log entries spread over a day, with bursts"""
+    rng = random.Random(seed)
+    sources = ['twitter', 'facebook', 'instagram', 'reddit', 'youtube', 'unknown']
+    burst_hours = [rng.randrange(24) for _ in range(2)]
+    result = []
+    for _ in range(n):
+        hour = rng.choice(burst_hours) if rng.random() < 0.4 else rng.randrange(24)
+        result.append({
+            'source': rng.choice(sources),
+            'count': rng.randint(1, 3),
+            'timestamp': f'{hour:02d}:{rng.randrange(60):02d}:{rng.randrange(60):02d}',
+        })
+    return result
@@ -0,0 +1,12 @@
+"""
+gunicorn settings, loaded automatically when gunicorn starts in backend/.
+
+    gunicorn --preload wsgi:app
+"""
+
+
+def post_fork(server, worker):
+    # Background job threads start in each worker, never in the master
+    # (see api.routes.warm_up), so queued jobs resume after a restart
+    from api.tasks import start_job_workers
+    start_job_workers()
@@ -0,0 +1 @@
+# Load-test harness and stand-in AI provider (see loadtest/run.py)
@@ -0,0 +1,225 @@
+"""
+Stand-in AI provider for load tests.
+
+A small asyncio HTTP server that answers the OpenAI chat completions
+(POST /v1/chat/completions) and Anthropic messages (POST /v1/messages)
+APIs with the keyword analysis of the message, after a configurable
+delay. Point the backend's real provider clients at it through the
+SDKs' base URL variables, and the whole network path (api/ai.py:
+deadline, concurrency limit, circuit breaker, keyword fallback) runs
+offline:
+
+    python -m loadtest.mock_llm --port 8081 --latency 0.4 --error-rate 0.05
+    OPENAI_API_KEY=mock OPENAI_BASE_URL=http://127.0.0.1:8081/v1 flask run
+    ANTHROPIC_API_KEY=mock ANTHROPIC_BASE_URL=http://127.0.0.1:8081 flask run
+
+Latency is lognormal around --latency (spread --sigma). A share of calls
+fail with --error-status (--error-rate), and a share stall for
+--stall-seconds (--stall-rate), past any sensible deadline. GET /stats
+returns call counts by outcome; loadtest.run includes them in its
+report.
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import signal
+import time
+from collections import Counter
+
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 429: 'Too Many Requests',
+           500: 'Internal Server Error', 503: 'Service Unavailable'}
+
+PROMPT_PREFIX = 'Analyze this message: '
+
+
+class MockLLM:
+    """
+    Mock provider behaviour.
+
+    Args:
+        latency: Median response time in seconds
+        sigma: Lognormal spread of the response time (0: fixed latency)
+        error_rate: Share of calls answered with error_status
+        error_status: HTTP status of failed calls
+        stall_rate: Share of calls that take stall_seconds
+        stall_seconds: Response time of stalled calls
+        seed: Random seed, for repeatable runs
+    """
+
+    def __init__(self, latency: float = 0.3, sigma: float = 0.5, error_rate: float = 0.0,
+                 error_status: int = 500, stall_rate: float = 0.0, stall_seconds: float = 30.0,
+                 seed: int | None = None):
+        from api.model import _keyword_analysis
+        self.analyze = _keyword_analysis
+        self.latency = latency
+        self.sigma = sigma
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.stall_rate = stall_rate
+        self.stall_seconds = stall_seconds
+        self.rng = random.Random(seed)
+        self.stats = Counter()
+        self.in_flight = 0
+        self.started = time.time()
+
+    def _delay(self) -> float:
+        if self.sigma <= 0 or self.latency <= 0:
+            return self.latency
+        return self.rng.lognormvariate(math.log(self.latency), self.sigma)
+
+    async def respond(self, method: str, path: str, body: bytes) -> tuple:
+        """(status, JSON payload) for one request"""
+        path = path.split('?', 1)[0]
+        if method == 'GET' and path == '/stats':
+            return 200, dict(self.stats, in_flight=self.in_flight,
+                             uptime=round(time.time() - self.started, 1))
+        if method != 'POST':
+            return 404, {'error': {'message': f'No route for {method} {path}'}}
+        if path.endswith('/chat/completions'):
+            api = 'openai'
+        elif path.endswith('/messages'):
+            api = 'anthropic'
+        else:
+            return 404, {'error': {'message': f'No route for {method} {path}'}}
+
+        try:
+            request = json.loads(body)
+            message = _last_message(request)
+        except (ValueError, KeyError, IndexError, TypeError):
+            self.stats['bad_request'] += 1
+            return 400, _error(api, 'invalid_request_error', 'Malformed request')
+
+        self.in_flight += 1
+        try:
+            roll = self.rng.random()
+            if roll < self.stall_rate:
+                self.stats['stalled'] += 1
+                await asyncio.sleep(self.stall_seconds)
+            else:
+                await asyncio.sleep(self._delay())
+            if roll >= self.stall_rate and roll < self.stall_rate + self.error_rate:
+                self.stats['errors'] += 1
+                return self.error_status, _error(api, 'api_error', 'Mock provider error')
+
+            analysis = self.analyze(message)
+            content = json.dumps({'severity': analysis['severity'], 'categories': analysis['categories']})
+            self.stats['ok'] += 1
+            return 200, (_openai_reply if api == 'openai' else _anthropic_reply)(request, content)
+        finally:
+            self.in_flight -= 1
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Serve HTTP/1.1 requests on one keep-alive connection"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                method, path, _ = request_line.decode('latin-1').split(' ', 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get('content-length', 0)))
+
+                status, payload = await self.respond(method, path, body)
+                data = json.dumps(payload).encode('utf-8')
+                writer.write(
+                    f'HTTP/1.1 {status} {REASONS.get(status, "Error")}\r\n'
+                    f'Content-Type: application/json\r\n'
+                    f'Content-Length: {len(data)}\r\n\r\n'.encode('latin-1') + data
+                )
+                await writer.drain()
+                if headers.get('connection', '').lower() == 'close':
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        except asyncio.CancelledError:
+            # Shutting down with calls in flight
+            pass
+        finally:
+            writer.close()
+
+
+def _last_message(request: dict) -> str:
+    content = request['messages'][-1]['content']
+    if isinstance(content, list):
+        content = ''.join(block.get('text', '') for block in content if isinstance(block, dict))
+    return content[len(PROMPT_PREFIX):] if content.startswith(PROMPT_PREFIX) else content
+
+
+def _error(api: str, kind: str, message: str) -> dict:
+    if api == 'anthropic':
+        return {'type': 'error', 'error': {'type': kind, 'message': message}}
+    return {'error': {'type': kind, 'message': message}}
+
+
+def _openai_reply(request: dict, content: str) -> dict:
+    return {
+        'id': f'chatcmpl-mock{random.getrandbits(48):012x}',
+        'object': 'chat.completion',
+        'created': int(time.time()),
+        'model': request.get('model', 'mock'),
+        'choices': [{
+            'index': 0,
+            'message': {'role': 'assistant', 'content': content},
+            'finish_reason': 'stop'
+        }],
+        'usage': {'prompt_tokens': 0, 'completion_tokens': 0, 'total_tokens': 0}
+    }
+
+
+def _anthropic_reply(request: dict, content: str) -> dict:
+    return {
+        'id': f'msg_mock{random.getrandbits(48):012x}',
+        'type': 'message',
+        'role': 'assistant',
+        'model': request.get('model', 'mock'),
+        'content': [{'type': 'text', 'text': content}],
+        'stop_reason': 'end_turn',
+        'stop_sequence': None,
+        'usage': {'input_tokens': 0, 'output_tokens': 0}
+    }
+
+
+async def serve(mock: MockLLM, host: str, port: int):
+    """Serve until SIGINT or SIGTERM"""
+    server = await asyncio.start_server(mock.handle, host, port)
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stop.set)
+    async with server:
+        await stop.wait()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Stand-in OpenAI/Anthropic API for load tests')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8081)
+    parser.add_argument('--latency', type=float, default=0.3, help='median seconds per call (default 0.3)')
+    parser.add_argument('--sigma', type=float, default=0.5, help='lognormal latency spread, 0 for fixed')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='share of calls that fail')
+    parser.add_argument('--error-status', type=int, default=500, help='HTTP status of failed calls')
+    parser.add_argument('--stall-rate', type=float, default=0.0, help='share of calls that stall')
+    parser.add_argument('--stall-seconds', type=float, default=30.0)
+    parser.add_argument('--seed', type=int)
+    args = parser.parse_args(argv)
+
+    mock = MockLLM(args.latency, args.sigma, args.error_rate, args.error_status,
+                   args.stall_rate, args.stall_seconds, args.seed)
+    print(f'mock LLM on http://{args.host}:{args.port} '
+          f'(OPENAI_BASE_URL=http://{args.host}:{args.port}/v1, '
+          f'ANTHROPIC_BASE_URL=http://{args.host}:{args.port})', flush=True)
+    asyncio.run(serve(mock, args.host, args.port))
+    print(json.dumps(dict(mock.stats)))
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
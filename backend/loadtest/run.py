@@ -0,0 +1,393 @@
+"""
+Load generator for a running backend.
+
+Replays a weighted mix of API traffic against a server and reports
+throughput, latency percentiles, error rates and status codes per
+endpoint. Request bodies come from the seeded benchmark workloads
+(benchmarks/workloads.py), so runs are repeatable.
+
+Usage (from backend/), with the stand-in AI provider from mock_llm.py:
+    python -m loadtest.mock_llm --latency 0.4 --error-rate 0.02 &
+    OPENAI_API_KEY=mock OPENAI_BASE_URL=http://127.0.0.1:8081/v1 RATE_LIMIT_SCALE=0 \\
+        gunicorn --preload -w 4 -b 127.0.0.1:5000 wsgi:app &
+    python -m loadtest.run --rate 200 --duration 60 --mock-url http://127.0.0.1:8081
+    python -m loadtest.run --concurrency 64 --mix generate-responses=1 --json report.json
+
+With --rate, requests arrive on a fixed schedule however slowly the
+server answers (open loop), and latency counts from the scheduled start,
+so time spent queueing for one of the --connections counts too. Use it
+to find the rate a given worker setup sustains. Without --rate,
+--concurrency clients each send their next request as soon as the last
+one is answered (closed loop), which finds maximum throughput.
+
+All traffic comes from one address, so run the server with
+RATE_LIMIT_SCALE=0 (or a large scale) unless the rate limiter itself is
+under test; 429s are reported per endpoint either way.
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from collections import Counter
+from urllib.parse import urlsplit
+
+from benchmarks import workloads
+
+DEFAULT_MIX = 'calculate-score=35,generate-responses=35,save-incident=10,incidents=20'
+
+# Distinct payloads per endpoint; repeated messages hit the analysis cache
+POOL_SIZE = 10000
+
+# Page size of the GET /incidents requests
+INCIDENT_PAGE = 50
+
+
+# ============================================
+# HTTP CLIENT
+# ============================================
+class Connection:
+    """One keep-alive HTTP/1.1 connection, reopened when the server closes it"""
+
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self.reader = None
+        self.writer = None
+
+    async def request(self, method: str, path: str, body: bytes | None = None) -> tuple:
+        """
+        Send one request.
+
+        Returns:
+            (status, response body)
+        """
+        head = f'{method} {path} HTTP/1.1\r\nHost: {self.host}:{self.port}\r\n'
+        if body is not None:
+            head += f'Content-Type: application/json\r\nContent-Length: {len(body)}\r\n'
+        data = head.encode('latin-1') + b'\r\n' + (body or b'')
+
+        reused = self.writer is not None
+        status_line = await self._exchange(data)
+        if not status_line and reused:
+            # The server dropped the idle keep-alive connection; retry on a new one
+            self.close()
+            status_line = await self._exchange(data)
+        if not status_line:
+            raise ConnectionError('Server closed the connection')
+        status = int(status_line.split(b' ', 2)[1])
+        headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        if headers.get('transfer-encoding', '').lower() == 'chunked':
+            data = await self._read_chunked()
+        elif 'content-length' in headers:
+            data = await self.reader.readexactly(int(headers['content-length']))
+        else:
+            data = await self.reader.read()
+            self.close()
+        if headers.get('connection', '').lower() == 'close':
+            self.close()
+        return status, data
+
+    async def _exchange(self, data: bytes) -> bytes:
+        """Send a request; returns the status line (empty if the server closed)"""
+        try:
+            if self.writer is None:
+                self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+            self.writer.write(data)
+            await self.writer.drain()
+            return await self.reader.readline()
+        except ConnectionResetError:
+            return b''
+
+    async def _read_chunked(self) -> bytes:
+        parts = []
+        while True:
+            size = int((await self.reader.readline()).split(b';', 1)[0], 16)
+            if size == 0:
+                # Trailers end with an empty line
+                while (await self.reader.readline()) not in (b'\r\n', b'\n', b''):
+                    pass
+                return b''.join(parts)
+            parts.append(await self.reader.readexactly(size))
+            await self.reader.readline()
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+
+# ============================================
+# TRAFFIC MIX
+# ============================================
+def _json(payload) -> bytes:
+    return json.dumps(payload).encode('utf-8')
+
+
+def build_endpoints(pool: int, seed: int) -> dict:
+    """
+    Request builders for each endpoint in the mix.
+
+    Returns:
+        {name: callable(rng) -> (method, path, body or None)}
+    """
+    messages = workloads.messages(pool, seed)
+    answer_sets = workloads.answer_sets(pool, seed)
+    incidents = workloads.incidents(pool, seed)
+    return {
+        'calculate-score': lambda rng: (
+            'POST', '/api/calculate-score', _json({'answers': rng.choice(answer_sets)})),
+        'generate-responses': lambda rng: (
+            'POST', '/api/generate-responses', _json({'message': rng.choice(messages)})),
+        'save-incident': lambda rng: (
+            'POST', '/api/save-incident', _json(rng.choice(incidents))),
+        'incidents': lambda rng: (
+            'GET', f'/api/incidents?limit={INCIDENT_PAGE}&order=desc', None),
+    }
+
+
+def parse_mix(spec: str, endpoints: dict) -> list:
+    """'name=weight,...' -> [(name, weight)]"""
+    mix = []
+    for part in spec.split(','):
+        name, _, weight = part.strip().partition('=')
+        if name not in endpoints:
+            raise ValueError(f"Unknown endpoint '{name}' (choose from {', '.join(endpoints)})")
+        mix.append((name, float(weight or 1)))
+    if not any(weight > 0 for _, weight in mix):
+        raise ValueError('The mix needs at least one positive weight')
+    return mix
+
+
+# ============================================
+# LOAD
+# ============================================
+class Recorder:
+    """Per-endpoint latencies and outcomes for requests started after warm-up"""
+
+    def __init__(self, record_from: float):
+        self.record_from = record_from
+        self.latencies = {}
+        self.statuses = {}
+
+    def record(self, endpoint: str, started: float, latency: float, outcome):
+        if started < self.record_from:
+            return
+        self.latencies.setdefault(endpoint, []).append(latency)
+        self.statuses.setdefault(endpoint, Counter())[outcome] += 1
+
+
+async def _send(connection: Connection, build, rng, timeout: float):
+    method, path, body = build(rng)
+    try:
+        status, _ = await asyncio.wait_for(connection.request(method, path, body), timeout)
+        return status
+    except asyncio.TimeoutError:
+        connection.close()
+        return 'timeout'
+    except (OSError, ValueError, asyncio.IncompleteReadError):
+        connection.close()
+        return 'connection_error'
+
+
+async def run_closed(host: str, port: int, endpoints: dict, mix: list, concurrency: int,
+                     duration: float, timeout: float, recorder: Recorder, seed: int):
+    names = [name for name, _ in mix]
+    weights = [weight for _, weight in mix]
+    deadline = time.perf_counter() + duration
+
+    async def client(index: int):
+        rng = random.Random(seed + index)
+        connection = Connection(host, port)
+        while time.perf_counter() < deadline:
+            name = rng.choices(names, weights)[0]
+            started = time.perf_counter()
+            outcome = await _send(connection, endpoints[name], rng, timeout)
+            recorder.record(name, started, time.perf_counter() - started, outcome)
+        connection.close()
+
+    await asyncio.gather(*(client(i) for i in range(concurrency)))
+
+
+async def run_open(host: str, port: int, endpoints: dict, mix: list, rate: float,
+                   connections: int, duration: float, timeout: float, recorder: Recorder, seed: int):
+    names = [name for name, _ in mix]
+    weights = [weight for _, weight in mix]
+    rng = random.Random(seed)
+    idle = asyncio.Queue()
+    for _ in range(connections):
+        idle.put_nowait(Connection(host, port))
+
+    async def fire(name: str, scheduled: float):
+        connection = await idle.get()
+        try:
+            outcome = await _send(connection, endpoints[name], rng, timeout)
+        finally:
+            idle.put_nowait(connection)
+        recorder.record(name, scheduled, time.perf_counter() - scheduled, outcome)
+
+    start = scheduled = time.perf_counter()
+    tasks = set()
+    while True:
+        # Poisson arrivals at the target rate
+        scheduled += rng.expovariate(rate)
+        if scheduled - start >= duration:
+            break
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        task = asyncio.create_task(fire(rng.choices(names, weights)[0], scheduled))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+
+    if tasks:
+        await asyncio.gather(*tasks)
+    while not idle.empty():
+        idle.get_nowait().close()
+
+
+async def fetch_json(url: str) -> dict | None:
+    """GET a JSON document (mock provider stats), or None if unreachable"""
+    parts = urlsplit(url)
+    connection = Connection(parts.hostname, parts.port or 80)
+    try:
+        status, data = await asyncio.wait_for(connection.request('GET', parts.path or '/'), 5)
+        return json.loads(data) if status == 200 else None
+    except (OSError, ValueError, asyncio.TimeoutError, asyncio.IncompleteReadError):
+        return None
+    finally:
+        connection.close()
+
+
+# ============================================
+# REPORT
+# ============================================
+def _percentile(sorted_values: list, pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def summarize(latencies: list, statuses: Counter, seconds: float) -> dict:
+    ordered = sorted(latencies)
+    requests = len(ordered)
+    errors = sum(count for outcome, count in statuses.items()
+                 if not isinstance(outcome, int) or outcome >= 400)
+    return {
+        'requests': requests,
+        'throughput': round(requests / seconds, 1) if seconds else 0.0,
+        'error_rate': round(errors / requests, 4) if requests else 0.0,
+        'p50_ms': round(_percentile(ordered, 50) * 1000, 1),
+        'p90_ms': round(_percentile(ordered, 90) * 1000, 1),
+        'p99_ms': round(_percentile(ordered, 99) * 1000, 1),
+        'max_ms': round(ordered[-1] * 1000, 1) if ordered else 0.0,
+        'statuses': {str(outcome): count for outcome, count in sorted(statuses.items(), key=str)},
+    }
+
+
+def build_report(recorder: Recorder, seconds: float) -> dict:
+    endpoints = {
+        name: summarize(recorder.latencies[name], recorder.statuses[name], seconds)
+        for name in sorted(recorder.latencies)
+    }
+    every = [latency for latencies in recorder.latencies.values() for latency in latencies]
+    statuses = sum(recorder.statuses.values(), Counter())
+    return {'seconds': round(seconds, 1), 'endpoints': endpoints, 'total': summarize(every, statuses, seconds)}
+
+
+def print_report(report: dict, out=sys.stdout):
+    header = f"{'endpoint':<20} {'requests':>9} {'req/s':>8} {'errors':>7} " \
+             f"{'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'max ms':>8}  statuses"
+    print(header, file=out)
+    print('-' * len(header), file=out)
+    rows = list(report['endpoints'].items()) + [('total', report['total'])]
+    for name, row in rows:
+        statuses = ' '.join(f'{outcome}:{count}' for outcome, count in row['statuses'].items())
+        print(f"{name:<20} {row['requests']:>9} {row['throughput']:>8} {row['error_rate']:>7.1%} "
+              f"{row['p50_ms']:>8} {row['p90_ms']:>8} {row['p99_ms']:>8} {row['max_ms']:>8}  {statuses}",
+              file=out)
+
+    if '429' in report['total']['statuses']:
+        print('\nnote: 429 responses mean the server rate limiter is active; '
+              'run it with RATE_LIMIT_SCALE=0 to measure capacity', file=out)
+    if report.get('mock_llm'):
+        calls = ', '.join(f'{outcome} {count}' for outcome, count in sorted(report['mock_llm'].items()))
+        print(f'\nmock LLM calls during the run: {calls or "none"}', file=out)
+
+
+# ============================================
+# CLI
+# ============================================
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Load-test a running backend')
+    parser.add_argument('--url', default='http://127.0.0.1:5000', help='server base URL')
+    parser.add_argument('--duration', type=float, default=30.0, help='seconds of load (default 30)')
+    parser.add_argument('--warmup', type=float, default=0.0, help='initial seconds left out of the report')
+    parser.add_argument('--rate', type=float, help='requests per second (open loop)')
+    parser.add_argument('--connections', type=int, default=256,
+                        help='connections available to --rate traffic (default 256)')
+    parser.add_argument('--concurrency', type=int, default=32,
+                        help='clients without --rate (closed loop, default 32)')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help=f'endpoint weights (default {DEFAULT_MIX})')
+    parser.add_argument('--timeout', type=float, default=30.0, help='per-request timeout in seconds')
+    parser.add_argument('--pool', type=int, default=POOL_SIZE, help='distinct payloads per endpoint')
+    parser.add_argument('--seed', type=int, default=workloads.SEED)
+    parser.add_argument('--mock-url', help='mock_llm base URL, to report its calls')
+    parser.add_argument('--json', help='also write the report to this file')
+    parser.add_argument('--max-error-rate', type=float,
+                        help='exit non-zero if the overall error rate is higher')
+    args = parser.parse_args(argv)
+
+    parts = urlsplit(args.url)
+    if parts.scheme != 'http':
+        parser.error('only http:// servers are supported')
+    endpoints = build_endpoints(args.pool, args.seed)
+    try:
+        mix = parse_mix(args.mix, endpoints)
+    except ValueError as e:
+        parser.error(str(e))
+
+    async def run() -> dict:
+        host, port = parts.hostname, parts.port or 80
+        mock_before = await fetch_json(args.mock_url.rstrip('/') + '/stats') if args.mock_url else None
+        start = time.perf_counter()
+        recorder = Recorder(start + args.warmup)
+        if args.rate:
+            await run_open(host, port, endpoints, mix, args.rate, args.connections,
+                           args.warmup + args.duration, args.timeout, recorder, args.seed)
+        else:
+            await run_closed(host, port, endpoints, mix, args.concurrency,
+                             args.warmup + args.duration, args.timeout, recorder, args.seed)
+        report = build_report(recorder, time.perf_counter() - start - args.warmup)
+        if mock_before is not None:
+            mock_after = await fetch_json(args.mock_url.rstrip('/') + '/stats') or {}
+            report['mock_llm'] = {
+                outcome: mock_after.get(outcome, 0) - mock_before.get(outcome, 0)
+                for outcome in ('ok', 'errors', 'stalled', 'bad_request')
+            }
+        return report
+
+    mode = f'{args.rate:g} req/s' if args.rate else f'{args.concurrency} clients'
+    print(f'load test: {args.url}, {mode}, {args.duration:g}s', file=sys.stderr)
+    report = asyncio.run(run())
+    print_report(report)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.max_error_rate is not None and report['total']['error_rate'] > args.max_error_rate:
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1 @@
+# Offline bulk scanner for exported message archives (see scanner/run.py)
@@ -0,0 +1,127 @@
+"""
+Memory-mapped archive reading for the bulk scanner.
+
+An archive is split into byte ranges that end on record boundaries, so
+every worker maps the same file and parses only its own range; the
+parent never reads or pickles message text. JSONL archives hold one
+JSON object per line. CSV archives start with a header row and may
+contain quoted fields with embedded newlines.
+"""
+import csv
+import json
+import mmap
+import os
+
+FORMATS = ('jsonl', 'csv')
+
+
+def detect_format(path: str) -> str:
+    ext = os.path.splitext(path)[1].lower()
+    return 'csv' if ext in ('.csv', '.tsv') else 'jsonl'
+
+
+def open_map(path: str) -> mmap.mmap | None:
+    """Read-only mapping of the whole file, or None for an empty file"""
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return None
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def csv_header(mm) -> tuple:
+    """Return (column names, offset of the first data row)"""
+    end = _record_end(mm, 0, len(mm), quoted=True)
+    row = next(csv.reader([mm[0:end].decode('utf-8-sig')]), [])
+    return [name.strip() for name in row], end
+
+
+def _record_end(mm, pos: int, limit: int, quoted: bool) -> int:
+    """Offset just past the record starting at pos (bounded by limit)"""
+    if not quoted:
+        nl = mm.find(b'\n', pos, limit)
+        return limit if nl == -1 else nl + 1
+    # A newline ends a CSV record only outside quotes (even quote count)
+    quotes = 0
+    while pos < limit:
+        nl = mm.find(b'\n', pos, limit)
+        end = limit if nl == -1 else nl + 1
+        quotes += mm[pos:end].count(b'"')
+        if quotes % 2 == 0:
+            return end
+        pos = end
+    return limit
+
+
+def _csv_boundary(mm, pos: int, target: int) -> int:
+    """First record boundary at or after target, for a chunk starting at pos"""
+    size = len(mm)
+    quotes = mm[pos:target].count(b'"')
+    end = target
+    while end < size:
+        if quotes % 2 == 0 and mm[end - 1] == ord('\n'):
+            return end
+        nl = mm.find(b'\n', end)
+        nxt = size if nl == -1 else nl + 1
+        quotes += mm[end:nxt].count(b'"')
+        end = nxt
+    return size
+
+
+def plan_chunks(mm, start: int, chunk_size: int, fmt: str):
+    """
+    Yield (start, end) byte ranges of roughly chunk_size bytes.
+
+    Args:
+        mm: Mapped archive
+        start: Offset of the first record to include
+        chunk_size: Target bytes per chunk
+        fmt: 'jsonl' or 'csv'
+
+    Yields:
+        Ranges that begin and end on record boundaries
+    """
+    size = len(mm)
+    pos = start
+    while pos < size:
+        target = min(pos + chunk_size, size)
+        if target == size:
+            end = size
+        elif fmt == 'csv':
+            end = _csv_boundary(mm, pos, target)
+        else:
+            end = _record_end(mm, target - 1, size, quoted=False)
+        yield pos, end
+        pos = end
+
+
+def iter_records(mm, start: int, end: int, fmt: str, field: str,
+                 id_field: str | None = None, columns: list | None = None):
+    """
+    Parse the records in [start, end).
+
+    Yields:
+        (offset, record_id, text, error) per record; blank lines are skipped
+    """
+    quoted = fmt == 'csv'
+    pos = start
+    while pos < end:
+        record_end = _record_end(mm, pos, end, quoted)
+        raw = mm[pos:record_end]
+        offset = pos
+        pos = record_end
+        if not raw.strip():
+            continue
+        try:
+            if quoted:
+                row = next(csv.reader([raw.decode('utf-8')]))
+                record = dict(zip(columns, row))
+            else:
+                record = json.loads(raw)
+                if not isinstance(record, dict):
+                    raise ValueError('record is not a JSON object')
+            text = record.get(field)
+            if not isinstance(text, str):
+                raise ValueError(f"missing text field '{field}'")
+            yield offset, record.get(id_field) if id_field else None, text, None
+        except (ValueError, UnicodeDecodeError, csv.Error) as e:
+            yield offset, None, None, str(e)
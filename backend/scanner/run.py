@@ -0,0 +1,275 @@
+"""
+Bulk scanner for exported platform archives.
+
+Streams a JSONL or CSV archive through the keyword analysis used by the
+API, spread across a process pool, and writes one JSON result per
+message plus per-category aggregates at the end.
+
+Usage (from backend/):
+    python -m scanner.run archive.jsonl -o results.jsonl
+    python -m scanner.run export.csv --field body --id-field message_id
+    python -m scanner.run archive.jsonl -o results.jsonl --resume
+    python -m scanner.run archive.jsonl --start-offset 104857600 --unordered
+
+The input is memory-mapped and cut into --chunk-size byte ranges that end
+on record boundaries; workers map the same file and parse their own
+range, so memory stays flat however large the archive is. Results are
+written in input order unless --unordered is given.
+
+Each result carries the byte offset of its record. After every chunk a
+checkpoint (<output>.checkpoint by default) records the offset up to
+which all results have been written, together with the aggregates so
+far; --resume truncates the output back to that point and continues
+from there. In --unordered mode chunks that finished past the checkpoint
+are scanned again on resume, so their results may appear twice.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from collections import Counter, deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+from . import archive
+
+DEFAULT_CHUNK_SIZE = 4 * 1024 * 1024
+# Chunks in flight per worker; bounds memory held by finished results
+CHUNKS_PER_WORKER = 4
+
+# Per-worker state set up once by _init_worker
+_worker = {}
+
+
+def _init_worker(path: str, fmt: str, field: str, id_field: str | None, columns: list | None):
+    # Keyword analysis only: never call out to an AI provider from a bulk scan
+    for var in ('OPENAI_API_KEY', 'ANTHROPIC_API_KEY', 'AI_PROVIDER'):
+        os.environ.pop(var, None)
+    from api.model import _keyword_analysis
+
+    _worker.update(
+        mm=archive.open_map(path),
+        analyze=_keyword_analysis,
+        fmt=fmt,
+        field=field,
+        id_field=id_field,
+        columns=columns,
+    )
+
+
+def _scan_chunk(span: tuple) -> tuple:
+    """Analyze one byte range; returns (start, end, output lines, aggregates)"""
+    start, end = span
+    analyze = _worker['analyze']
+    lines = []
+    severity = Counter()
+    categories = Counter()
+    errors = 0
+
+    for offset, record_id, text, error in archive.iter_records(
+            _worker['mm'], start, end, _worker['fmt'], _worker['field'],
+            _worker['id_field'], _worker['columns']):
+        result = {'offset': offset}
+        if record_id is not None:
+            result['id'] = record_id
+        if error is not None:
+            errors += 1
+            result['error'] = error
+        else:
+            analysis = analyze(text)
+            severity[analysis['severity']] += 1
+            categories.update(analysis['categories'])
+            result.update(analysis)
+        lines.append(json.dumps(result, ensure_ascii=False))
+
+    aggregates = {
+        'messages': sum(severity.values()),
+        'errors': errors,
+        'severity': dict(severity),
+        'categories': dict(categories),
+    }
+    return start, end, lines, aggregates
+
+
+def empty_aggregates() -> dict:
+    return {'messages': 0, 'errors': 0, 'severity': {}, 'categories': {}}
+
+
+def merge_aggregates(total: dict, part: dict) -> dict:
+    total['messages'] += part['messages']
+    total['errors'] += part['errors']
+    for key in ('severity', 'categories'):
+        counts = Counter(total[key])
+        counts.update(part[key])
+        total[key] = dict(counts)
+    return total
+
+
+def _results(executor, chunks, ordered: bool, window: int):
+    """Yield chunk results with at most `window` chunks in flight"""
+    if ordered:
+        pending = deque()
+        for span in chunks:
+            pending.append(executor.submit(_scan_chunk, span))
+            if len(pending) >= window:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+        return
+
+    pending = set()
+    for span in chunks:
+        pending.add(executor.submit(_scan_chunk, span))
+        if len(pending) >= window:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+    for future in pending:
+        yield future.result()
+
+
+def _available_cores() -> int:
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def load_checkpoint(path: str) -> dict | None:
+    if not path or not os.path.exists(path):
+        return None
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def save_checkpoint(path: str, data: dict):
+    # Write-then-rename so a crash never leaves a torn checkpoint
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+def scan(args) -> dict:
+    mm = archive.open_map(args.input)
+    size = len(mm) if mm is not None else 0
+    fmt = args.format or archive.detect_format(args.input)
+
+    columns = None
+    data_start = 0
+    if fmt == 'csv' and mm is not None:
+        columns, data_start = archive.csv_header(mm)
+        if args.field not in columns:
+            raise SystemExit(f"CSV has no '{args.field}' column (columns: {', '.join(columns)})")
+
+    checkpoint_path = args.checkpoint or (args.output + '.checkpoint' if args.output else None)
+    checkpoint = load_checkpoint(checkpoint_path) if args.resume else None
+    if checkpoint and checkpoint.get('input') != os.path.abspath(args.input):
+        raise SystemExit(f'checkpoint {checkpoint_path} belongs to {checkpoint.get("input")}')
+
+    start = max(args.start_offset, data_start)
+    totals = empty_aggregates()
+    if checkpoint:
+        start = max(start, checkpoint['offset'])
+        totals = checkpoint['aggregates']
+    if mm is not None and 0 < start < size and mm[start - 1] != ord('\n'):
+        raise SystemExit(f'offset {start} is not at the start of a record')
+
+    out = sys.stdout
+    if args.output:
+        out = open(args.output, 'a' if checkpoint or args.start_offset else 'w', encoding='utf-8')
+        if checkpoint and 'outputBytes' in checkpoint:
+            # Drop results written after the last checkpoint (e.g. killed mid-chunk)
+            out.truncate(checkpoint['outputBytes'])
+
+    workers = args.workers or _available_cores()
+    pool = ThreadPoolExecutor if args.threads else ProcessPoolExecutor
+    began = time.perf_counter()
+    scanned = 0
+
+    # Chunks finished past the contiguous prefix (unordered mode)
+    finished = {}
+    committed = start
+    try:
+        if mm is not None and start < size:
+            chunks = archive.plan_chunks(mm, start, args.chunk_size, fmt)
+            with pool(max_workers=workers, initializer=_init_worker,
+                      initargs=(args.input, fmt, args.field, args.id_field, columns)) as executor:
+                for chunk_start, chunk_end, lines, aggregates in _results(
+                        executor, chunks, not args.unordered, workers * CHUNKS_PER_WORKER):
+                    if lines:
+                        out.write('\n'.join(lines) + '\n')
+                    scanned += aggregates['messages'] + aggregates['errors']
+                    finished[chunk_start] = (chunk_end, aggregates)
+                    while committed in finished:
+                        committed, done = finished.pop(committed)
+                        merge_aggregates(totals, done)
+                    if checkpoint_path:
+                        out.flush()
+                        state = {
+                            'input': os.path.abspath(args.input),
+                            'offset': committed,
+                            'aggregates': totals,
+                        }
+                        if out is not sys.stdout and not args.unordered:
+                            state['outputBytes'] = out.tell()
+                        save_checkpoint(checkpoint_path, state)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+        if mm is not None:
+            mm.close()
+
+    elapsed = time.perf_counter() - began
+    return {
+        'input': args.input,
+        'bytes': size - start,
+        'scanned': scanned,
+        'seconds': round(elapsed, 3),
+        'messagesPerSecond': round(scanned / elapsed, 1) if elapsed else 0.0,
+        'totals': totals,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Scan a message archive for harassment patterns')
+    parser.add_argument('input', help='JSONL or CSV archive')
+    parser.add_argument('-o', '--output', help='results JSONL (default: stdout)')
+    parser.add_argument('--format', choices=archive.FORMATS,
+                        help='input format (default: from the file extension)')
+    parser.add_argument('--field', default='text', help='field/column holding the message text')
+    parser.add_argument('--id-field', help='field/column copied into each result as "id"')
+    parser.add_argument('--workers', type=int, default=0, help='worker count (default: all cores)')
+    parser.add_argument('--threads', action='store_true',
+                        help='use a thread pool instead of processes')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                        help='bytes of input per work unit')
+    parser.add_argument('--unordered', action='store_true',
+                        help='write results as chunks finish instead of in input order')
+    parser.add_argument('--start-offset', type=int, default=0,
+                        help='byte offset of the first record to scan')
+    parser.add_argument('--resume', action='store_true',
+                        help='continue from the checkpoint of a previous run')
+    parser.add_argument('--checkpoint', help='checkpoint file (default: <output>.checkpoint)')
+    parser.add_argument('--aggregates', help='write the final per-category aggregates JSON here')
+    args = parser.parse_args(argv)
+
+    if args.chunk_size <= 0:
+        parser.error('--chunk-size must be positive')
+
+    summary = scan(args)
+
+    if args.aggregates:
+        with open(args.aggregates, 'w') as f:
+            json.dump(summary, f, indent=2)
+            f.write('\n')
+
+    totals = summary['totals']
+    print(f"scanned {summary['scanned']} records in {summary['seconds']}s "
+          f"({summary['messagesPerSecond']}/s), {totals['errors']} errors", file=sys.stderr)
+    for category, count in sorted(totals['categories'].items(), key=lambda item: -item[1]):
+        print(f'  {category:<24} {count}', file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
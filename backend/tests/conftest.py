@@ -0,0 +1,27 @@
+"""
+Shared test setup.
+
+The api package reads its configuration from the environment at import
+time, so every database is pointed at a throwaway directory and AI
+providers are switched off before anything under api/ is imported.
+"""
+import os
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+_DATA_DIR = tempfile.mkdtemp(prefix='dfs-tests-')
+os.environ.update({
+    'INCIDENTS_DB': os.path.join(_DATA_DIR, 'incidents.db'),
+    'INCIDENTS_JSON': os.path.join(_DATA_DIR, 'incidents.json'),
+    'JOBS_DB': os.path.join(_DATA_DIR, 'jobs.db'),
+    'CONVERSATION_DB': '',
+    'ANALYSIS_CACHE_DB': '',
+    'RATE_LIMIT_DB': '',
+    'RATE_LIMIT_SCALE': '0',
+    'JOB_WORKERS': '0',
+})
+for _var in ('OPENAI_API_KEY', 'ANTHROPIC_API_KEY', 'AI_PROVIDER'):
+    os.environ.pop(_var, None)
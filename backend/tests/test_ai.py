@@ -0,0 +1,104 @@
+import asyncio
+import time
+
+import pytest
+
+from api import model
+from api.ai import AIAnalyzer, AnalyzerProvider, CircuitBreaker, FakeProvider, build_system_prompt
+
+
+class StaticProvider(AnalyzerProvider):
+    def __init__(self, name: str, result=None, error: Exception | None = None, delay: float = 0):
+        self.name = name
+        self.result = result
+        self.error = error
+        self.delay = delay
+        self.calls = 0
+
+    async def analyze(self, message: str) -> dict | None:
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+SEVERE = {'severity': 'severe', 'categories': ['threats']}
+
+
+def test_provider_must_implement_analyze():
+    class Incomplete(AnalyzerProvider):
+        name = 'incomplete'
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_prompt_lists_every_lexicon_category():
+    prompt = build_system_prompt(model._artifact['categories'])
+    assert 'intimate_images' in model._artifact['categories']
+    for category in model._artifact['categories']:
+        assert category in prompt
+
+
+def test_next_provider_answers_when_the_first_fails():
+    failing = StaticProvider('failing', error=RuntimeError('boom'))
+    working = StaticProvider('working', result=SEVERE)
+    assert AIAnalyzer([failing, working], deadline=1).analyze('hi') == SEVERE
+    assert failing.calls == working.calls == 1
+
+
+def test_slow_provider_returns_none_within_the_deadline():
+    analyzer = AIAnalyzer([StaticProvider('slow', result=SEVERE, delay=5)], deadline=0.2)
+    start = time.monotonic()
+    assert analyzer.analyze('hi') is None
+    assert time.monotonic() - start < 1
+
+
+def test_open_circuit_skips_the_provider():
+    failing = StaticProvider('failing', error=RuntimeError('boom'))
+    analyzer = AIAnalyzer([failing], deadline=1,
+                          breaker_factory=lambda: CircuitBreaker(failure_threshold=2, reset_timeout=60))
+    for _ in range(3):
+        assert analyzer.analyze('hi') is None
+    assert failing.calls == 2
+    assert analyzer.breakers['failing'].state == 'open'
+
+
+def test_unusable_answers_open_the_circuit():
+    invalid = StaticProvider('invalid', result=None)
+    working = StaticProvider('working', result=SEVERE)
+    analyzer = AIAnalyzer([invalid, working], deadline=1,
+                          breaker_factory=lambda: CircuitBreaker(failure_threshold=2, reset_timeout=60))
+    for _ in range(3):
+        assert analyzer.analyze('hi') == SEVERE
+    assert invalid.calls == 2
+    assert analyzer.breakers['invalid'].state == 'open'
+
+
+class BlockingProvider(AnalyzerProvider):
+    """Blocks the analyzer loop, so only the caller's own timeout can fire"""
+    name = 'blocking'
+
+    async def analyze(self, message: str) -> dict | None:
+        time.sleep(0.5)
+        return SEVERE
+
+
+def test_abandoned_call_logs_a_reason(caplog):
+    analyzer = AIAnalyzer([BlockingProvider()], deadline=0.1)
+    assert analyzer.analyze('hi') is None
+    assert asyncio.run(analyzer.analyze_async('hi')) is None
+    abandoned = [r.getMessage() for r in caplog.records if 'abandoned' in r.getMessage()]
+    assert abandoned == ['AI analysis abandoned: TimeoutError'] * 2
+
+
+def test_message_falls_back_to_keywords_without_caching(monkeypatch):
+    analyzer = AIAnalyzer([FakeProvider(model._keyword_analysis, latency=0, error_rate=1.0)], deadline=1)
+    monkeypatch.setattr(model, '_ai_analyzer', analyzer)
+    monkeypatch.setattr(model, '_ai_analyzer_loaded', True)
+
+    message = 'i know where you live and i will find you (fallback test)'
+    assert model.analyze_harassment_message(message) == model._keyword_analysis(message)
+    # A provider outage must not pin the keyword result
+    assert model.ANALYSIS_CACHE.get(message) is None
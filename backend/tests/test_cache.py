@@ -0,0 +1,37 @@
+from api.cache import AnalysisCache
+from api.model import ANALYSIS_CACHE, analyze_harassment_message
+
+
+def setup_function():
+    ANALYSIS_CACHE.clear()
+
+
+def test_case_changes_are_not_served_from_cache():
+    assert analyze_harassment_message('i will kill you')['severity'] == 'high'
+    shouted = analyze_harassment_message('I WILL KILL YOU')
+    assert shouted['severity'] == 'severe'
+    assert shouted['score'] == 8.75
+
+
+def test_mentions_are_part_of_the_key():
+    assert analyze_harassment_message('hello @killer_bob')['severity'] != 'low'
+    assert analyze_harassment_message('hello @sam')['severity'] == 'low'
+
+
+def test_match_offsets_belong_to_the_message():
+    analyze_harassment_message('you are ugly')
+    message = '@alexandra_long you are ugly'
+    match = analyze_harassment_message(message)['matches'][0]
+    assert message[match['start']:match['end']] == 'ugly'
+
+
+def test_callers_cannot_change_cached_entries():
+    cache = AnalysisCache('v1')
+    cache.put('msg', {'severity': 'high', 'categories': ['threats'],
+                      'matches': [{'start': 0, 'end': 4}]})
+    first = cache.get('msg')
+    first['categories'].append('insults')
+    first['matches'][0]['start'] = 99
+    second = cache.get('msg')
+    assert second['categories'] == ['threats']
+    assert second['matches'][0]['start'] == 0
@@ -0,0 +1,66 @@
+import asyncio
+
+import pytest
+
+from api import model
+from api.ai import AIAnalyzer, FakeProvider
+from api.cache import AnalysisCache
+from api.clustering import MessageClusters, signature
+
+MESSAGE = 'you are worthless and everyone hates you, log off for good'
+NEAR_DUPLICATE = 'You are w0rthless and everyone hates you, log off for good!!'
+
+
+class CountingProvider(FakeProvider):
+    def __init__(self):
+        super().__init__(model._keyword_analysis, latency=0)
+        self.calls = 0
+
+    async def analyze(self, message: str) -> dict | None:
+        self.calls += 1
+        return await super().analyze(message)
+
+
+@pytest.fixture
+def provider(monkeypatch):
+    provider = CountingProvider()
+    monkeypatch.setattr(model, '_ai_analyzer', AIAnalyzer([provider], deadline=1))
+    monkeypatch.setattr(model, '_ai_analyzer_loaded', True)
+    monkeypatch.setattr(model, 'MESSAGE_CLUSTERS', MessageClusters())
+    monkeypatch.setattr(model, 'ANALYSIS_CACHE', AnalysisCache(model.PATTERNS_VERSION))
+    return provider
+
+
+def test_near_duplicates_join_one_cluster():
+    clusters = MessageClusters()
+    clusters.add(signature(MESSAGE), {'severity': 'high'})
+    cluster = clusters.find(signature(NEAR_DUPLICATE))
+    assert cluster is not None and cluster['count'] == 2
+    assert clusters.find(signature('see you at practice tomorrow')) is None
+
+
+def test_near_duplicate_reuses_the_cluster_analysis(provider):
+    first = model.analyze_harassment_message(MESSAGE)
+    expected = {**first, 'categories': list(first['categories'])}
+    # Callers annotate results; that must not leak into the cluster
+    first['severity'] = 'low'
+    first['categories'].append('edited')
+
+    second = model.analyze_harassment_message(NEAR_DUPLICATE)
+    assert provider.calls == 1
+    assert second == expected
+
+    second['categories'].clear()
+    assert model.analyze_harassment_message(NEAR_DUPLICATE + ' ') == expected
+
+
+def test_async_near_duplicate_reuses_the_cluster_analysis(provider):
+    first = asyncio.run(model.analyze_harassment_message_async(MESSAGE))
+    expected = {**first, 'categories': list(first['categories'])}
+    first['categories'].append('edited')
+
+    second = asyncio.run(model.analyze_harassment_message_async(NEAR_DUPLICATE))
+    assert provider.calls == 1
+    assert second == expected
+    second['categories'].clear()
+    assert asyncio.run(model.analyze_harassment_message_async(NEAR_DUPLICATE + ' ')) == expected
@@ -0,0 +1,50 @@
+from api.conversations import ConversationStore
+
+WEIGHTS = {'threats': 5, 'insults': 2}
+THREAT = {'severity': 'high', 'categories': ['threats']}
+INSULT = {'severity': 'medium', 'categories': ['insults']}
+LOW = {'severity': 'low', 'categories': ['general harassment']}
+
+
+def test_workers_sharing_a_database_do_not_lose_messages(tmp_path):
+    path = str(tmp_path / 'conversations.db')
+    worker_a = ConversationStore(WEIGHTS, persist_path=path)
+    worker_b = ConversationStore(WEIGHTS, persist_path=path)
+
+    worker_a.record('conversation:1', INSULT, 2)
+    worker_b.record('conversation:1', INSULT, 2)
+    summary = worker_a.record('conversation:1', INSULT, 2)
+
+    assert summary['messages'] == 3
+    assert worker_b.get('conversation:1')['messages'] == 3
+    assert summary['categories'] == {'insults': 3}
+
+
+def test_persisted_states_are_counted_and_expire(tmp_path):
+    path = str(tmp_path / 'conversations.db')
+    worker_a = ConversationStore(WEIGHTS, ttl=60, persist_path=path)
+    worker_b = ConversationStore(WEIGHTS, ttl=60, persist_path=path)
+    worker_a.record('conversation:1', INSULT, 2)
+    worker_b.record('sender:1', INSULT, 2)
+    assert len(worker_a) == len(worker_b) == 2
+
+    worker_a._db().execute("UPDATE conversations SET last_seen = 0 WHERE key = 'sender:1'")
+    assert len(worker_b) == 1
+    assert worker_b.get('sender:1') is None
+    assert worker_b.record('sender:1', INSULT, 2)['messages'] == 1
+
+
+def test_first_message_does_not_count_as_escalation():
+    store = ConversationStore(WEIGHTS)
+    summary = store.record('conversation:1', THREAT, 5)
+    assert summary['escalated'] is False
+    assert summary['escalations'] == 0
+    assert summary['severity'] == 'high'
+
+
+def test_rising_severity_counts_as_escalation():
+    store = ConversationStore(WEIGHTS)
+    store.record('conversation:1', LOW, 0)
+    summary = store.record('conversation:1', THREAT, 5)
+    assert summary['escalated'] is True
+    assert summary['escalations'] == 1
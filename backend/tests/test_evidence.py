@@ -0,0 +1,82 @@
+from flask import Flask
+
+from app import EvidenceAggregator, analyze_evidence_data, api_bp
+
+
+def _client():
+    app = Flask(__name__)
+    app.register_blueprint(api_bp, url_prefix='/api')
+    return app.test_client()
+
+
+def _spread(count: int, start_hour: int, hours: int, source: str = 'twitter') -> list:
+    """count comments, one per entry, spread evenly over the hours"""
+    step = hours * 60 / count
+    return [{'source': source, 'count': 1,
+             'timestamp': f'{start_hour + int(i * step) // 60:02d}:{int(i * step) % 60:02d}'}
+            for i in range(count)]
+
+
+def test_aggregator_counts_sources_minutes_and_peak():
+    aggregator = EvidenceAggregator()
+    for entry in [
+        {'source': 'twitter', 'count': 3, 'timestamp': '07:47:24'},
+        {'source': 'instagram', 'count': 2, 'timestamp': '07:50'},
+        {'source': 'twitter', 'count': 1, 'timestamp': '09:00'},
+        {'count': 4},
+    ]:
+        aggregator.add(entry)
+
+    assert aggregator.total_comments == 10
+    assert aggregator.source_counts == {'twitter': 4, 'instagram': 2, 'unknown': 4}
+    assert aggregator.hourly_counts() == {7: 5, 9: 1}
+    assert aggregator.peak_window() == (5, 7 * 60 + 47)
+
+
+def test_negative_counts_cannot_hide_comments():
+    aggregator = EvidenceAggregator()
+    aggregator.add({'source': 'twitter', 'count': 12, 'timestamp': '10:00'})
+    aggregator.add({'source': 'twitter', 'count': -12, 'timestamp': '10:01'})
+    assert aggregator.total_comments == 12
+    assert aggregator.peak_window()[0] == 12
+
+
+def test_escalation_separates_pile_ons_that_severity_cannot():
+    # Both are 'High' by the old thresholds (more than 10 comments)
+    slow = analyze_evidence_data(_spread(40, 0, 20))
+    pile_on = analyze_evidence_data(_spread(40, 0, 20) + _spread(200, 21, 1, 'instagram')
+                                    + _spread(100, 21, 1, 'reddit'))
+    assert slow['severity'] == pile_on['severity'] == 'High'
+
+    assert slow['escalation']['level'] == 'baseline'
+    assert pile_on['escalation']['score'] > slow['escalation']['score'] + 30
+    assert pile_on['escalation']['level'] == 'coordinated'
+    assert {'rapid_rate', 'burst', 'multi_platform'} <= set(pile_on['escalation']['reasons'])
+
+
+def test_existing_fields_are_kept():
+    result = analyze_evidence_data([{'source': 'twitter', 'count': 2, 'timestamp': '07:47:24'}])
+    assert result['severity'] == 'Low'
+    assert result['autoSelected'] == ['Calm Response Template 1', 'Ignore and Monitor']
+    assert result['summary'].startswith('Found 2 total comments')
+
+
+def test_ndjson_upload_is_aggregated():
+    body = b'{"source": "twitter", "count": 3, "timestamp": "07:47"}\n\n{"source": "reddit", "count": 2}\n'
+    response = _client().post('/api/analyze-evidence', data=body,
+                              content_type='application/x-ndjson')
+    assert response.status_code == 200
+    assert response.get_json()['analysis']['sourceCounts'] == {'twitter': 3, 'reddit': 2}
+
+
+def test_malformed_evidence_is_a_400():
+    client = _client()
+    for body in (b'{"source": "twitter"}\n{not json\n', b'[1, 2]\n', b'"twitter"\n'):
+        response = client.post('/api/analyze-evidence', data=body,
+                               content_type='application/x-ndjson')
+        assert response.status_code == 400, body
+        assert 'Line' in response.get_json()['error']
+
+    for evidence in ([1, 2], {'source': 'twitter'}):
+        response = client.post('/api/analyze-evidence', json={'evidence': evidence})
+        assert response.status_code == 400, evidence
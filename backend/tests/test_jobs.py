@@ -0,0 +1,84 @@
+import time
+
+import pytest
+
+from api import routes, tasks
+from api.jobs import JOB_KINDS, JobQueue, WorkerPool
+
+
+def _wait_for(queue: JobQueue, job_id: str, status: str, timeout: float = 5) -> dict:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = queue.get(job_id)
+        if job['status'] == status:
+            return job
+        time.sleep(0.02)
+    pytest.fail(f'job {job_id} still {queue.get(job_id)["status"]}, expected {status}')
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return JobQueue(str(tmp_path / 'jobs.db'), max_attempts=2)
+
+
+def test_late_result_does_not_overwrite_a_taken_over_job(queue, monkeypatch):
+    other_worker = JobQueue(queue.db_path, max_attempts=2)
+
+    def slow(payload):
+        # This run outlives its lease and another worker takes the job over
+        queue._conn().execute('UPDATE jobs SET lease_until = 0')
+        assert other_worker.claim() is not None
+        return 'stale'
+
+    monkeypatch.setitem(JOB_KINDS, 'test_slow', (slow, None))
+    job_id = queue.submit('test_slow', None)['job_id']
+    assert queue.run_one()
+
+    job = queue.get(job_id, include_result=True)
+    assert job['status'] == 'running'
+    assert job['attempts'] == 2
+    assert 'result' not in job
+
+
+def test_unserializable_result_fails_the_job(queue, monkeypatch):
+    monkeypatch.setitem(JOB_KINDS, 'test_object', (lambda payload: object(), None))
+    job_id = queue.submit('test_object', None)['job_id']
+    assert queue.run_one()
+    job = queue.get(job_id)
+    assert job['status'] == 'queued'
+    assert 'not JSON serializable' in job['error']
+
+
+def test_worker_thread_survives_unexpected_errors(queue, monkeypatch):
+    run_one = queue.run_one
+    calls = []
+
+    def flaky():
+        calls.append(1)
+        if len(calls) == 1:
+            raise KeyError('corrupt row')
+        return run_one()
+
+    monkeypatch.setattr(queue, 'run_one', flaky)
+    monkeypatch.setitem(JOB_KINDS, 'test_echo', (lambda payload: payload, None))
+    pool = WorkerPool(queue, workers=1, poll_interval=0.01).start()
+    try:
+        job_id = queue.submit('test_echo', {'ok': True})['job_id']
+        _wait_for(queue, job_id, 'done')
+    finally:
+        pool.stop(timeout=5)
+
+
+def test_warm_up_resumes_jobs_left_from_a_previous_run(tmp_path, monkeypatch):
+    db_path = str(tmp_path / 'jobs.db')
+    monkeypatch.setitem(JOB_KINDS, 'test_echo', (lambda payload: payload, None))
+    # Queued by a process that has since exited
+    job_id = JobQueue(db_path).submit('test_echo', [1, 2])['job_id']
+
+    monkeypatch.setattr(tasks, 'JOBS_DB', db_path)
+    monkeypatch.setattr(tasks, 'JOB_WORKERS', 1)
+    monkeypatch.setattr(tasks, '_job_queue', None)
+    monkeypatch.delenv('SERVER_SOFTWARE', raising=False)
+    routes.warm_up()
+
+    _wait_for(tasks._job_queue, job_id, 'done')
@@ -0,0 +1,151 @@
+import asyncio
+import json
+import subprocess
+import sys
+import textwrap
+import threading
+
+from flask import Flask
+
+import asgi
+from api import routes
+from api.ratelimit import ADMISSION, AdmissionController, InFlightCounter, TokenBucketLimiter
+from api.routes import api_bp
+
+from conftest import BACKEND_DIR
+
+
+def _client():
+    app = Flask(__name__)
+    app.register_blueprint(api_bp, url_prefix='/api')
+    return app.test_client()
+
+
+def _worker(db: str, requests: int) -> subprocess.Popen:
+    """Another process publishing its in-flight count until its stdin closes"""
+    script = textwrap.dedent(f'''
+        import sys
+        sys.path.insert(0, {BACKEND_DIR!r})
+        from api.ratelimit import InFlightCounter
+        InFlightCounter({db!r}).publish({requests})
+        print('ready', flush=True)
+        sys.stdin.read()
+    ''')
+    worker = subprocess.Popen([sys.executable, '-c', script], stdin=subprocess.PIPE,
+                              stdout=subprocess.PIPE, text=True)
+    assert worker.stdout.readline().strip() == 'ready'
+    return worker
+
+
+def test_streamed_response_counts_until_closed():
+    client = _client()
+    before = ADMISSION.in_flight
+    response = client.post('/api/generate-responses/batch?stream=1',
+                           json={'messages': ['you are stupid']}, buffered=False)
+    assert response.status_code == 200
+    # View has returned but the body has not been written yet
+    assert ADMISSION.in_flight == before + 1
+    assert b'"severity"' in b''.join(response.response)
+    response.close()
+    assert ADMISSION.in_flight == before
+
+
+def test_sheds_on_requests_in_other_workers(tmp_path):
+    db = str(tmp_path / 'ratelimit.db')
+    admission = AdmissionController(None, {'api.heavy': (60, 10)}, max_in_flight=3,
+                                    counter=InFlightCounter(db))
+    worker = _worker(db, 3)
+    try:
+        admission.enter()
+        assert admission.in_flight == 1
+        assert admission.depth() == 4
+        assert admission.check('api.heavy', '1.2.3.4') is not None
+        admission.leave()
+    finally:
+        worker.stdin.close()
+        worker.wait()
+
+    # The dead worker's requests no longer count
+    admission.enter()
+    assert admission.depth() == 1
+    assert admission.check('api.heavy', '1.2.3.4') is None
+    admission.leave()
+
+
+def _limited(endpoint: str, burst: int) -> AdmissionController:
+    """Rate limits on one endpoint (60/min, so no refill during a test), no shedding"""
+    return AdmissionController(TokenBucketLimiter(), {endpoint: (60, burst)}, max_in_flight=0)
+
+
+def test_client_over_its_burst_gets_a_429(monkeypatch):
+    admission = _limited('api.calculate_score', 2)
+    monkeypatch.setattr(routes, 'ADMISSION', admission)
+    client = _client()
+
+    def post(address='127.0.0.1'):
+        # Servers close every response, which ends its admission
+        with client.post('/api/calculate-score', json={'answers': {'two_factor': True}},
+                         environ_base={'REMOTE_ADDR': address}) as response:
+            return response
+
+    assert [post().status_code for _ in range(2)] == [200, 200]
+    response = post()
+    assert response.status_code == 429
+    assert int(response.headers['Retry-After']) >= 1
+    assert 'error' in response.get_json()
+
+    # Buckets are per client
+    assert post('10.0.0.2').status_code == 200
+    assert admission.in_flight == 0
+
+
+def test_asgi_client_over_its_burst_gets_a_429(monkeypatch):
+    admission = _limited('api.generate_responses', 1)
+    monkeypatch.setattr(asgi, 'ADMISSION', admission)
+
+    async def call():
+        sent = []
+
+        async def receive():
+            return {'type': 'http.request', 'body': json.dumps({'message': 'hi'}).encode()}
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {'type': 'http', 'method': 'POST', 'path': '/api/generate-responses',
+                 'query_string': b'', 'client': ('127.0.0.1', 1),
+                 'headers': [(b'content-type', b'application/json')]}
+        await asgi.app(scope, receive, send)
+        return sent
+
+    assert asyncio.run(call())[0]['status'] == 200
+    start = asyncio.run(call())[0]
+    assert start['status'] == 429
+    assert int(dict(start['headers'])[b'retry-after']) >= 1
+    assert admission.in_flight == 0
+
+
+def test_in_flight_count_is_published_outside_the_request_lock():
+    class RecordingCounter:
+        def __init__(self):
+            self.published = []
+
+        def publish(self, requests):
+            assert not admission._lock.locked()
+            self.published.append(requests)
+
+    counter = RecordingCounter()
+    admission = AdmissionController(None, {}, counter=counter)
+
+    def requests():
+        for _ in range(500):
+            admission.enter()
+            admission.leave()
+
+    threads = [threading.Thread(target=requests) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # Coalesced writes, but the last one is the final count
+    assert counter.published[-1] == admission.in_flight == 0
@@ -0,0 +1,106 @@
+import copy
+import csv
+import io
+import json
+
+import pytest
+
+from scanner import archive, run
+
+MESSAGES = [
+    'you are stupid',
+    'see you tomorrow',
+    'I know where you live',
+    'nobody likes you, "loser"',
+    'line one\nline two\n\nline four',
+    'send me pics or else',
+    '"quoted",\nand a comma',
+    '',
+]
+
+
+@pytest.fixture
+def jsonl_path(tmp_path):
+    path = tmp_path / 'archive.jsonl'
+    lines = [json.dumps({'id': f'm{i}', 'text': MESSAGES[i % len(MESSAGES)]}) for i in range(60)]
+    path.write_text('\n'.join(lines[:30]) + '\n\n' + '\n'.join(lines[30:]) + '\n')
+    return path
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    path = tmp_path / 'archive.csv'
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    writer.writerow(['message_id', 'body'])
+    for i in range(60):
+        writer.writerow([f'm{i}', MESSAGES[i % len(MESSAGES)]])
+    path.write_text(buffer.getvalue())
+    return path
+
+
+def _records(mm, start: int, chunk_size: int, fmt: str, *fields) -> tuple:
+    """(planned chunks, records parsed chunk by chunk)"""
+    chunks = list(archive.plan_chunks(mm, start, chunk_size, fmt))
+    records = [record for chunk_start, chunk_end in chunks
+               for record in archive.iter_records(mm, chunk_start, chunk_end, fmt, *fields)]
+    return chunks, records
+
+
+@pytest.mark.parametrize('chunk_size', [1, 7, 64, 500, 10 ** 6])
+def test_jsonl_chunks_cover_the_archive_on_line_boundaries(jsonl_path, chunk_size):
+    mm = archive.open_map(str(jsonl_path))
+    chunks, records = _records(mm, 0, chunk_size, 'jsonl', 'text', 'id')
+
+    assert chunks[0][0] == 0 and chunks[-1][1] == len(mm)
+    assert all(end == start for (_, end), (start, _) in zip(chunks, chunks[1:]))
+    assert all(mm[end - 1] == ord('\n') for _, end in chunks)
+    assert [(record_id, text) for _, record_id, text, _ in records] == [
+        (f'm{i}', MESSAGES[i % len(MESSAGES)]) for i in range(60)
+    ]
+
+
+@pytest.mark.parametrize('chunk_size', [1, 3, 16, 100, 10 ** 6])
+def test_csv_quoted_newlines_survive_chunk_boundaries(csv_path, chunk_size):
+    mm = archive.open_map(str(csv_path))
+    columns, data_start = archive.csv_header(mm)
+    assert columns == ['message_id', 'body']
+
+    chunks, records = _records(mm, data_start, chunk_size, 'csv', 'body', 'message_id', columns)
+    assert len(chunks) > 1 or chunk_size == 10 ** 6
+    assert [error for *_, error in records] == [None] * 60
+    assert [(record_id, text) for _, record_id, text, _ in records] == [
+        (f'm{i}', MESSAGES[i % len(MESSAGES)]) for i in range(60)
+    ]
+
+
+def _scan(path, output, *extra) -> str:
+    run.main([str(path), '-o', str(output), '--id-field', 'id', '--threads', '--workers', '2',
+              '--chunk-size', '200', *extra])
+    return output.read_text()
+
+
+def test_resume_truncates_results_written_after_the_checkpoint(jsonl_path, tmp_path, monkeypatch):
+    expected = _scan(jsonl_path, tmp_path / 'clean.jsonl')
+
+    saved = []
+    save_checkpoint = run.save_checkpoint
+    monkeypatch.setattr(run, 'save_checkpoint',
+                        lambda path, data: (saved.append(copy.deepcopy(data)), save_checkpoint(path, data)))
+    output = tmp_path / 'results.jsonl'
+    _scan(jsonl_path, output)
+    monkeypatch.setattr(run, 'save_checkpoint', save_checkpoint)
+    assert len(saved) > 2
+
+    # Killed mid-run: the checkpoint is behind the output, which ends mid-line
+    middle = saved[len(saved) // 2]
+    with open(str(output) + '.checkpoint', 'w') as f:
+        json.dump(middle, f)
+    with open(output, 'a') as f:
+        f.write('{"offset": 99999, "sev')
+    assert output.stat().st_size > middle['outputBytes']
+
+    resumed = _scan(jsonl_path, output, '--resume')
+    assert resumed == expected
+    assert [json.loads(line)['id'] for line in resumed.splitlines()] == [f'm{i}' for i in range(60)]
+    assert run.load_checkpoint(str(output) + '.checkpoint')['aggregates'] == saved[-1]['aggregates']
@@ -0,0 +1,32 @@
+import random
+
+import pytest
+
+pytest.importorskip('numpy')
+
+from api.model import QUESTIONS, RISK_MESSAGES, calculate_safety_score
+from api.scoring import ScoringModel
+
+# Anything a client might send: unanswered, bools and truthy/falsy non-bools
+ANSWERS = [None, True, False, 0, 1, 2, '', 'yes', 'no', [], ['x'], {}, 0.0, 0.5]
+
+
+def _without_timestamp(result: dict) -> dict:
+    return {k: v for k, v in result.items() if k != 'timestamp'}
+
+
+def test_score_many_matches_calculate_safety_score():
+    rng = random.Random(8)
+    answer_sets = []
+    for _ in range(20000):
+        answers = {q['id']: rng.choice(ANSWERS) for q in QUESTIONS if rng.random() < 0.9}
+        if rng.random() < 0.1:
+            answers['not_a_question'] = True
+        answer_sets.append(answers)
+    answer_sets += [{}, {q['id']: True for q in QUESTIONS}, {q['id']: False for q in QUESTIONS}]
+
+    results = ScoringModel(QUESTIONS, RISK_MESSAGES).score_many(answer_sets)
+
+    assert len(results) == len(answer_sets)
+    for answers, result in zip(answer_sets, results):
+        assert _without_timestamp(result) == _without_timestamp(calculate_safety_score(answers)), answers
@@ -0,0 +1,22 @@
+import json
+import os
+
+from api.model import SEVERITY_SCORER
+
+PARITY_CASES = os.path.join(os.path.dirname(__file__), '..', '..', 'lexicon', 'scoring_parity_cases.json')
+
+
+def test_offsets_are_utf16_after_emoji():
+    match = SEVERITY_SCORER.analyze('😀 kill')['matches'][0]
+    assert (match['start'], match['end']) == (3, 7)
+
+
+def test_scores_match_the_frontend():
+    with open(PARITY_CASES, encoding='utf-8') as f:
+        cases = json.load(f)['cases']
+    for case in cases:
+        result = SEVERITY_SCORER.analyze(case['text'])
+        assert result['severity'] == case['severity'], case['text']
+        assert result['score'] == case['score'], case['text']
+        assert [{'start': m['start'], 'end': m['end'], 'keyword': m['keyword']}
+                for m in result['matches']] == case['matches'], case['text']
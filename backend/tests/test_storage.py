@@ -0,0 +1,77 @@
+import json
+import os
+import threading
+import time
+
+from api.storage import IncidentStore
+
+
+def _legacy_file(tmp_path, incidents: list) -> str:
+    path = str(tmp_path / 'incidents.json')
+    with open(path, 'w') as f:
+        json.dump(incidents, f)
+    return path
+
+
+def _incident(n: int, message: str) -> dict:
+    return {'id': f'inc-{n}', 'type': 'harassment', 'platform': 'x', 'severity': 'high',
+            'timestamp': f'2024-01-01T00:00:{n:02d}', 'message': message}
+
+
+def test_legacy_incidents_are_clustered(tmp_path):
+    legacy = _legacy_file(tmp_path, [
+        _incident(1, 'you will regret posting that photo'),
+        _incident(2, 'you will regret posting that photo'),
+        _incident(3, 'great game last night'),
+    ])
+    store = IncidentStore(str(tmp_path / 'incidents.db'), legacy)
+
+    assert store.count() == 3
+    [cluster] = store.clusters(min_count=2)
+    assert cluster['count'] == 2
+    assert [i['message'] for i in store.all()][:2] == ['you will regret posting that photo'] * 2
+    assert not os.path.exists(legacy)
+    assert os.path.exists(legacy + '.migrated')
+
+
+def test_workers_starting_together_migrate_once(tmp_path, monkeypatch):
+    replace = os.replace
+
+    def slow_replace(src, dst):
+        # Widen the window between one worker's commit and its rename
+        time.sleep(0.05)
+        replace(src, dst)
+
+    monkeypatch.setattr(os, 'replace', slow_replace)
+    legacy = _legacy_file(tmp_path, [_incident(n, f'message number {n}') for n in range(50)])
+    db_path = str(tmp_path / 'incidents.db')
+    IncidentStore(db_path)  # schema in place, as after a deploy
+
+    workers = 8
+    barrier = threading.Barrier(workers)
+    errors = []
+
+    def start_worker():
+        barrier.wait()
+        try:
+            IncidentStore(db_path, legacy)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=start_worker) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert IncidentStore(db_path).count() == 50
+
+
+def test_missing_legacy_file_counts_as_migrated(tmp_path):
+    legacy = _legacy_file(tmp_path, [_incident(1, 'hello')])
+    db_path = str(tmp_path / 'incidents.db')
+    IncidentStore(db_path, legacy)
+    # Another worker's rename left nothing behind
+    IncidentStore(db_path, legacy)
+    assert IncidentStore(db_path).count() == 1
@@ -0,0 +1,67 @@
+import asyncio
+import json
+
+from flask import Flask
+
+import asgi
+from api import routes
+
+MESSAGES = ['you are stupid', 'see you tomorrow']
+
+
+async def _failing_batch(messages, locale):
+    yield {'index': 0, 'severity': 'high'}
+    raise RuntimeError('analyzer crashed')
+
+
+def _failing_batch_sync(messages, locale):
+    yield {'index': 0, 'severity': 'high'}
+    raise RuntimeError('analyzer crashed')
+
+
+def _call_asgi(path: str, body: dict, query: bytes = b'') -> list:
+    messages = [{'type': 'http.request', 'body': json.dumps(body).encode()}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0) if messages else {'type': 'http.disconnect'}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {'type': 'http', 'method': 'POST', 'path': path, 'query_string': query,
+             'headers': [(b'content-type', b'application/json')], 'client': ('127.0.0.1', 1)}
+    asyncio.run(asgi.app(scope, receive, send))
+    return sent
+
+
+def test_asgi_stream_failure_ends_with_an_error_line(monkeypatch):
+    monkeypatch.setattr(asgi, 'analyze_message_batch_async', _failing_batch)
+    sent = _call_asgi('/api/generate-responses/batch', {'messages': MESSAGES}, b'stream=1')
+
+    assert [m['type'] for m in sent].count('http.response.start') == 1
+    assert sent[0]['status'] == 200
+    assert not sent[-1].get('more_body', False)
+    lines = b''.join(m.get('body', b'') for m in sent[1:]).splitlines()
+    assert json.loads(lines[0])['index'] == 0
+    assert json.loads(lines[-1]) == {'error': 'analyzer crashed'}
+
+
+def test_asgi_failure_before_streaming_is_a_500(monkeypatch):
+    monkeypatch.setattr(asgi, 'analyze_message_batch_async', _failing_batch)
+    sent = _call_asgi('/api/generate-responses/batch', {'messages': MESSAGES})
+
+    assert sent[0]['status'] == 500
+    assert json.loads(sent[1]['body']) == {'error': 'analyzer crashed'}
+
+
+def test_flask_stream_failure_ends_with_an_error_line(monkeypatch):
+    monkeypatch.setattr(routes, 'analyze_message_batch', _failing_batch_sync)
+    app = Flask(__name__)
+    app.register_blueprint(routes.api_bp, url_prefix='/api')
+    response = app.test_client().post('/api/generate-responses/batch?stream=1',
+                                      json={'messages': MESSAGES})
+
+    assert response.status_code == 200
+    lines = response.data.splitlines()
+    assert json.loads(lines[-1]) == {'error': 'analyzer crashed'}
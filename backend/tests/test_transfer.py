@@ -0,0 +1,147 @@
+import gzip
+import io
+import json
+import struct
+import tracemalloc
+import zlib
+
+import pytest
+
+from api import transfer
+from api.storage import IncidentStore
+from api.transfer import EXPORT_FORMATS, MAGIC, export_ndjson_gz, import_incidents, read_incidents
+
+INCIDENTS = [
+    {'id': 'inc-1', 'timestamp': '2024-03-01T10:00:00', 'type': 'threat', 'platform': 'x',
+     'severity': 'severe', 'message': 'I know where you live 🔪', 'notes': 'reported'},
+    {'id': 'inc-2', 'timestamp': '2024-03-01T10:05:00', 'type': 'threat', 'platform': 'x',
+     'severity': 'severe', 'message': 'I know where you live 🔪'},
+    {'id': 'inc-3', 'timestamp': '2024-03-02T08:00:00', 'type': 'insult', 'platform': 'instagram',
+     'severity': 'medium', 'message': 'tu es nulle, arrête', 'score': 4.5, 'tags': ['dm']},
+]
+
+
+def _export(store: IncidentStore, fmt: str) -> bytes:
+    writer, _, _ = EXPORT_FORMATS[fmt]
+    return b''.join(writer(incident for _, incident in store.query()))
+
+
+def _without_cluster(incidents: list) -> list:
+    return [{k: v for k, v in incident.items() if k != 'cluster_id'} for incident in incidents]
+
+
+@pytest.fixture
+def source(tmp_path):
+    store = IncidentStore(str(tmp_path / 'source.db'))
+    store.extend(INCIDENTS)
+    return store
+
+
+@pytest.mark.parametrize('fmt', sorted(EXPORT_FORMATS))
+def test_round_trip(source, tmp_path, fmt):
+    target = IncidentStore(str(tmp_path / f'target-{fmt}.db'))
+    stats = import_incidents(target, read_incidents(io.BytesIO(_export(source, fmt))))
+
+    assert stats == {'imported': 3, 'skipped': 0}
+    assert _without_cluster(target.all()) == INCIDENTS
+    # Clusters are rebuilt in the target store
+    assert target.clusters(min_count=2)[0]['count'] == 2
+
+
+@pytest.mark.parametrize('fmt', sorted(EXPORT_FORMATS))
+def test_reimport_skips_existing_ids(source, fmt):
+    stats = import_incidents(source, read_incidents(io.BytesIO(_export(source, fmt))))
+    assert stats == {'imported': 0, 'skipped': 3}
+    assert source.count() == 3
+
+
+def test_truncated_archive_reports_an_error(tmp_path):
+    data = b''.join(export_ndjson_gz(iter(INCIDENTS * 50)))
+    target = IncidentStore(str(tmp_path / 'target.db'))
+    stats = import_incidents(target, read_incidents(io.BytesIO(data[:len(data) // 2])))
+    assert 'error' in stats
+
+
+def _dfsc(header, groups: list) -> bytes:
+    """DFSC bytes with any header and [[(column values...)]] row groups"""
+    header = json.dumps(header).encode()
+    out = [MAGIC, b'\x01', struct.pack('<I', len(header)), header]
+    for columns in groups:
+        out.append(struct.pack('<I', len(columns[0])))
+        for values in columns:
+            data = [v.encode() for v in values]
+            block = zlib.compress(struct.pack(f'<{len(data)}I', *map(len, data)) + b''.join(data))
+            out += [struct.pack('<I', len(block)), block]
+    out.append(struct.pack('<I', 0))
+    return b''.join(out)
+
+
+@pytest.mark.parametrize('data', [
+    _dfsc({'cols': ['id']}, []),
+    _dfsc(['id'], []),
+    _dfsc({'columns': ['id', 7]}, []),
+    _dfsc({'columns': ['id', 'extra']}, [[('inc-1',), ('[1, 2]',)]]),
+    b'{"id": {"$gt": ""}, "message": "hi"}\n',
+    b'{"id": "inc-1", "platform": ["x"]}\n',
+], ids=['no columns', 'list header', 'non-string column', 'extra not an object',
+        'object id', 'list platform'])
+def test_malformed_input_is_reported_not_raised(tmp_path, data):
+    store = IncidentStore(str(tmp_path / 'target.db'))
+    stats = import_incidents(store, read_incidents(io.BytesIO(data)))
+    assert 'error' in stats
+    assert store.count() == 0
+
+
+def test_valid_rows_before_a_malformed_one_are_kept(tmp_path):
+    data = b'{"id": "inc-1", "message": "hi"}\n{"id": 5}\n'
+    store = IncidentStore(str(tmp_path / 'target.db'))
+    stats = import_incidents(store, read_incidents(io.BytesIO(data)))
+    assert stats['imported'] == 1
+    assert stats['error'] == 'Incident 2: "id" must be a string'
+
+
+def _peak_memory(fn) -> int:
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def test_gzip_bomb_is_decompressed_in_bounded_steps():
+    # ~100 KB on the wire, 50 MB of (blank) lines once decompressed
+    data = gzip.compress((b' ' * 1023 + b'\n') * 50 * 1024)
+    assert len(data) < 128 * 1024
+    peak = _peak_memory(lambda: list(read_incidents(io.BytesIO(data))))
+    assert peak < 2 * 1024 * 1024
+
+
+def test_overlong_line_is_rejected(monkeypatch):
+    monkeypatch.setattr(transfer, 'MAX_LINE_BYTES', 1024 * 1024)
+    data = gzip.compress(b'{"message": "' + b'x' * 20 * 1024 * 1024)
+    with pytest.raises(ValueError, match='longer than'):
+        _peak_memory(lambda: list(read_incidents(io.BytesIO(data))))
+
+
+def test_oversized_dfsc_row_group_is_rejected(monkeypatch):
+    monkeypatch.setattr(transfer, 'MAX_GROUP_BYTES', 1024 * 1024)
+    data = _dfsc({'columns': ['id']}, [[('x' * 2 * 1024 * 1024,)]])
+    with pytest.raises(ValueError, match='larger than'):
+        list(read_incidents(io.BytesIO(data)))
+
+
+def test_dfsc_row_count_is_capped():
+    header = json.dumps({'columns': ['id']}).encode()
+    data = MAGIC + b'\x01' + struct.pack('<I', len(header)) + header + struct.pack('<I', 2 ** 31)
+    with pytest.raises(ValueError, match='more than'):
+        list(read_incidents(io.BytesIO(data)))
+
+
+def test_corrupt_dfsc_lengths_are_rejected():
+    header = json.dumps({'columns': ['id']}).encode()
+    block = zlib.compress(struct.pack('<I', 1000) + b'short')
+    data = (MAGIC + b'\x01' + struct.pack('<I', len(header)) + header + struct.pack('<I', 1) +
+            struct.pack('<I', len(block)) + block + struct.pack('<I', 0))
+    with pytest.raises(ValueError, match='Corrupt'):
+        list(read_incidents(io.BytesIO(data)))
@@ -0,0 +1,43 @@
+"""
+WSGI entry point for Digital Footprint Shield.
+
+    cd backend
+    flask run                          # development
+    gunicorn --preload wsgi:app        # production
+
+create_app() registers the API blueprints and builds everything the
+first request would otherwise build on demand: the incident store
+(schema, search index, legacy migration), the AI analyzer with its
+provider SDKs, the scoring model and today's response templates. The
+lexicon, matcher and template packs are compiled once at import.
+
+With --preload all of this happens once in the gunicorn master and the
+forked workers start ready to serve; SQLite connections and the AI
+event loop are reopened in each worker after the fork.
+"""
+from flask import Flask
+
+from api.routes import api_bp, warm_up
+from app import api_bp as evidence_bp
+
+
+def create_app(warm: bool = True) -> Flask:
+    """
+    Create the Flask application.
+
+    Args:
+        warm: Build per-process state now instead of on the first request
+
+    Returns:
+        Flask app serving /api
+    """
+    flask_app = Flask(__name__)
+    flask_app.register_blueprint(api_bp, url_prefix='/api')
+    # app.py's blueprint is also named 'api'
+    flask_app.register_blueprint(evidence_bp, url_prefix='/api', name='evidence')
+    if warm:
+        warm_up()
+    return flask_app
+
+
+app = create_app()
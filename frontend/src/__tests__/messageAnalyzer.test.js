@@ -0,0 +1,118 @@
+/**
+ * Message Analyzer Tests
+ * Run with: npm test
+ */
+import { analyzeMessage } from '../utils/messageAnalyzer'
+import { findCategories, findMatches, scoreMessage, LEXICON_VERSION } from '../utils/keywordMatcher'
+import parity from '../../../lexicon/scoring_parity_cases.json'
+
+describe('analyzeMessage', () => {
+
+  test('detects categories in lexicon order with summed weights', () => {
+    const result = analyzeMessage('You are ugly and I know where you live')
+
+    expect(result.categories).toEqual(['stalking', 'insults'])
+    expect(result.score).toBe(7)
+    expect(result.severity).toBe('high')
+  })
+
+  test('detects Swahili keywords and intimate image threats', () => {
+    const result = analyzeMessage('Nitakupata. I will leak your nudes')
+
+    expect(result.categories).toContain('threats')
+    expect(result.categories).toContain('intimate_images')
+    expect(result.severity).toBe('severe')
+  })
+
+  test('falls back to general harassment when nothing matches', () => {
+    const result = analyzeMessage('Have a nice day')
+
+    expect(result.categories).toEqual(['general harassment'])
+    expect(result.severity).toBe('low')
+  })
+
+  test('reports the compiled lexicon version', () => {
+    expect(analyzeMessage('hello').lexiconVersion).toBe(LEXICON_VERSION)
+  })
+})
+
+describe('findMatches', () => {
+
+  test('returns overlapping matches with offsets', () => {
+    const text = 'I will share your photos'
+    const matches = findMatches(text)
+
+    const categories = matches.map(m => m.category)
+    expect(categories).toContain('doxxing')
+    expect(categories).toContain('intimate_images')
+    matches.forEach(m => {
+      expect(text.toLowerCase().slice(m.start, m.end)).toBe(m.keyword)
+    })
+  })
+})
+
+describe('normalized matching', () => {
+
+  test('ignores keywords inside unrelated words', () => {
+    expect(findCategories('Nice photo from the pharmacy')).toEqual(new Set())
+    expect(findCategories('That was harmless')).toEqual(new Set())
+  })
+
+  test('catches leetspeak, spacing, repeats and look-alike letters', () => {
+    expect(findCategories('I will k1ll you')).toEqual(new Set(['threats']))
+    expect(findCategories('send n u d e s')).toEqual(new Set(['sexual']))
+    expect(findCategories('you are so stuuupid')).toEqual(new Set(['insults']))
+    expect(findCategories('\u0455tupid')).toEqual(new Set(['insults']))
+  })
+
+  test('allows simple inflections and reports original spans', () => {
+    const text = 'He keeps KILLING it'
+    const [match] = findMatches(text)
+
+    expect(match.keyword).toBe('kill')
+    expect(text.slice(match.start, match.end)).toBe('KILLING')
+  })
+})
+
+describe('scoreMessage', () => {
+
+  test('weights terms within a category', () => {
+    expect(scoreMessage("I'm sorry").severity).toBe('low')
+    expect(scoreMessage('I will kill you').score).toBe(7)
+  })
+
+  test('boosts terms that appear close together', () => {
+    const apart = scoreMessage('I know where the party is tonight, see you there and bring snacks, your house was fun')
+    const near = scoreMessage('I know where your house is')
+
+    expect(near.score).toBeGreaterThan(apart.score)
+    expect(near.severity).toBe('severe')
+  })
+
+  test('counts repetition with diminishing weight', () => {
+    expect(scoreMessage('ugly').score).toBe(2)
+    expect(scoreMessage('ugly ugly').score).toBe(3)
+    expect(scoreMessage('ugly ugly ugly ugly ugly').score).toBe(4)
+  })
+
+  test('counts overlapping hits of a category once and reports spans', () => {
+    const text = 'I KNOW WHERE YOU LIVE'
+    const result = scoreMessage(text)
+
+    expect(result.matches).toHaveLength(1)
+    expect(result.matches[0].keyword).toBe('i know where you live')
+    expect(text.slice(result.matches[0].start, result.matches[0].end)).toBe(text)
+    expect(result.score).toBe(6.25)
+  })
+
+  test('scores the shared parity cases exactly like the backend', () => {
+    parity.cases.forEach(({ text, severity, score, matches }) => {
+      const result = scoreMessage(text)
+      expect(result.severity).toBe(severity)
+      expect(result.score).toBe(score)
+      expect(result.matches.map(({ start, end, keyword }) => ({ start, end, keyword }))).toEqual(matches)
+    })
+    // UTF-16 offsets: the emoji counts as two units
+    expect(scoreMessage('😀 kill').matches[0].start).toBe(3)
+  })
+})
@@ -0,0 +1,320 @@
+/**
+ * Keyword Matcher Utility
+ * Loads the precompiled harassment matcher shared with the backend
+ *
+ * harassmentMatcher.json is generated from lexicon/harassment_lexicon.json
+ * by `python lexicon/build_lexicon.py`. It holds a ready-to-use Aho-Corasick
+ * automaton, so nothing is rebuilt at startup and a message is scanned in a
+ * single pass. The backend loads the very same artifact, which keeps client
+ * and server results identical.
+ *
+ * Messages are normalized exactly like backend/api/normalize.py (case,
+ * confusables, leetspeak, spaced-out letters, repeated characters) using
+ * the tables stored in the artifact, and a keyword only counts when it
+ * covers whole words, so "hot" no longer matches inside "photo".
+ */
+import compiled from './harassmentMatcher.json'
+
+const { categories, weights, keywords, goto, fail, out, normalization, scoring } = compiled
+const { leet, confusables, symbols, apostrophes, suffixes, minSpacedRun } = normalization
+
+const WORD_EXTRA = new Set([...'0123456789', ...symbols, ...apostrophes])
+const EDGE_CHARS = new Set([...symbols, ...apostrophes])
+const APOSTROPHES = new Set([...apostrophes])
+const SUFFIXES = new Set(suffixes)
+const foldCache = new Map()
+
+// Sent with client-side results so the backend can skip re-analysis
+export const LEXICON_VERSION = compiled.patternsVersion
+
+// Category order and weights, e.g. { threats: 5, sexual: 4, ... }
+export const CATEGORY_WEIGHTS = Object.fromEntries(
+  categories.map((category, i) => [category, weights[i]])
+)
+
+/**
+ * Lower-case, decompose, drop marks and map confusables for one character.
+ * Anything that cannot be part of a word becomes a space.
+ */
+function foldChar(ch) {
+  let folded = foldCache.get(ch)
+  if (folded === undefined) {
+    folded = ''
+    for (let c of ch.toLowerCase().normalize('NFKD')) {
+      if (/\p{M}/u.test(c)) continue
+      c = confusables[c] ?? c
+      folded += /\p{L}/u.test(c) || WORD_EXTRA.has(c) ? c : ' '
+    }
+    foldCache.set(ch, folded)
+  }
+  return folded
+}
+
+/**
+ * Drop apostrophes and read digits and symbols as leetspeak
+ */
+function cleanToken(chars) {
+  return chars
+    .filter(c => !APOSTROPHES.has(c))
+    .map(c => leet[c] ?? c)
+    .join('')
+}
+
+/**
+ * Normalize a message into space-separated tokens
+ * @param {string} text - Raw message text
+ * @returns {Object} { chars, tokenStarts, tokenSpans } where chars is the
+ *   normalized text as code points and tokenSpans index into `text`
+ */
+export function normalize(text) {
+  const tokens = []
+  let raw = []
+
+  const flush = () => {
+    let first = 0
+    let last = raw.length
+    while (first < last && EDGE_CHARS.has(raw[first].c)) first++
+    while (last > first && EDGE_CHARS.has(raw[last - 1].c)) last--
+    if (first < last) {
+      const kept = raw.slice(first, last)
+      tokens.push({
+        token: cleanToken(kept.map(r => r.c)),
+        start: kept[0].start,
+        end: kept[kept.length - 1].end,
+      })
+    }
+    raw = []
+  }
+
+  let offset = 0
+  for (const ch of text) {
+    for (const c of foldChar(ch)) {
+      if (c === ' ') flush()
+      else raw.push({ c, start: offset, end: offset + ch.length })
+    }
+    offset += ch.length
+  }
+  flush()
+
+  // Join runs of single characters ("n u d e s") and collapse repeats
+  const outTokens = []
+  const tokenSpans = []
+  let i = 0
+  while (i < tokens.length) {
+    let j = i
+    while (j < tokens.length && [...tokens[j].token].length === 1) j++
+    if (j - i >= minSpacedRun) {
+      outTokens.push(tokens.slice(i, j).map(t => t.token).join(''))
+      tokenSpans.push([tokens[i].start, tokens[j - 1].end])
+      i = j
+      continue
+    }
+    outTokens.push(tokens[i].token)
+    tokenSpans.push([tokens[i].start, tokens[i].end])
+    i++
+  }
+
+  const chars = []
+  const tokenStarts = []
+  outTokens.forEach((token, k) => {
+    if (k > 0) chars.push(' ')
+    tokenStarts.push(chars.length)
+    chars.push(...token.replace(/(.)\1+/gu, '$1'))
+  })
+
+  return { chars, tokenStarts, tokenSpans }
+}
+
+/**
+ * Walk the automaton over normalized text, reporting whole-word hits only
+ * @param {Array<string>} chars - Normalized text as code points
+ * @param {Function} onMatch - Called with (start, end, entryId) for each hit
+ */
+function scan(chars, onMatch) {
+  let state = 0
+
+  for (let i = 0; i < chars.length; i++) {
+    const ch = chars[i]
+    for (;;) {
+      const next = goto[state][ch]
+      if (next !== undefined) {
+        state = next
+        break
+      }
+      if (state === 0) break
+      state = fail[state]
+    }
+    if (out[state].length === 0) continue
+
+    // Ends mid-token: only allowed when the rest is an inflection
+    const end = i + 1
+    if (end < chars.length && chars[end] !== ' ') {
+      let tokenEnd = end
+      while (tokenEnd < chars.length && chars[tokenEnd] !== ' ') tokenEnd++
+      if (!SUFFIXES.has(chars.slice(end, tokenEnd).join(''))) continue
+    }
+    for (const id of out[state]) {
+      const start = end - keywords[id][2]
+      if ((start === 0 || chars[start - 1] === ' ') && onMatch(start, end, id) === false) return
+    }
+  }
+}
+
+/**
+ * Find the harassment categories present in a message
+ * @param {string} text - The message to scan
+ * @returns {Set<string>} Categories with at least one keyword hit
+ */
+export function findCategories(text) {
+  const found = new Set()
+  scan(normalize(text).chars, (_start, _end, id) => {
+    found.add(categories[keywords[id][1]])
+    // Stop early once every category has been seen
+    return found.size < categories.length
+  })
+  return found
+}
+
+function tokenAt(tokenStarts, offset) {
+  let lo = 0
+  let hi = tokenStarts.length - 1
+  while (lo < hi) {
+    const mid = (lo + hi + 1) >> 1
+    if (tokenStarts[mid] <= offset) lo = mid
+    else hi = mid - 1
+  }
+  return lo
+}
+
+/**
+ * Find every keyword occurrence (including overlapping ones)
+ * @param {string} text - The message to scan
+ * @returns {Array} Matches as { start, end, category, keyword }; offsets
+ *   cover the whole original words (e.g. "K1LLING" for "kill")
+ */
+export function findMatches(text) {
+  const { chars, tokenStarts, tokenSpans } = normalize(text)
+  const matches = []
+  scan(chars, (start, end, id) => {
+    const [keyword, categoryIndex] = keywords[id]
+    matches.push({
+      start: tokenSpans[tokenAt(tokenStarts, start)][0],
+      end: tokenSpans[tokenAt(tokenStarts, end - 1)][1],
+      category: categories[categoryIndex],
+      keyword,
+    })
+  })
+  return matches
+}
+
+// Scoring rules (see backend/api/severity.py), resolved once per keyword entry
+const ENTRY_CATEGORY = keywords.map(([, categoryIndex]) => categoryIndex)
+const ENTRY_WEIGHT = keywords.map(([, categoryIndex], id) => weights[categoryIndex] * scoring.termWeights[id])
+const ENTRY_WORDS = keywords.map(([keyword]) => normalize(keyword).tokenStarts.length)
+const ENTRY_RULES = keywords.map(() => [])
+scoring.proximity.forEach((rule, index) => {
+  rule.terms.forEach(id => ENTRY_RULES[id].push([index, 0]))
+  rule.near.forEach(id => ENTRY_RULES[id].push([index, 1]))
+})
+
+function round2(value) {
+  return Math.round(value * 100) / 100
+}
+
+function isShouted(text) {
+  return text === text.toUpperCase() && text !== text.toLowerCase()
+}
+
+/**
+ * Weighted severity score of a message, identical to the backend's
+ * keyword analysis: term weights, repetition, proximity boosts and
+ * shouting all count, and every counted hit is reported with its span
+ * @param {string} text - The message to score
+ * @returns {Object} { severity, categories, score, matches } where matches
+ *   are { start, end, category, keyword, weight } in the original text
+ */
+export function scoreMessage(text) {
+  const { chars, tokenStarts, tokenSpans } = normalize(text)
+  const peak = new Array(categories.length).fill(0)
+  const rest = new Array(categories.length).fill(0)
+  const groups = new Array(categories.length).fill(null)
+  const matches = []
+  const seen = scoring.proximity.map(() => [null, null])
+  let boost = 0
+  let last = 0
+
+  const close = (group, cat) => {
+    group.match.weight = round2(group.weight)
+    if (group.weight > peak[cat]) {
+      rest[cat] += peak[cat]
+      peak[cat] = group.weight
+    } else {
+      rest[cat] += group.weight
+    }
+  }
+
+  scan(chars, (_start, end, id) => {
+    // Hits arrive ordered by end offset, so the token cursor only moves forward
+    while (last + 1 < tokenStarts.length && tokenStarts[last + 1] < end) last++
+    const first = last - ENTRY_WORDS[id] + 1
+    const cat = ENTRY_CATEGORY[id]
+    const start = tokenSpans[first][0]
+    const stop = tokenSpans[last][1]
+    let weight = ENTRY_WEIGHT[id]
+    if (scoring.capsBoost !== 1 && isShouted(text.slice(start, stop))) weight *= scoring.capsBoost
+
+    // Overlapping hits of one category count once, as the strongest (ties: the wider)
+    const group = groups[cat]
+    if (group && first <= group.last) {
+      group.first = Math.min(group.first, first)
+      group.last = Math.max(group.last, last)
+      group.match.start = tokenSpans[group.first][0]
+      group.match.end = tokenSpans[group.last][1]
+      if (weight >= group.weight) {
+        group.weight = weight
+        group.match.keyword = keywords[id][0]
+      }
+    } else {
+      if (group) close(group, cat)
+      const match = { start, end: stop, category: categories[cat], keyword: keywords[id][0], weight: 0 }
+      matches.push(match)
+      groups[cat] = { first, last, weight, match }
+    }
+
+    for (const [rule, side] of ENTRY_RULES[id]) {
+      const sides = seen[rule]
+      if (sides === null) continue
+      const other = sides[1 - side]
+      if (other !== null && first - other <= scoring.proximity[rule].window) {
+        boost += scoring.proximity[rule].boost
+        seen[rule] = null
+      } else {
+        sides[side] = last
+      }
+    }
+  })
+
+  groups.forEach((group, cat) => {
+    if (group) close(group, cat)
+  })
+
+  let score = boost
+  const detected = []
+  categories.forEach((category, cat) => {
+    if (peak[cat]) {
+      detected.push(category)
+      score += peak[cat] + Math.min(scoring.repeatWeight * rest[cat], scoring.repeatCap * peak[cat])
+    }
+  })
+  score = round2(score)
+
+  const [severity] = scoring.thresholds.find(([, threshold]) => score >= threshold) ?? ['low']
+  return {
+    severity,
+    categories: detected.length > 0 ? detected : ['general harassment'],
+    score,
+    matches,
+  }
+}
+
+export default { findCategories, findMatches, scoreMessage, normalize, CATEGORY_WEIGHTS, LEXICON_VERSION }
@@ -11,61 +11,10 @@
  * - VITE_ANTHROPIC_API_KEY: Anthropic API key for Claude models
  */
 
-// Keyword patterns for different harassment types
-const HARASSMENT_PATTERNS = {
-  threats: {
-    keywords: ['kill', 'hurt', 'harm', 'attack', 'find you', 'coming for', 'watch out', 
-               'destroy', 'ruin', 'end you', 'make you pay', 'regret', 'sorry',
-               // Swahili keywords
-               'kuua', 'kuumiza', 'kukumaliza', 'nitakupata'],
-    weight: 5,
-  },
-  sexual: {
-    keywords: ['sexy', 'nudes', 'naked', 'body', 'send pics', 'hot', 'beautiful body',
-               'want you', 'together', 'meet up', 'send photos',
-               // Swahili keywords
-               'picha zako', 'mwili wako', 'tukutane'],
-    weight: 4,
-  },
-  stalking: {
-    keywords: ['watching', 'following', 'know where', 'saw you', 'your house', 
-               'your work', 'tracked', 'found your', 'i know where you live',
-               'your location', 'your address',
-               // Swahili keywords
-               'nakufuata', 'najua unaishi', 'nimekuona'],
-    weight: 5,
-  },
-  insults: {
-    keywords: ['ugly', 'stupid', 'worthless', 'pathetic', 'loser', 'disgusting',
-               'fat', 'dumb', 'idiot', 'trash', 'garbage', 'whore', 'slut',
-               'useless', 'nobody', 'waste',
-               // Swahili insults
-               'mjinga', 'mwizi', 'malaya', 'bure kabisa'],
-    weight: 2,
-  },
-  manipulation: {
-    keywords: ['no one will believe', 'your fault', 'you made me', 'if you loved',
-               'you owe me', 'after everything', 'you deserve', 'crazy',
-               'everyone will know', 'i will tell', "you'll regret",
-               // Swahili manipulation
-               'kosa lako', 'utajuta', 'nitawaambia watu'],
-    weight: 3,
-  },
-  doxxing: {
-    keywords: ['address', 'phone number', 'tell everyone', 'expose', 'share this',
-               'post this', 'your family', 'your friends will know', 'screenshot',
-               'share your photos', 'leak', 'viral',
-               // Swahili keywords
-               'nitaweka mtandaoni', 'nitapost', 'familia yako'],
-    weight: 4,
-  },
-  intimate_images: {
-    keywords: ['share your photos', 'leak your nudes', 'everyone will see', 
-               'post your pictures', 'your photos will', 'video of you',
-               'revenge porn', 'intimate images', 'private pictures'],
-    weight: 5,
-  },
-}
+import { scoreMessage, LEXICON_VERSION } from './keywordMatcher'
+
+// Keyword patterns live in lexicon/harassment_lexicon.json (shared with the
+// backend) and are loaded precompiled through keywordMatcher.js
 
 // Kenya-specific legal references
 const KENYA_LEGAL = {
@@ -94,40 +43,27 @@ const KENYA_LEGAL = {
 /**
  * Analyze a message for harassment patterns
  * @param {string} message - The message to analyze
- * @returns {Object} Analysis result with severity and categories
+ * @returns {Object} Analysis result with severity, categories, score, the
+ *   matched spans and the lexiconVersion the backend needs to reuse this result
  */
 export function analyzeMessage(message) {
   if (!message || typeof message !== 'string') {
     return { severity: 'low', categories: ['unknown'], score: 0 }
   }
 
-  const lowerMessage = message.toLowerCase()
-  const detectedCategories = []
-  let totalScore = 0
-
-  // Check each pattern category
-  Object.entries(HARASSMENT_PATTERNS).forEach(([category, { keywords, weight }]) => {
-    const found = keywords.some(keyword => lowerMessage.includes(keyword))
-    if (found) {
-      detectedCategories.push(category)
-      totalScore += weight
-    }
-  })
-
-  // Determine severity based on total score
-  let severity = 'low'
-  if (totalScore >= 8) severity = 'severe'
-  else if (totalScore >= 5) severity = 'high'
-  else if (totalScore >= 2) severity = 'medium'
+  // Weighted score over every keyword hit (same rules as the backend)
+  const { severity, categories, score, matches } = scoreMessage(message)
 
   // Determine applicable Kenyan laws
-  const applicableLaws = getApplicableLaws(detectedCategories)
+  const applicableLaws = getApplicableLaws(categories)
 
   return {
     severity,
-    categories: detectedCategories.length > 0 ? detectedCategories : ['general harassment'],
-    score: totalScore,
+    categories,
+    score,
+    matches,
     applicableLaws,
+    lexiconVersion: LEXICON_VERSION,
   }
 }
 
@@ -0,0 +1,143 @@
+"""
+Compile the shared harassment lexicon into a precompiled matcher artifact.
+
+Reads lexicon/harassment_lexicon.json, builds the Aho-Corasick automaton
+once with backend/api/matcher.py, resolves the severity scoring rules
+(per-term weights, proximity boosts) to automaton entries, and writes the same artifact to every
+consumer so the backend and frontend never rebuild it at startup and
+always agree on results:
+
+    backend/api/harassment_matcher.json
+    frontend/src/utils/harassmentMatcher.json
+
+Usage:
+    python lexicon/build_lexicon.py           # rebuild artifacts
+    python lexicon/build_lexicon.py --check   # fail if artifacts are stale
+"""
+import argparse
+import json
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SOURCE = os.path.join(ROOT, 'lexicon', 'harassment_lexicon.json')
+OUTPUTS = [
+    os.path.join(ROOT, 'backend', 'api', 'harassment_matcher.json'),
+    os.path.join(ROOT, 'frontend', 'src', 'utils', 'harassmentMatcher.json'),
+]
+ARTIFACT_FORMAT = 3
+
+sys.path.insert(0, os.path.join(ROOT, 'backend'))
+from api.cache import patterns_version  # noqa: E402
+from api.matcher import KeywordMatcher  # noqa: E402
+from api.normalize import tables  # noqa: E402
+
+
+def load_patterns(path: str = SOURCE) -> tuple:
+    """
+    Flatten the lexicon into {category: {'keywords': [...], 'weight': n}}
+
+    Returns:
+        (version, patterns, scoring rules)
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        lexicon = json.load(f)
+
+    patterns = {}
+    for category, data in lexicon['categories'].items():
+        keywords = []
+        for language_keywords in data['keywords'].values():
+            keywords.extend(kw.lower() for kw in language_keywords)
+        patterns[category] = {'keywords': keywords, 'weight': data['weight']}
+    scoring = {key: value for key, value in lexicon['scoring'].items() if key != 'description'}
+    return lexicon['version'], patterns, scoring
+
+
+def compile_scoring(scoring: dict, matcher: KeywordMatcher) -> dict:
+    """Resolve scoring terms to matcher entry ids (a keyword may sit in several categories)"""
+    entry_ids = {}
+    for entry_id, (keyword, _) in enumerate(matcher.entries):
+        entry_ids.setdefault(keyword, []).append(entry_id)
+
+    def resolve(terms: list) -> list:
+        unknown = [term for term in terms if term.lower() not in entry_ids]
+        if unknown:
+            raise ValueError(f'scoring refers to keywords not in the lexicon: {unknown}')
+        return sorted(entry_id for term in terms for entry_id in entry_ids[term.lower()])
+
+    term_weights = [1.0] * len(matcher.entries)
+    for term, weight in scoring['termWeights'].items():
+        for entry_id in resolve([term]):
+            term_weights[entry_id] = weight
+
+    proximity = []
+    for rule in scoring['proximity']:
+        terms, near = resolve(rule['terms']), resolve(rule['near'])
+        if set(terms) & set(near):
+            raise ValueError(f"proximity rule lists a keyword on both sides: {rule['terms']}")
+        proximity.append({'terms': terms, 'near': near, 'window': rule['window'], 'boost': rule['boost']})
+
+    return {
+        'thresholds': sorted(scoring['thresholds'].items(), key=lambda item: -item[1]),
+        'repeatWeight': scoring['repeatWeight'],
+        'repeatCap': scoring['repeatCap'],
+        'capsBoost': scoring['capsBoost'],
+        'termWeights': term_weights,
+        'proximity': proximity,
+    }
+
+
+def build_artifact(version: int, patterns: dict, scoring: dict) -> dict:
+    normalization = tables()
+    matcher = KeywordMatcher(patterns)
+    artifact = {
+        'format': ARTIFACT_FORMAT,
+        'lexiconVersion': version,
+        # Normalization and scoring rules change results too, so they are part of the version
+        'patternsVersion': patterns_version({'patterns': patterns, 'normalization': normalization,
+                                             'scoring': scoring}),
+        'weights': [patterns[cat]['weight'] for cat in patterns],
+        'normalization': normalization,
+        'scoring': compile_scoring(scoring, matcher),
+    }
+    artifact.update(matcher.to_dict())
+    return artifact
+
+
+def render(artifact: dict) -> str:
+    # Compact: the artifact is machine-read and loaded on every cold start
+    return json.dumps(artifact, ensure_ascii=False, separators=(',', ':')) + '\n'
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Build the harassment matcher artifact')
+    parser.add_argument('--check', action='store_true',
+                        help='exit non-zero if any artifact is out of date')
+    args = parser.parse_args(argv)
+
+    content = render(build_artifact(*load_patterns()))
+
+    stale = []
+    for path in OUTPUTS:
+        current = None
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                current = f.read()
+        if current == content:
+            continue
+        if args.check:
+            stale.append(path)
+            continue
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        print(f'wrote {os.path.relpath(path, ROOT)}')
+
+    if stale:
+        for path in stale:
+            print(f'stale: {os.path.relpath(path, ROOT)} (run python lexicon/build_lexicon.py)')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())